@@ -8,12 +8,12 @@
 import os
 import typer
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import requests
 from rich.console import Console
 from rich.table import Table
 
-from synthetic_data_kit.utils.config import load_config, get_vllm_config, get_openai_config, get_llm_provider, get_path_config
+from synthetic_data_kit.utils.config import load_config, get_vllm_config, get_openai_config, get_llm_provider, get_path_config, get_curate_config
 from synthetic_data_kit.core.context import AppContext
 from synthetic_data_kit.server.app import run_server
 
@@ -221,6 +221,9 @@ def create(
     """
     from synthetic_data_kit.core.create import process_file
     
+    # Set once for the whole run; the generator itself takes verbose as an argument
+    os.environ["SDK_VERBOSE"] = "true" if verbose else "false"
+    
     # Check the LLM provider from config
     provider = get_llm_provider(ctx.config)
     console.print(f"L Using {provider} provider", style="green")
@@ -293,6 +296,15 @@ def curate(
     verbose: bool = typer.Option(
         False, "--verbose", "-v", help="Show detailed output"
     ),
+    stream: bool = typer.Option(
+        False, "--stream", help="Rate pairs in windows and append results to JSONL (resumable)"
+    ),
+    predictor: bool = typer.Option(
+        False, "--predictor", help="Skip LLM rating for pairs the trained quality predictor is sure about"
+    ),
+    audit_sample: bool = typer.Option(
+        False, "--audit-sample", help="Rate a random sample and rate the rest only if its pass rate is uncertain"
+    ),
 ):
     """
     Clean and filter content based on quality.
@@ -314,19 +326,23 @@ def curate(
         api_base = api_base or vllm_config.get("api_base")
         model = model or vllm_config.get("model")
         
-        # Check vLLM server availability
-        try:
-            response = requests.get(f"{api_base}/models", timeout=2)
-            if response.status_code != 200:
+        # With the rating cache, a re-run may need no server at all; the client
+        # checks it when the first uncached pair has to be rated
+        cache_config = get_curate_config(ctx.config).get("cache", {}) or {}
+        if not cache_config.get("enabled", False):
+            # Check vLLM server availability
+            try:
+                response = requests.get(f"{api_base}/models", timeout=2)
+                if response.status_code != 200:
+                    console.print(f"L Error: VLLM server not available at {api_base}", style="red")
+                    console.print("Please start the VLLM server with:", style="yellow")
+                    console.print(f"vllm serve {model}", style="bold blue")
+                    return 1
+            except requests.exceptions.RequestException:
                 console.print(f"L Error: VLLM server not available at {api_base}", style="red")
                 console.print("Please start the VLLM server with:", style="yellow")
                 console.print(f"vllm serve {model}", style="bold blue")
                 return 1
-        except requests.exceptions.RequestException:
-            console.print(f"L Error: VLLM server not available at {api_base}", style="red")
-            console.print("Please start the VLLM server with:", style="yellow")
-            console.print(f"vllm serve {model}", style="bold blue")
-            return 1
     
     # Get default output path from config if not provided
     if not output:
@@ -345,7 +361,10 @@ def curate(
                 model,
                 ctx.config_path,
                 verbose,
-                provider=provider  # Pass the provider parameter
+                provider=provider,  # Pass the provider parameter
+                stream=stream,
+                predictor=predictor,
+                audit_sample=audit_sample,
             )
         console.print(f" Cleaned content saved to [bold]{result_path}[/bold]", style="green")
         return 0
@@ -354,6 +373,48 @@ def curate(
         return 1
 
 
+@app.command("train-predictor")
+def train_predictor(
+    inputs: List[str] = typer.Argument(..., help="Curate output files or directories with rated pairs"),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Model path (default: curate.predictor.path)"
+    ),
+    threshold: Optional[float] = typer.Option(
+        None, "--threshold", "-t", help="Quality threshold (1-10) the predictor learns"
+    ),
+    verbose: bool = typer.Option(
+        False, "--verbose", "-v", help="Show detailed output"
+    ),
+):
+    """
+    Train (or retrain) the quality predictor used by curate --predictor on past LLM ratings.
+    """
+    from synthetic_data_kit.core.train_predictor import train_quality_predictor
+    
+    try:
+        with console.status(f"Training quality predictor on {len(inputs)} inputs..."):
+            report = train_quality_predictor(
+                inputs,
+                str(output) if output else None,
+                threshold,
+                ctx.config_path,
+                verbose,
+            )
+        console.print(
+            f"Held-out accuracy {report['accuracy']} on {report['pairs']} pairs "
+            f"(trained on {report['trained_on']})"
+        )
+        console.print(
+            f"Confident on {report['coverage']:.0%} of held-out pairs, "
+            f"agreeing with the LLM on {report['confident_accuracy']}"
+        )
+        console.print(f" Quality predictor saved to [bold]{report['model']}[/bold]", style="green")
+        return 0
+    except Exception as e:
+        console.print(f"L Error: {e}", style="red")
+        return 1
+
+
 @app.command("save-as")
 def save_as(
     input: str = typer.Argument(..., help="Input file to convert"),
@@ -13,6 +13,7 @@ from synthetic_data_kit.models.llm_client import LLMClient
 from synthetic_data_kit.generators.qa_generator import QAGenerator
 from synthetic_data_kit.generators.vqa_generator import VQAGenerator
 from synthetic_data_kit.utils.config import get_generation_config
+from synthetic_data_kit.utils.dedup import ChunkDeduplicator
 
 def read_json(file_path):
     # Read the file
@@ -31,6 +32,11 @@ def process_file(
     num_pairs: Optional[int] = None,
     verbose: bool = False,
     provider: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    deduplicator: Optional[ChunkDeduplicator] = None,
+    client: Optional[LLMClient] = None,
+    generator: Optional[QAGenerator] = None,
 ) -> str:
     """Process a file to generate content
     
@@ -43,6 +49,12 @@ def process_file(
         content_type: Type of content to generate (qa, summary, cot)
         num_pairs: Target number of QA pairs to generate
         threshold: Quality threshold for filtering (1-10)
+        chunk_size: Override the configured chunk size
+        chunk_overlap: Override the configured chunk overlap
+        deduplicator: Near-duplicate chunk filter shared across files
+        client: LLM client shared across files (built from the arguments above if None)
+        generator: QA generator shared across files, used for "qa" and "summary";
+            chunking and verbosity are passed per call and never written back to it
     
     Returns:
         Path to the output file
@@ -52,12 +64,13 @@ def process_file(
     os.makedirs(output_dir, exist_ok=True)
     
     # Initialize LLM client
-    client = LLMClient(
-        config_path=config_path,
-        provider=provider,
-        api_base=api_base,
-        model_name=model
-    )
+    if client is None:
+        client = LLMClient(
+            config_path=config_path,
+            provider=provider,
+            api_base=api_base,
+            model_name=model
+        )
     
     # Debug: Print which provider is being used
     print(f"L Using {client.provider} provider")
@@ -67,7 +80,8 @@ def process_file(
     
     # Generate content based on type
     if content_type == "qa":
-        generator = QAGenerator(client, config_path)
+        if generator is None:
+            generator = QAGenerator(client, config_path, deduplicator=deduplicator)
 
         document_text = read_json(file_path)
         
@@ -77,13 +91,20 @@ def process_file(
             generation_config = get_generation_config(config)
             num_pairs = generation_config.get("num_pairs", 25)
         
+        manifest = generator.open_manifest(output_dir, base_name)
+        
         # Process document
         result = generator.process_document(
             document_text,
             num_pairs=num_pairs,
             fileName = file_path, 
             verbose=verbose,
+            manifest=manifest,
+            chunk_size=chunk_size,
+            overlap=chunk_overlap,
         )
+        if manifest is not None:
+            manifest.save()
         
         # Save output
         output_path = os.path.join(output_dir, f"{base_name}_qa_pairs.json")
@@ -109,12 +130,24 @@ def process_file(
         return output_path
     
     elif content_type == "summary":
-        generator = QAGenerator(client, config_path)
+        if generator is None:
+            generator = QAGenerator(client, config_path)
 
         document_text = read_json(file_path)
         
+        # Kept apart from the qa manifest, which saving would otherwise prune
+        manifest = generator.open_manifest(output_dir, f"{base_name}_summary")
+        
         # Generate just the summary
-        summary = generator.generate_summary(document_text)
+        summary = generator.generate_summary(
+            document_text,
+            manifest=manifest,
+            chunk_size=chunk_size,
+            overlap=chunk_overlap,
+            verbose=verbose,
+        )
+        if manifest is not None:
+            manifest.save()
         
         # Save output
         output_path = os.path.join(output_dir, f"{base_name}_summary.json")
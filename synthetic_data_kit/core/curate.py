@@ -7,13 +7,253 @@
 
 import os
 import json
+import itertools
+import random
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 
 from synthetic_data_kit.models.llm_client import LLMClient
 from synthetic_data_kit.generators.qa_generator import QAGenerator
-from synthetic_data_kit.utils.config import get_curate_config, get_prompt
-from synthetic_data_kit.utils.llm_processing import convert_to_conversation_format, parse_ratings
+from synthetic_data_kit.utils.config import (
+    get_curate_config,
+    get_llm_provider,
+    get_openai_config,
+    get_vllm_config,
+    load_config,
+)
+from synthetic_data_kit.utils.llm_processing import convert_to_conversation_format
+from synthetic_data_kit.utils.audit import audit_decision, audit_sample_size
+from synthetic_data_kit.utils.prefilter import prefilter_qa_pairs
+from synthetic_data_kit.utils.quality_model import QualityPredictor, UNLEARNED_SOURCES
+
+
+class _DeferredClient:
+    """Stands in for an ``LLMClient`` that is only created once a request needs it
+
+    The model name is resolved from the config up front, so cached ratings
+    can be looked up without connecting to (or checking) the server.
+    """
+
+    def __init__(self, config: Dict[str, Any], **client_kwargs):
+        provider = client_kwargs.get("provider") or get_llm_provider(config)
+        provider_config = (
+            get_openai_config(config) if provider == "api-endpoint" else get_vllm_config(config)
+        )
+        self.model = client_kwargs.get("model_name") or provider_config.get("model")
+        self._client_kwargs = client_kwargs
+        self._client: Optional[LLMClient] = None
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes this stand-in does not have, i.e. client calls
+        if self._client is None:
+            self._client = LLMClient(**self._client_kwargs)
+        return getattr(self._client, name)
+
+
+class _PairRater:
+    """Rating setup shared by the in-memory and streaming curate modes
+
+    Wraps the pre-filter, the quality predictor and (cascade) rating so that a
+    call rates any slice of the input the same way. LLM clients are created
+    on the first request, so a run served from the rating cache needs no
+    server.
+    """
+
+    def __init__(
+        self,
+        config_path: Optional[Path],
+        provider: Optional[str],
+        api_base: Optional[str],
+        model: Optional[str],
+        threshold: Optional[float],
+        verbose: bool,
+        use_predictor: bool = False,
+    ):
+        config = load_config(config_path)
+        client = _DeferredClient(
+            config, config_path=config_path, provider=provider, api_base=api_base, model_name=model
+        )
+
+        # Create QA generator
+        self.generator = QAGenerator(client, config_path)
+
+        # Get configuration
+        self.curate_config = curate_config = get_curate_config(config)
+
+        # Get threshold from args, then config, then default
+        self.threshold = threshold if threshold is not None else curate_config.get("threshold", 7.0)
+
+        # Allow environment variable to override batch size (for debugging)
+        env_batch_size = os.environ.get("SDK_BATCH_SIZE")
+        if env_batch_size and env_batch_size.isdigit():
+            self.batch_size = int(env_batch_size)
+            self.inference_batch = int(env_batch_size)
+            if verbose:
+                print(f"Using environment-specified batch size: {self.batch_size}")
+        else:
+            self.batch_size = curate_config.get("batch_size", 32)
+            self.inference_batch = curate_config.get("inference_batch", 32)
+
+        self.temperature = curate_config.get("temperature", 0.1)
+
+        self.prefilter_config = curate_config.get("prefilter", {}) or {}
+        self.cascade_config = curate_config.get("cascade", {}) or {}
+
+        # A cheap model rates everything; the configured model only judges borderline pairs
+        self.fast_generator = None
+        if self.cascade_config.get("enabled", False) and self.cascade_config.get("fast_model"):
+            fast_client = _DeferredClient(
+                config,
+                config_path=config_path,
+                provider=provider,
+                api_base=api_base,
+                model_name=self.cascade_config["fast_model"],
+            )
+            self.fast_generator = QAGenerator(fast_client, config_path)
+
+        # A classifier trained on past ratings settles the pairs it is confident about
+        self.predictor_config = curate_config.get("predictor", {}) or {}
+        self.predictor = None
+        if use_predictor:
+            predictor_path = self.predictor_config.get("path", "data/models/quality.npz")
+            if not os.path.exists(predictor_path):
+                raise ValueError(
+                    f"No quality predictor at {predictor_path}; train one with train-predictor"
+                )
+            self.predictor = QualityPredictor.load(predictor_path)
+            if self.predictor.threshold != self.threshold:
+                print(
+                    f"Quality predictor was trained for threshold {self.predictor.threshold}, "
+                    f"not {self.threshold}; rating every pair with the LLM"
+                )
+                self.predictor = None
+
+    def prefilter(
+        self, qa_pairs: List[Dict[str, Any]], source_chunks: Dict[str, str]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """``(to_rate, accepted, rejected)`` after the rule-based checks, if enabled"""
+        if not self.prefilter_config.get("enabled", False):
+            return qa_pairs, [], []
+        return prefilter_qa_pairs(qa_pairs, source_chunks, self.prefilter_config)
+
+    def predict(
+        self, qa_pairs: List[Dict[str, Any]], source_chunks: Dict[str, str]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """``(to_rate, decided)``: pairs the predictor is unsure about, and the rest
+
+        Decided pairs get the predictor's mean accepted or rejected rating,
+        ``rating_source: "predictor"`` and their probability of being good.
+        """
+        if self.predictor is None or not qa_pairs:
+            return qa_pairs, []
+        probabilities = self.predictor.predict_proba(qa_pairs, source_chunks)
+        accept = self.predictor_config.get("accept", 0.9)
+        reject = self.predictor_config.get("reject", 0.1)
+
+        to_rate, decided = [], []
+        for pair, probability in zip(qa_pairs, probabilities):
+            if reject < probability < accept:
+                to_rate.append(pair)
+                continue
+            rating = (
+                self.predictor.accepted_rating
+                if probability >= accept
+                else self.predictor.rejected_rating
+            )
+            decided.append(
+                {
+                    **pair,
+                    "rating": rating,
+                    "rating_source": "predictor",
+                    "predicted_quality": round(float(probability), 3),
+                }
+            )
+        return to_rate, decided
+
+    def audit(
+        self, qa_pairs: List[Dict[str, Any]], context_chunks: Optional[Dict[str, str]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+        """Rate a random sample and decide whether the rest needs rating
+
+        The sample is sized by ``curate.audit.margin`` and ``confidence`` and
+        the document's pair count (see ``audit_sample_size``); documents no
+        larger than that are rated in full.
+
+        Returns:
+            ``(to_rate, rated_sample, settled, audit_metrics)``; settled pairs
+            get the mean rating of the sampled pairs on the side of the threshold
+            the decision took, and ``rating_source: "audit"``
+        """
+        audit_config = self.curate_config.get("audit", {}) or {}
+        sample_size = audit_sample_size(
+            audit_config.get("margin", 0.1), audit_config.get("confidence", 0.95), len(qa_pairs)
+        )
+        if sample_size >= len(qa_pairs):
+            return qa_pairs, [], [], {"sampled": 0, "decision": "full"}
+
+        rng = random.Random(audit_config.get("seed", 0))
+        chosen = set(rng.sample(range(len(qa_pairs)), sample_size))
+        sample = [pair for i, pair in enumerate(qa_pairs) if i in chosen]
+        rest = [pair for i, pair in enumerate(qa_pairs) if i not in chosen]
+
+        rated_sample = self.rate(sample, context_chunks)
+        passed = sum(pair["rating"] >= self.threshold for pair in rated_sample)
+        audit_metrics = audit_decision(passed, len(rated_sample), audit_config, len(qa_pairs))
+        low, high = audit_metrics["interval"]
+        print(
+            f"Audit: {passed} of {len(rated_sample)} sampled pairs passed "
+            f"(pass rate {low:.0%}-{high:.0%}), decision: {audit_metrics['decision']}"
+        )
+
+        if audit_metrics["decision"] == "full":
+            return rest, rated_sample, [], audit_metrics
+        accept = audit_metrics["decision"] == "accept"
+        side = [
+            pair["rating"] for pair in rated_sample if (pair["rating"] >= self.threshold) == accept
+        ]
+        if side:
+            rating = sum(side) / len(side)
+        else:
+            rating = self.threshold if accept else self.threshold - 1
+        settled = [{**pair, "rating": rating, "rating_source": "audit"} for pair in rest]
+        return [], rated_sample, settled, audit_metrics
+
+    def context_chunks(self, source_chunks: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Passages to show the rater (a dict lookup by chunk id), if enabled"""
+        return source_chunks if self.curate_config.get("attach_source", False) else None
+
+    def rate(
+        self,
+        qa_pairs: List[Dict[str, Any]],
+        context_chunks: Optional[Dict[str, str]],
+        on_settled=None,
+    ) -> List[Dict[str, Any]]:
+        """Rate pairs, escalating borderline pairs when cascade is enabled
+
+        Cached ratings are looked up first; the other pairs are packed into
+        batches (``batch_size`` caps pairs per prompt) that are all in flight
+        together on the client's concurrent path. Batches whose response cannot
+        be parsed are bisected and retried in later rounds, also all at once,
+        rather than rated pair by pair.
+        """
+        generator = self.fast_generator or self.generator
+        return generator.rate_pairs(
+            qa_pairs,
+            chunks=context_chunks,
+            max_batch_size=self.batch_size,
+            temperature=self.temperature,
+            inference_batch=self.inference_batch,
+            on_settled=on_settled,
+            judge=self.generator if self.fast_generator is not None else None,
+            threshold=self.threshold,
+            band=self.cascade_config.get("band", 1.0),
+        )
+
+
+def _count_sources(rated_pairs: List[Dict[str, Any]], counts: Dict[str, int]) -> Dict[str, int]:
+    for pair in rated_pairs:
+        counts[pair["rating_source"]] = counts.get(pair["rating_source"], 0) + 1
+    return counts
 
 
 def curate_qa_pairs(
@@ -25,6 +265,9 @@ def curate_qa_pairs(
     config_path: Optional[Path] = None,
     verbose: bool = False,
     provider: Optional[str] = None,
+    stream: bool = False,
+    predictor: bool = False,
+    audit_sample: bool = False,
 ) -> str:
     """Clean and filter QA pairs based on quality ratings
 
@@ -36,10 +279,31 @@ def curate_qa_pairs(
         model: Model to use
         config_path: Path to configuration file
         verbose: Show detailed output
+        stream: Rate the input window by window and append results to JSONL
+            files (see ``curate_qa_pairs_stream``)
+        predictor: Skip LLM rating for pairs the trained quality predictor
+            (``curate.predictor.path``) is confident about
+        audit_sample: Rate a random sample first and rate the rest only if the
+            estimated pass rate is uncertain (see ``curate.audit``)
 
     Returns:
         Path to the cleaned output file
     """
+    if stream:
+        if audit_sample:
+            raise ValueError("Audit sampling works per document and cannot be used with --stream")
+        return curate_qa_pairs_stream(
+            input_path,
+            output_path,
+            threshold,
+            api_base,
+            model,
+            config_path,
+            verbose,
+            provider,
+            predictor=predictor,
+        )
+
     # Set verbose either via CLI or via env variable. If its via CLI, set it to env variable
     if verbose:
         os.environ["SDK_VERBOSE"] = "true"
@@ -53,63 +317,43 @@ def curate_qa_pairs(
     # Extract QA pairs
     qa_pairs = data.get("qa_pairs", [])
     summary = data.get("summary", "")
+    # Source passages by chunk id, as saved by create alongside the pairs
+    source_chunks = data.get("chunks", {})
 
     # If there are no QA pairs or they're already filtered
     if not qa_pairs:
         raise ValueError("No QA pairs found in the input file")
 
-    # Initialize LLM client
-    client = LLMClient(
-        config_path=config_path, provider=provider, api_base=api_base, model_name=model
-    )
-
-    # Get threshold from args, then config, then default
-    if threshold is None:
-        config = client.config
-        cleanup_config = get_curate_config(config)
-        threshold = cleanup_config.get("threshold", 7.0)
-
-    # Create QA generator
-    generator = QAGenerator(client, config_path)
-
-    # Get configuration
-    curate_config = get_curate_config(client.config)
-
-    # Allow environment variable to override batch size (for debugging)
-    env_batch_size = os.environ.get("SDK_BATCH_SIZE")
-    if env_batch_size and env_batch_size.isdigit():
-        batch_size = int(env_batch_size)
-        inference_batch = int(env_batch_size)
-        if verbose:
-            print(f"Using environment-specified batch size: {batch_size}")
-    else:
-        batch_size = curate_config.get("batch_size", 32)
-        inference_batch = curate_config.get("inference_batch", 32)
-
-    rating_temperature = curate_config.get("temperature", 0.1)
-
-    if threshold is None:
-        threshold = curate_config.get("threshold", 7.0)
-
-    # Get rating prompt template
-    rating_prompt_template = get_prompt(client.config, "qa_rating")
-
-    # Split QA pairs into batches
-    batches = []
-    for i in range(0, len(qa_pairs), batch_size):
-        batch = qa_pairs[i : i + batch_size]
-        batches.append(batch)
-
-    # Prepare all message batches for rating
-    # @TODO RAG Checking, 
-    # 1. add RAG for context checking
-    # 2. add Graph Building logics
-    all_messages = []
-    for batch in batches:
-        batch_json = json.dumps(batch, indent=2)
-        rating_prompt = rating_prompt_template.format(pairs=batch_json)
-        messages = [{"role": "system", "content": rating_prompt}]
-        all_messages.append(messages)
+    rater = _PairRater(config_path, provider, api_base, model, threshold, verbose, predictor)
+    threshold = rater.threshold
+
+    # Show the rater the passage each pair came from (a dict lookup by chunk id)
+    context_chunks = rater.context_chunks(source_chunks)
+
+    # Rule-based checks settle obviously bad (or clearly supported) pairs without rating
+    pairs_to_rate, accepted_pairs, rejected_pairs = rater.prefilter(qa_pairs, source_chunks)
+    if rater.prefilter_config.get("enabled", False):
+        print(
+            f"Pre-filter rejected {len(rejected_pairs)} and accepted {len(accepted_pairs)} "
+            f"of {len(qa_pairs)} pairs"
+        )
+
+    pairs_to_rate, predicted_pairs = rater.predict(pairs_to_rate, source_chunks)
+    unsettled_by_predictor = len(pairs_to_rate)
+    if rater.predictor is not None:
+        print(
+            f"Quality predictor settled {len(predicted_pairs)} pairs, "
+            f"{len(pairs_to_rate)} left for the LLM"
+        )
+
+    # A rated sample can settle the whole document when its pass rate is clear-cut
+    sampled_pairs, audited_pairs, audit_metrics = [], [], None
+    if audit_sample:
+        pairs_to_rate, sampled_pairs, audited_pairs, audit_metrics = rater.audit(
+            pairs_to_rate, context_chunks
+        )
+
+    # @TODO Graph Building logics
 
     # Initialize counters and result containers
     filtered_pairs = []
@@ -120,7 +364,7 @@ def curate_qa_pairs(
 
     # Process batches with simple progress indicator rather than a detailed bar
     # This avoids conflicts with other output messages
-    print(f"Processing {len(batches)} batches of QA pairs...")
+    print(f"Rating {len(pairs_to_rate)} QA pairs...")
 
     # Only use detailed progress bar in verbose mode
     if verbose:
@@ -141,140 +385,30 @@ def curate_qa_pairs(
         ]
 
         progress_ctx = Progress(*progress_columns)
-        rate_task = progress_ctx.add_task(f"Rating QA pairs", total=len(batches))
+        rate_task = progress_ctx.add_task(f"Rating QA pairs", total=len(pairs_to_rate))
         progress_ctx.start()
     else:
         progress_ctx = None
         rate_task = None
 
-    # Process in inference batches
-    for batch_start in range(0, len(all_messages), inference_batch):
-        batch_end = min(batch_start + inference_batch, len(all_messages))
-        current_batch = all_messages[batch_start:batch_end]
-        current_batch_size = len(current_batch)
+    def on_settled(count):
+        if progress_ctx:
+            progress_ctx.update(rate_task, advance=count)
 
-        batch_num = batch_start // inference_batch + 1
-        total_batches = (len(all_messages) + inference_batch - 1) // inference_batch
+    rated_pairs = sampled_pairs + rater.rate(pairs_to_rate, context_chunks, on_settled=on_settled)
 
-        # Simple progress indicator for non-verbose mode
-        if not verbose:
-            print(f"Processing batch {batch_num}/{total_batches}...", end="\r")
-        else:
-            print(f"Processing batch {batch_num}/{total_batches}")
+    for pair in accepted_pairs + predicted_pairs + audited_pairs + rated_pairs:
+        rating = pair["rating"]
+        # Ratings recorded by the pre-filter, the predictor and the audit are not LLM scores
+        if pair.get("rating_source") not in UNLEARNED_SOURCES:
+            total_score += rating
+            total_evaluated += 1
 
-        try:
-            # Get ratings for the batch
-            if verbose:
-                print(f"Sending batch request with {len(current_batch)} items")
-
-            batch_responses = client.batch_completion(
-                current_batch, temperature=rating_temperature, batch_size=inference_batch
-            )
-
-            if verbose:
-                print(f"Received {len(batch_responses)} responses")
-                for i, resp in enumerate(batch_responses):
-                    print(f"Response {i+1}: {resp[:1000]}...")
-
-            # Process each response
-            for j, response in enumerate(batch_responses):
-                original_batch_index = batch_start + j
-                if original_batch_index < len(batches):
-                    original_batch = batches[original_batch_index]
-
-                    # Parse the ratings with original batch for fallback
-                    try:
-                        if verbose:
-                            print(f"Processing response {original_batch_index+1}")
-
-                        rated_batch = parse_ratings(response, original_batch)
-                        all_valid = all(
-                            "question" in pair and "answer" in pair and "rating" in pair
-                            for pair in rated_batch
-                        )
-                        if all_valid:
-                            # Process the rated batch
-                            for pair in rated_batch:
-                                if "rating" in pair:
-                                    rating = pair["rating"]
-                                    total_score += rating
-                                    total_evaluated += 1
-
-                                    if rating >= threshold:
-                                        filtered_pairs.append(pair)
-                                        total_passed += 1
-                                    else:
-                                        unfiltered_pairs.append(pair)
-                        else:
-                            print(
-                                f"Error processing batch {original_batch_index+1}: {str(rated_batch)}"
-                            )
-                    except Exception as e:
-                        if verbose:
-                            print(f"Error processing batch {original_batch_index+1}: {str(e)}")
-                            print(f"First 100 chars of response: {response[:1000]}")
-
-                        # Try processing one pair at a time as a fallback
-                        try:
-                            if verbose:
-                                print("Attempting to process items individually...")
-
-                            for item in original_batch:
-                                item_json = json.dumps(item, indent=2)
-                                rating_prompt = rating_prompt_template.format(pairs=item_json)
-                                item_response = client.chat_completion(
-                                    [{"role": "system", "content": rating_prompt}],
-                                    temperature=rating_temperature,
-                                )
-                                try:
-                                    # This should be a single item
-                                    rated_item = parse_ratings(item_response, [item])
-                                    all_valid = all(
-                                        "question" in pair and "answer" in pair and "rating" in pair
-                                        for pair in rated_item
-                                    )
-                                    if all_valid:
-                                        if rated_item and len(rated_item) > 0:
-                                            pair = rated_item[0]
-                                            if "rating" in pair:
-                                                rating = pair["rating"]
-                                                total_score += rating
-                                                total_evaluated += 1
-
-                                                if rating >= threshold:
-                                                    filtered_pairs.append(pair)
-                                                    total_passed += 1
-                                                    if verbose:
-                                                        print(
-                                                            f"Successfully processed individual item with rating {rating}"
-                                                        )
-                                                else:
-                                                    unfiltered_pairs.append(pair)
-                                    else:
-                                        print(
-                                            f"Error processing batch {original_batch_index+1}: {str(rated_item)}"
-                                        )
-                                except Exception as inner_e:
-                                    if verbose:
-                                        print(f"Failed to process individual item: {str(inner_e)}")
-                        except Exception as fallback_e:
-                            if verbose:
-                                print(f"Fallback processing failed: {str(fallback_e)}")
-
-                        # Continue processing other batches rather than failing completely
-                        pass
-
-            # Update progress bar if in verbose mode
-            if progress_ctx and rate_task:
-                progress_ctx.update(rate_task, advance=current_batch_size)
-
-        except Exception as e:
-            if verbose:
-                print(f"Error processing inference batch {batch_num}: {str(e)}")
-
-            # Update progress bar if in verbose mode
-            if progress_ctx and rate_task:
-                progress_ctx.update(rate_task, advance=current_batch_size)
+        if rating >= threshold:
+            filtered_pairs.append(pair)
+            total_passed += 1
+        else:
+            unfiltered_pairs.append(pair)
 
     # Stop progress bar if in verbose mode
     if progress_ctx:
@@ -292,6 +426,18 @@ def curate_qa_pairs(
         "retention_rate": round(len(filtered_pairs) / len(qa_pairs), 2) if qa_pairs else 0,
         "avg_score": round(total_score / total_evaluated, 1) if total_evaluated else 0,
     }
+    if rater.fast_generator is not None:
+        metrics["rating_sources"] = _count_sources(rated_pairs, {})
+    if rater.prefilter_config.get("enabled", False):
+        metrics["prefilter"] = {"rejected": len(rejected_pairs), "accepted": len(accepted_pairs)}
+    if rater.predictor is not None:
+        metrics["predictor"] = {
+            "accepted": sum(pair["rating"] >= threshold for pair in predicted_pairs),
+            "rejected": sum(pair["rating"] < threshold for pair in predicted_pairs),
+            "rated": unsettled_by_predictor,
+        }
+    if audit_metrics is not None:
+        metrics["audit"] = {**audit_metrics, "unrated": len(audited_pairs)}
 
     # Always print basic stats, even in non-verbose mode
     print(f"Rated {total_evaluated} QA pairs")
@@ -306,9 +452,11 @@ def curate_qa_pairs(
         "summary": summary,
         "qa_pairs": filtered_pairs,
         "conversations": conversations,
-        "bad_qa_pairs": unfiltered_pairs,
+        "bad_qa_pairs": unfiltered_pairs + rejected_pairs,
         "metrics": metrics,
     }
+    if source_chunks:
+        result["chunks"] = source_chunks
 
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -318,3 +466,196 @@ def curate_qa_pairs(
         json.dump(result, f, indent=2)
 
     return output_path
+
+
+def _iter_qa_pairs(input_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield QA pairs one at a time from JSONL (one pair per line) or create's JSON output
+
+    JSON input is parsed incrementally when ijson is installed.
+    """
+    if input_path.endswith(".jsonl"):
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    try:
+        import ijson
+    except ImportError:
+        print("ijson is not installed, loading the whole input (pip install ijson to stream JSON)")
+        with open(input_path, "r", encoding="utf-8") as f:
+            yield from json.load(f).get("qa_pairs", [])
+        return
+
+    with open(input_path, "rb") as f:
+        yield from ijson.items(f, "qa_pairs.item", use_float=True)
+
+
+def _load_source_chunks(input_path: str) -> Dict[str, str]:
+    """The chunk id -> text map saved by create (JSON input only)"""
+    if input_path.endswith(".jsonl"):
+        return {}
+    try:
+        import ijson
+    except ImportError:
+        with open(input_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("chunks", {})
+    with open(input_path, "rb") as f:
+        return dict(ijson.kvitems(f, "chunks"))
+
+
+def _write_progress(path: str, progress: Dict[str, Any]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, path)
+
+
+def curate_qa_pairs_stream(
+    input_path: str,
+    output_path: str,
+    threshold: Optional[float] = None,
+    api_base: Optional[str] = None,
+    model: Optional[str] = None,
+    config_path: Optional[Path] = None,
+    verbose: bool = False,
+    provider: Optional[str] = None,
+    predictor: bool = False,
+) -> str:
+    """Curate QA pairs window by window, appending results to JSONL files
+
+    Pairs are read incrementally (see ``_iter_qa_pairs``) and rated
+    ``curate.stream.window`` at a time. After every window, kept pairs are
+    appended to ``<output>.jsonl`` and rejected ones to ``<output>_rejected.jsonl``,
+    and a ``<output>.progress.json`` record is updated. Memory use depends on
+    the window, not the input size. An interrupted run picks up after the last
+    finished window when started again with the same input and threshold.
+
+    Returns:
+        Path to the JSONL file of kept pairs
+    """
+    if verbose:
+        os.environ["SDK_VERBOSE"] = "true"
+    else:
+        os.environ["SDK_VERBOSE"] = "false"
+
+    rater = _PairRater(config_path, provider, api_base, model, threshold, verbose, predictor)
+    threshold = rater.threshold
+    window = (rater.curate_config.get("stream", {}) or {}).get("window", 256)
+
+    base = os.path.splitext(output_path)[0]
+    kept_path = f"{base}.jsonl"
+    rejected_path = f"{base}_rejected.jsonl"
+    progress_path = f"{base}.progress.json"
+    os.makedirs(os.path.dirname(os.path.abspath(kept_path)), exist_ok=True)
+
+    progress = {
+        "input": os.path.abspath(input_path),
+        "threshold": threshold,
+        "done": 0,
+        "kept_bytes": 0,
+        "rejected_bytes": 0,
+        "complete": False,
+        "metrics": {"total": 0, "filtered": 0, "score": 0.0, "evaluated": 0},
+    }
+    if os.path.exists(progress_path):
+        with open(progress_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if (
+            not previous.get("complete")
+            and previous.get("input") == progress["input"]
+            and previous.get("threshold") == threshold
+        ):
+            progress = previous
+            print(f"Resuming after {progress['done']} already curated pairs")
+
+    # Drop anything written after the last recorded window
+    for path, size in (
+        (kept_path, progress["kept_bytes"]),
+        (rejected_path, progress["rejected_bytes"]),
+    ):
+        with open(path, "a", encoding="utf-8") as f:
+            f.truncate(size)
+
+    # Source passages are only needed for context, the pre-filter or the predictor
+    source_chunks = {}
+    if (
+        rater.curate_config.get("attach_source", False)
+        or rater.prefilter_config.get("enabled", False)
+        or rater.predictor is not None
+    ):
+        source_chunks = _load_source_chunks(input_path)
+    context_chunks = rater.context_chunks(source_chunks)
+
+    counts = progress["metrics"]
+    pairs = itertools.islice(_iter_qa_pairs(input_path), progress["done"], None)
+    while True:
+        qa_pairs = list(itertools.islice(pairs, window))
+        if not qa_pairs:
+            break
+
+        pairs_to_rate, accepted_pairs, rejected_pairs = rater.prefilter(qa_pairs, source_chunks)
+        pairs_to_rate, predicted_pairs = rater.predict(pairs_to_rate, source_chunks)
+        rated_pairs = accepted_pairs + predicted_pairs + rater.rate(pairs_to_rate, context_chunks)
+
+        kept = [pair for pair in rated_pairs if pair["rating"] >= threshold]
+        rejected = [pair for pair in rated_pairs if pair["rating"] < threshold] + rejected_pairs
+        with open(kept_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(pair, ensure_ascii=False) + "\n" for pair in kept)
+        with open(rejected_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(pair, ensure_ascii=False) + "\n" for pair in rejected)
+
+        counts["total"] += len(qa_pairs)
+        counts["filtered"] += len(kept)
+        llm_rated = [
+            pair for pair in rated_pairs if pair.get("rating_source") not in UNLEARNED_SOURCES
+        ]
+        counts["score"] += sum(pair["rating"] for pair in llm_rated)
+        counts["evaluated"] += len(llm_rated)
+        counts["prefilter_rejected"] = counts.get("prefilter_rejected", 0) + len(rejected_pairs)
+        counts["prefilter_accepted"] = counts.get("prefilter_accepted", 0) + len(accepted_pairs)
+        counts["rating_sources"] = _count_sources(rated_pairs, counts.get("rating_sources", {}))
+        predicted_kept = sum(pair["rating"] >= threshold for pair in predicted_pairs)
+        counts["predictor_accepted"] = counts.get("predictor_accepted", 0) + predicted_kept
+        counts["predictor_rejected"] = (
+            counts.get("predictor_rejected", 0) + len(predicted_pairs) - predicted_kept
+        )
+        counts["llm_rated"] = counts.get("llm_rated", 0) + len(pairs_to_rate)
+
+        progress["done"] += len(qa_pairs)
+        progress["kept_bytes"] = os.path.getsize(kept_path)
+        progress["rejected_bytes"] = os.path.getsize(rejected_path)
+        _write_progress(progress_path, progress)
+        print(f"Curated {progress['done']} pairs, kept {counts['filtered']}")
+
+    if counts["total"] == 0:
+        raise ValueError("No QA pairs found in the input file")
+
+    metrics = {
+        "total": counts["total"],
+        "filtered": counts["filtered"],
+        "retention_rate": round(counts["filtered"] / counts["total"], 2),
+        "avg_score": round(counts["score"] / counts["evaluated"], 1) if counts["evaluated"] else 0,
+    }
+    if rater.fast_generator is not None:
+        metrics["rating_sources"] = counts["rating_sources"]
+    if rater.prefilter_config.get("enabled", False):
+        metrics["prefilter"] = {
+            "rejected": counts["prefilter_rejected"],
+            "accepted": counts["prefilter_accepted"],
+        }
+    if rater.predictor is not None:
+        metrics["predictor"] = {
+            "accepted": counts["predictor_accepted"],
+            "rejected": counts["predictor_rejected"],
+            "rated": counts["llm_rated"],
+        }
+    progress["complete"] = True
+    progress["result"] = metrics
+    _write_progress(progress_path, progress)
+
+    print(f"Rated {counts['evaluated']} QA pairs")
+    print(f"Retained {counts['filtered']} pairs (threshold: {threshold})")
+    print(f"Average score: {metrics['avg_score']}")
+    return kept_path
@@ -0,0 +1,139 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Train the local quality predictor on past curate output
+
+import os
+import json
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from synthetic_data_kit.utils.config import load_config, get_curate_config
+from synthetic_data_kit.utils.quality_model import (
+    QualityPredictor,
+    UNLEARNED_SOURCES,
+    evaluate_predictions,
+)
+
+
+def _curate_outputs(paths: List[str]) -> List[str]:
+    """Input files, expanding directories to the .json and .jsonl files they contain"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith((".json", ".jsonl")) and not name.endswith(".progress.json")
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def load_rated_pairs(paths: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """LLM-rated pairs and their source chunks from curate output
+
+    Reads ``qa_pairs`` and ``bad_qa_pairs`` of ``_cleaned.json`` files and the
+    kept/rejected JSONL files of ``curate --stream``. Pairs without a numeric
+    rating, and pairs settled by the pre-filter or the predictor itself, are
+    skipped.
+    """
+    pairs = []
+    chunks = {}
+    for path in _curate_outputs(paths):
+        if path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                candidates = [json.loads(line) for line in f if line.strip()]
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                continue
+            candidates = data.get("qa_pairs", []) + data.get("bad_qa_pairs", [])
+            chunks.update(data.get("chunks", {}))
+
+        for pair in candidates:
+            rating = pair.get("rating")
+            if isinstance(rating, bool) or not isinstance(rating, (int, float)):
+                continue
+            if pair.get("rating_source") in UNLEARNED_SOURCES:
+                continue
+            pairs.append(pair)
+    return pairs, chunks
+
+
+def train_quality_predictor(
+    inputs: List[str],
+    output_path: Optional[str] = None,
+    threshold: Optional[float] = None,
+    config_path: Optional[Path] = None,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """Train the quality predictor and report its accuracy on held-out LLM ratings
+
+    A ``curate.predictor.holdout`` share of the pairs is kept out of training
+    and used for the report; the saved model is the one that was evaluated.
+
+    Args:
+        inputs: Curate output files or directories holding them
+        output_path: Where to save the model (default: ``curate.predictor.path``)
+        threshold: Rating that separates good pairs (default: ``curate.threshold``)
+        config_path: Path to configuration file
+        verbose: Show detailed output
+
+    Returns:
+        The held-out report, plus the model path under ``model``
+    """
+    config = load_config(config_path)
+    curate_config = get_curate_config(config)
+    predictor_config = curate_config.get("predictor", {}) or {}
+    if threshold is None:
+        threshold = curate_config.get("threshold", 7.0)
+    output_path = output_path or predictor_config.get("path", "data/models/quality.npz")
+
+    pairs, chunks = load_rated_pairs(inputs)
+    ratings = np.array([float(pair["rating"]) for pair in pairs], dtype=np.float32)
+    labels = ratings >= threshold
+    if len(pairs) < 20 or labels.all() or not labels.any():
+        raise ValueError(
+            f"Need at least 20 rated pairs on both sides of threshold {threshold} "
+            f"(found {int(labels.sum())} above and {int((~labels).sum())} below)"
+        )
+
+    rng = np.random.default_rng(predictor_config.get("seed", 0))
+    order = rng.permutation(len(pairs))
+    held_out = max(1, int(len(pairs) * predictor_config.get("holdout", 0.2)))
+    test, train = order[:held_out], order[held_out:]
+
+    if verbose:
+        print(f"Training on {len(train)} pairs, holding out {len(test)}")
+
+    predictor = QualityPredictor(dim=predictor_config.get("dim", 2048))
+    predictor.fit(
+        [pairs[i] for i in train],
+        labels[train],
+        chunks,
+        epochs=predictor_config.get("epochs", 5),
+    )
+    predictor.threshold = threshold
+    predictor.accepted_rating = round(float(ratings[train][labels[train]].mean()), 2)
+    predictor.rejected_rating = round(float(ratings[train][~labels[train]].mean()), 2)
+
+    probabilities = predictor.predict_proba([pairs[i] for i in test], chunks)
+    report = evaluate_predictions(
+        probabilities,
+        labels[test],
+        accept=predictor_config.get("accept", 0.9),
+        reject=predictor_config.get("reject", 0.1),
+    )
+    report["trained_on"] = int(len(train))
+    report["threshold"] = threshold
+    predictor.report = report
+    predictor.save(output_path)
+
+    return {**report, "model": output_path}
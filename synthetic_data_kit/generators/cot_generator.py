@@ -6,12 +6,12 @@
 # Logic for generating CoT from scratch and also enhancing CoT (take existing format and add CoT)
 import os
 import json
-import re
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
 from synthetic_data_kit.models.llm_client import LLMClient
 from synthetic_data_kit.utils.config import get_prompt, get_generation_config
+from synthetic_data_kit.utils.text import find_json_values
 
 class COTGenerator:
     """Generates chain-of-thought reasoning examples"""
@@ -27,30 +27,27 @@ class COTGenerator:
         verbose = os.environ.get('SDK_VERBOSE', 'false').lower() == 'true'
         output_text = output_text.strip()
         
-        # Try to extract JSON array
-        json_match = re.search(r"\[.*\]", output_text, re.DOTALL)
-        if json_match:
-            output_text = json_match.group(0)
-        
-        try:
-            # Handle quoted JSON
-            if output_text.startswith('"') and output_text.endswith('"'):
+        # Handle quoted JSON
+        if output_text.startswith('"') and output_text.endswith('"'):
+            try:
                 output_text = json.loads(output_text)
-            
-            # Load the JSON
-            result = json.loads(output_text)
-            
-            # Ensure it's a list
-            if not isinstance(result, list):
-                if verbose:
-                    print("Warning: Expected a list but got another type")
-                return None
-            
-            return result
-        except json.JSONDecodeError as e:
-            if verbose:
-                print(f"Error parsing output: {e}")
-            return None
+            except json.JSONDecodeError:
+                pass
+        
+        # Take the first JSON array in the response
+        values = [value for value, _, _ in find_json_values(output_text)]
+        for value in values:
+            if isinstance(value, list):
+                return value
+        
+        # Objects salvaged from a truncated array
+        objects = [value for value in values if isinstance(value, dict)]
+        if objects:
+            return objects
+        
+        if verbose:
+            print("Error parsing output: no JSON array found")
+        return None
     
     def generate_cot_examples(self, document_text: str, num_examples: int = None) -> List[Dict[str, Any]]:
         """Generate chain-of-thought reasoning examples"""
@@ -83,6 +80,12 @@ class COTGenerator:
             max_tokens=max_tokens
         )
         
+        # Resume a response cut off at max_tokens instead of losing the examples
+        if getattr(response, 'truncated', False):
+            response = self.client.continue_truncated(
+                [messages], [response], temperature=temperature, max_tokens=max_tokens
+            )[0]
+        
         # Parse response
         examples = self.parse_json_output(response)
         
@@ -6,22 +6,37 @@
 # Create QA Pairs
 
 from typing import Dict, List, Any, Optional, Tuple
-import json
-import time
 import os
+import hashlib
+import threading
+import math
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn, TimeRemainingColumn
 
 from synthetic_data_kit.models.llm_client import LLMClient
-from synthetic_data_kit.utils.text import split_into_chunks
-from synthetic_data_kit.utils.rag_processor import (
-    reset_collection,
-    wrte_chunks,
+from synthetic_data_kit.utils.text import (
+    split_into_chunks_with_offsets,
+    document_id,
+    chunk_id,
+    content_hash,
 )
+from synthetic_data_kit.utils.dedup import ChunkDeduplicator, dedup_qa_pairs
+from synthetic_data_kit.utils.embeddings import Embedder
+from synthetic_data_kit.utils.manifest import GenerationManifest
+from synthetic_data_kit.utils.rating_cache import RatingCache
+from synthetic_data_kit.utils.chunk_planner import plan_chunk_allocation
+from synthetic_data_kit.utils.rag_processor import sync_document
 from synthetic_data_kit.utils.llm_processing import (
     parse_summary,
     parse_qa_pairs,
     parse_ratings,
+    rating_payload,
+    match_ratings,
+    format_rating_prompt,
+    format_logprob_rating_prompt,
+    logprob_rating,
+    pack_rating_batches,
     convert_to_conversation_format,
 )
 from synthetic_data_kit.utils.config import (
@@ -29,12 +44,26 @@ from synthetic_data_kit.utils.config import (
     get_generation_config,
     get_curate_config,
     get_prompt,
+    get_prompt_placeholders,
+    get_embedding_config,
 )
 
 
 class QAGenerator:
-    def __init__(self, client: LLMClient, config_path: Optional[Path] = None):
-        """Initialize the QA Generator with an LLM client and optional config"""
+    def __init__(
+        self,
+        client: LLMClient,
+        config_path: Optional[Path] = None,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+    ):
+        """Initialize the QA Generator with an LLM client and optional config
+
+        Args:
+            client: LLM client used for all generation calls
+            config_path: Path to config file (if None, uses default)
+            deduplicator: Shared near-duplicate chunk filter, e.g. one instance for
+                a whole directory. If None, one is built from the generation config.
+        """
         self.client = client
 
         # Load config
@@ -44,25 +73,81 @@ class QAGenerator:
         self.generation_config = get_generation_config(self.config)
         self.curate_config = get_curate_config(self.config)
 
-    def split_article_into_chunks(self, document_text: str) -> List[str]:
+        # Near-duplicate chunk filter (None when disabled in config)
+        self.deduplicator = deduplicator or ChunkDeduplicator.from_config(self.generation_config)
+
+        # Reduced summary groups from generate_summary, keyed by content hash
+        self._summary_cache: Dict[str, str] = {}
+
+        # Embedding model for question de-duplication, loaded on first use
+        self._embedder: Optional[Embedder] = None
+
+        # Stored ratings (curate.cache), opened on first use
+        self._rating_cache: Optional[RatingCache] = None
+
+        # Live progress display shared by concurrently running stages (verbose mode)
+        self._progress: Optional[Progress] = None
+        self._progress_lock = threading.Lock()
+
+    def open_manifest(self, output_dir: str, document_name: str) -> Optional[GenerationManifest]:
+        """Open a document's manifest if incremental regeneration is enabled, else None"""
+        incremental_config = self.generation_config.get("incremental", {}) or {}
+        if not incremental_config.get("enabled", False):
+            return None
+        return GenerationManifest.for_document(
+            output_dir, document_name, incremental_config.get("manifest_dir", ".manifests")
+        )
+
+    def split_article_into_chunks(
+        self, document_text: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None
+    ) -> List[str]:
         """Split text into chunks with optional overlap"""
+        return [
+            chunk
+            for _, chunk in self.split_article_into_chunks_with_offsets(
+                document_text, chunk_size=chunk_size, overlap=overlap
+            )
+        ]
+
+    def split_article_into_chunks_with_offsets(
+        self, document_text: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None
+    ) -> List[Tuple[int, str]]:
+        """Split text into ``(offset, chunk)`` pairs with optional overlap
+
+        ``chunk_size`` and ``overlap`` override the generation config for this call only.
+        """
         # Get generation config
-        chunk_size = self.generation_config.get("chunk_size", 4000)
-        overlap = self.generation_config.get("overlap", 200)
+        if chunk_size is None:
+            chunk_size = self.generation_config.get("chunk_size", 4000)
+        if overlap is None:
+            overlap = self.generation_config.get("overlap", 200)
         # Split text into chunks
-        chunks = split_into_chunks(document_text, chunk_size=chunk_size, overlap=overlap)
-        return chunks
+        return split_into_chunks_with_offsets(document_text, chunk_size=chunk_size, overlap=overlap)
 
     def generate_summary(
-        self, document_text: str, fileName: str = None, enable_rag: bool = False
+        self,
+        document_text: str,
+        fileName: str = None,
+        enable_rag: bool = False,
+        manifest: Optional[GenerationManifest] = None,
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None,
+        verbose: Optional[bool] = None,
     ) -> str:
-        """Generate a summary of the document"""
-        verbose = os.environ.get("SDK_VERBOSE", "false").lower() == "true"
+        """Generate a summary of the document
+
+        With a manifest, chunk summaries, reduced groups and the final summary
+        are reused for any request that has not changed since the last run.
+        """
+        verbose = self._verbose(verbose)
         batch_size = self.generation_config.get("batch_size", 32)
         max_seq_len = self.generation_config.get("max_seq_len", 4000) - 1000
 
         # Split text into chunks
-        chunks = self.split_article_into_chunks(document_text)
+        chunk_offsets = self.split_article_into_chunks_with_offsets(
+            document_text, chunk_size=chunk_size, overlap=overlap
+        )
+        chunks = [chunk for _, chunk in chunk_offsets]
 
         # Get summary generation prompt template
         summary_prompt_template = get_prompt(self.config, "summary")
@@ -86,35 +171,41 @@ class QAGenerator:
             if verbose:
                 print(f"Messages: {all_messages}")
 
-            summaries = self.batch_inference(all_messages, chunks, parse_summary)
+            # Stored summaries keep the id of the run that made them; chunks may have moved since
+            summaries = self.cached_inference(
+                "chunk_summary",
+                all_messages,
+                chunks,
+                parse_summary,
+                manifest,
+                annotate=lambda index, summary: {**summary, "id": index},
+                verbose=verbose,
+            )
 
             """
             Write chunks with metadata into vector database
             because batch_inference may return empty data, we have to map chunkid to summary
             """
             if enable_rag:
-                fileNames = [fileName for i in range(len(chunks))]
-                metas = [
-                    {"filename": f, "id": s["id"], "summary": s["data"]}
-                    for f, s in zip(fileNames, summaries)
-                ]
-                rag_chunks = []
-                rag_metas = []
-                rag_summary = []
-                for item in metas:
-                    rag_chunks.append(chunks[item["id"]])
-                    rag_metas.append({"filename": item["filename"], "summary": item["summary"]})
-                    rag_summary.append(item["summary"])
-                reset_collection()
-                wrte_chunks(rag_chunks, rag_metas)
+                # Only this document's changed chunks are written; other documents stay indexed
+                sync_document(
+                    fileName,
+                    [chunk_offsets[s["id"]] for s in summaries],
+                    [{"summary": s["data"]} for s in summaries],
+                    config=self.config,
+                )
 
             summaries = list(map(lambda x: x.get("data"), summaries))
-            combined_summary = "\n".join(summaries)
+
+            # Reduce the chunk summaries level by level until they fit in one request
+            combined_summary = self.reduce_summaries(
+                summaries, max_seq_len, manifest=manifest, verbose=verbose
+            )
 
             # Get summary generation prompt template for consolidation
             messages = [
                 {"role": "system", "content": summary_prompt_template},
-                {"role": "user", "content": combined_summary[:max_seq_len]},
+                {"role": "user", "content": combined_summary},
             ]
         else:
             messages = [
@@ -122,12 +213,197 @@ class QAGenerator:
                 {"role": "user", "content": document_text[:max_seq_len]},
             ]
 
+        summary_key = None
+        if manifest is not None:
+            summary_key = manifest.key("summary", self._model_id(), 0.1, messages)
+            cached_summary = manifest.get(summary_key)
+            if cached_summary is not None:
+                print("Summary unchanged, reusing previous result")
+                return cached_summary
+
         print(f"Summarizing chunks sector output of {len(str(messages))} ...")
         consolidated_summary = self.client.chat_completion(
             messages, temperature=0.1  # Use lower temperature for summaries
-        )
+        ).strip()
+
+        if summary_key is not None and not consolidated_summary.startswith("ERROR:"):
+            manifest.put(summary_key, consolidated_summary)
+        return consolidated_summary
+
+    def reduce_summaries(
+        self,
+        summaries: List[str],
+        budget: int,
+        manifest: Optional[GenerationManifest] = None,
+        verbose: Optional[bool] = None,
+    ) -> str:
+        """Tree-reduce chunk summaries until they fit in a single request
+
+        Summaries are packed into groups of at most ``budget`` characters and each
+        group is summarised in parallel, level by level, so every chunk contributes
+        to the final summary instead of being cut off by truncation. Reduced groups
+        are cached by content (and persisted in ``manifest`` if given), so repeated
+        calls only summarise what changed.
+
+        Returns:
+            Text of the last level, joined and within ``budget`` characters
+        """
+        verbose = self._verbose(verbose)
+        batch_size = self.generation_config.get("batch_size", 32)
+        summary_prompt_template = get_prompt(self.config, "summary")
+
+        # Clip oversized items so every group holds at least two and each level shrinks
+        item_budget = max(1, (budget - 1) // 2)
+        level = [summary[:item_budget] for summary in summaries if summary]
+        depth = 0
+
+        while len("\n".join(level)) > budget:
+            groups = []
+            for summary in level:
+                if groups and len(groups[-1]) + 1 + len(summary) <= budget:
+                    groups[-1] += "\n" + summary
+                else:
+                    groups.append(summary)
+
+            depth += 1
+            manifest_keys = {}
+            if manifest is not None:
+                for group in dict.fromkeys(groups):
+                    key = manifest.key("reduce", self._model_id(), summary_prompt_template, group)
+                    manifest_keys[group] = key
+                    if self._cache_key(group) not in self._summary_cache:
+                        cached = manifest.get(key)
+                        if cached is not None:
+                            self._summary_cache[self._cache_key(group)] = cached
+            todo = [g for g in dict.fromkeys(groups) if self._cache_key(g) not in self._summary_cache]
+            print(
+                f"Reducing {len(level)} summaries into {len(groups)} groups (level {depth}, "
+                f"{len(groups) - len(todo)} cached)..."
+            )
+
+            if todo:
+                all_messages = [
+                    [
+                        {"role": "system", "content": summary_prompt_template},
+                        {"role": "user", "content": group},
+                    ]
+                    for group in todo
+                ]
+                responses = self.client.batch_completion(
+                    all_messages, temperature=0.1, batch_size=batch_size
+                )
+                for group, response in zip(todo, responses):
+                    if not isinstance(response, str) or response.startswith("ERROR:"):
+                        if verbose:
+                            print(f"  Failed to reduce group at level {depth}: {response}")
+                        continue
+                    self._summary_cache[self._cache_key(group)] = response.strip()[:item_budget]
+                    if group in manifest_keys:
+                        manifest.put(manifest_keys[group], self._summary_cache[self._cache_key(group)])
+
+            # Groups that failed to reduce fall back to a clipped copy of their input
+            level = [
+                self._summary_cache.get(self._cache_key(group), group[:item_budget])
+                for group in groups
+            ]
+
+        return "\n".join(level)
 
-        return consolidated_summary.strip()
+    @staticmethod
+    def _verbose(verbose: Optional[bool]) -> bool:
+        """Explicit verbosity, else SDK_VERBOSE for callers that do not pass one"""
+        if verbose is not None:
+            return verbose
+        return os.environ.get("SDK_VERBOSE", "false").lower() == "true"
+
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _model_id(self) -> str:
+        return str(getattr(self.client, "model", ""))
+
+    def _manifest_lookup(
+        self, kind: str, all_messages: List[List[Dict[str, str]]], manifest: GenerationManifest
+    ) -> Tuple[List[str], Dict[int, Any]]:
+        """Manifest keys for each request, and the stored results that can be reused"""
+        temperature = self.generation_config.get("temperature", 0.7)
+        keys = [
+            manifest.key(kind, self._model_id(), temperature, messages) for messages in all_messages
+        ]
+        cached = {}
+        for i, key in enumerate(keys):
+            value = manifest.get(key)
+            if value is not None:
+                cached[i] = value
+        return keys, cached
+
+    @staticmethod
+    def _annotated(taskFunc, annotate):
+        if annotate is None:
+            return taskFunc
+        return lambda index, response: annotate(index, taskFunc(index, response))
+
+    @staticmethod
+    def _annotate_results(results: Dict[int, Any], annotate) -> Dict[int, Any]:
+        if annotate is None:
+            return results
+        return {i: annotate(i, value) for i, value in results.items()}
+
+    @staticmethod
+    def _flatten_results(results: Dict[int, Any]) -> List[Any]:
+        outputs = []
+        for i in sorted(results):
+            if isinstance(results[i], list):
+                outputs.extend(results[i])
+            else:
+                outputs.append(results[i])
+        return outputs
+
+    def cached_inference(
+        self,
+        kind: str,
+        all_messages: List[List[Dict[str, str]]],
+        chunks: List[str],
+        taskFunc,
+        manifest: Optional[GenerationManifest] = None,
+        annotate=None,
+        verbose: Optional[bool] = None,
+    ) -> List[Any]:
+        """batch_inference that only sends requests the manifest has no result for
+
+        Stored results are spliced back in request order. taskFunc still sees the
+        request's index in ``all_messages``. ``annotate(index, results)`` is
+        applied to fresh and stored results alike, and is not stored itself.
+        """
+        if manifest is None:
+            return self.batch_inference(
+                all_messages, chunks, self._annotated(taskFunc, annotate), verbose=verbose
+            )
+
+        keys, results = self._manifest_lookup(kind, all_messages, manifest)
+        misses = [i for i in range(len(all_messages)) if i not in results]
+        print(f"Reusing {len(results)} of {len(all_messages)} {kind} results from the manifest")
+
+        if misses:
+
+            def collect(position, response):
+                index = misses[position]
+                parsed = taskFunc(index, response)
+                results[index] = parsed
+                # Empty parses are retried next run rather than remembered
+                if parsed:
+                    manifest.put(keys[index], parsed)
+                return parsed
+
+            self.batch_inference(
+                [all_messages[i] for i in misses],
+                [chunks[i] for i in misses],
+                collect,
+                verbose=verbose,
+            )
+
+        return self._flatten_results(self._annotate_results(results, annotate))
 
     def generate_qa_pairs(
         self,
@@ -136,126 +412,356 @@ class QAGenerator:
         num_pairs: int = 25,
         fileName: str = None,
         enable_rag: bool = False,
+        manifest: Optional[GenerationManifest] = None,
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None,
+        verbose: Optional[bool] = None,
     ) -> List[Dict[str, str]]:
-        """Generate QA pairs from the document using batched processing"""
-        verbose = os.environ.get("SDK_VERBOSE", "false").lower() == "true"
+        """Generate QA pairs from the document using batched processing
+
+        With a manifest, chunks whose request (text, prompt, pair count, model)
+        is unchanged since the last run reuse their stored pairs.
+        """
+        verbose = self._verbose(verbose)
         batch_size = self.generation_config.get("batch_size", 32)
 
         # Split text into chunks
-        chunks = self.split_article_into_chunks(document_text)
-        pairs_per_chunk = max(1, round(num_pairs / len(chunks)))
+        chunk_offsets = self.split_article_into_chunks_with_offsets(
+            document_text, chunk_size=chunk_size, overlap=overlap
+        )
+        chunks = [chunk for _, chunk in chunk_offsets]
+
+        # Drop near-duplicate chunks before they reach the LLM
+        if self.deduplicator is not None:
+            kept = self.deduplicator.filter_chunks(chunks, source=fileName)
+            if len(kept) < len(chunks):
+                print(f"Skipping {len(chunks) - len(kept)} near-duplicate chunks")
+            chunk_offsets = [chunk_offsets[i] for i in kept]
+            chunks = [chunks[i] for i in kept]
+            if not chunks:
+                return []
+
+        # Stream mode asks for a margin on top of num_pairs to absorb curation losses
+        early_stop = self.generation_config.get("early_stop", {}) or {}
+        streaming = early_stop.get("enabled", False)
+        target = num_pairs
+        if streaming:
+            target = math.ceil(num_pairs * (1 + early_stop.get("overgenerate_ratio", 0.2)))
+
+        # Only query as many chunks as the pair budget needs, picking ones that cover the document
+        plan = plan_chunk_allocation(
+            chunks,
+            target,
+            max_pairs_per_chunk=self.generation_config.get("max_pairs_per_chunk", 5),
+            strategy=self.generation_config.get("chunk_selection", "coverage"),
+            include_backups=streaming,
+        )
+        planned_chunks = [chunks[index] for index, _ in plan]
+
+        # Every pair records the chunk it came from, so curation can look the text up by id
+        doc_id = self.document_id(document_text, fileName)
+        sources = [self.chunk_source(doc_id, *chunk_offsets[index]) for index, _ in plan]
+
+        def add_source(index, pairs):
+            if index >= len(sources):
+                return pairs
+            return [{**pair, "source": sources[index]} for pair in pairs]
 
         print(f"Generating QA pairs...")
         print(f"Document split into {len(chunks)} chunks")
-        print(f"With {pairs_per_chunk} QA pairs in a chunk")
+        if streaming:
+            print(f"Streaming chunks in priority order until {target} QA pairs are collected")
+        else:
+            print(f"Querying {len(plan)} of them for {num_pairs} QA pairs")
 
         # Get QA generation prompt template
         qa_prompt_template = get_prompt(self.config, "qa_generation")
 
         # Prepare all message batches
         all_messages = []
-        for i, chunk in enumerate(chunks):
+        for index, pairs in plan:
             # Format the prompt with summary and text
             qa_prompt = qa_prompt_template.format(
-                num_pairs=pairs_per_chunk, summary=summary[:1000], text=chunk
+                num_pairs=pairs, summary=summary[:1000], text=chunks[index]
             )
 
             messages = [{"role": "system", "content": qa_prompt}]
             all_messages.append(messages)
 
+        if streaming:
+            result = self.cached_stream_inference(
+                all_messages,
+                [pairs for _, pairs in plan],
+                target,
+                parse_qa_pairs,
+                manifest,
+                annotate=add_source,
+                verbose=verbose,
+            )
+        else:
+            print(f"Processing {len(plan)} chunks to generate {num_pairs} QA pairs...")
+            result = self.cached_inference(
+                "qa_pairs",
+                all_messages,
+                planned_chunks,
+                parse_qa_pairs,
+                manifest,
+                annotate=add_source,
+                verbose=verbose,
+            )
+        return self.drop_duplicate_questions(result)
+
+    @staticmethod
+    def document_id(document_text: str, fileName: Optional[str] = None) -> str:
+        """Id of the source document: from its path, or its content when there is none"""
+        if fileName:
+            return document_id(fileName)
+        return content_hash(document_text)[:16]
+
+    @staticmethod
+    def chunk_source(doc_id: str, offset: int, chunk: str) -> Dict[str, Any]:
+        """Provenance of pairs generated from one chunk
+
+        ``chunk_id`` matches the id the chunk is indexed under in the RAG store.
+        """
+        return {
+            "doc_id": doc_id,
+            "chunk_id": chunk_id(doc_id, offset),
+            "start": offset,
+            "end": offset + len(chunk),
+        }
+
+    @staticmethod
+    def source_chunks(document_text: str, qa_pairs: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Text of every chunk referenced by the pairs, keyed by chunk id"""
+        chunks = {}
+        for pair in qa_pairs:
+            source = pair.get("source")
+            if source and source["chunk_id"] not in chunks:
+                chunks[source["chunk_id"]] = document_text[source["start"] : source["end"]]
+        return chunks
+
+    def cached_stream_inference(
+        self,
+        all_messages: List[List[Dict[str, str]]],
+        budgets: List[int],
+        target: int,
+        taskFunc,
+        manifest: Optional[GenerationManifest] = None,
+        annotate=None,
+        verbose: Optional[bool] = None,
+    ) -> List[Dict[str, str]]:
+        """stream_inference that counts stored manifest results towards the target first"""
+        if manifest is None:
+            return self.stream_inference(
+                all_messages, budgets, target, self._annotated(taskFunc, annotate), verbose=verbose
+            )
+
+        keys, results = self._manifest_lookup("qa_pairs", all_messages, manifest)
+        # Stored results are used in priority order until they alone meet the target
+        collected = 0
+        for i in sorted(results):
+            if collected >= target:
+                del results[i]
+                continue
+            collected += len(results[i])
+        misses = [i for i in range(len(all_messages)) if i not in results]
+        print(f"Reusing {collected} stored QA pairs from {len(results)} chunks")
+
+        if collected < target and misses:
+
+            def collect(position, response):
+                index = misses[position]
+                parsed = taskFunc(index, response)
+                results[index] = parsed
+                if parsed:
+                    manifest.put(keys[index], parsed)
+                return parsed
+
+            self.stream_inference(
+                [all_messages[i] for i in misses],
+                [budgets[i] for i in misses],
+                target - collected,
+                collect,
+                verbose=verbose,
+            )
+
+        return self._flatten_results(self._annotate_results(results, annotate))
+
+    def drop_duplicate_questions(self, qa_pairs: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Remove pairs whose question embeds close to an earlier one (generation.qa_dedup)"""
+        qa_dedup_config = self.generation_config.get("qa_dedup", {}) or {}
+        if not qa_dedup_config.get("enabled", False) or len(qa_pairs) < 2:
+            return qa_pairs
+
+        if self._embedder is None:
+            self._embedder = Embedder.from_config(get_embedding_config(self.config))
+        kept = dedup_qa_pairs(
+            qa_pairs,
+            self._embedder,
+            threshold=qa_dedup_config.get("threshold", 0.92),
+            block_size=qa_dedup_config.get("block_size", 1024),
+        )
+        if len(kept) < len(qa_pairs):
+            print(f"Dropped {len(qa_pairs) - len(kept)} near-duplicate questions")
+        return kept
+
+    def stream_inference(
+        self,
+        all_messages: List[List[Dict[str, str]]],
+        budgets: List[int],
+        target: int,
+        taskFunc,
+        verbose: Optional[bool] = None,
+    ) -> List[Dict[str, str]]:
+        """Inference that stops once enough results have been collected
+
+        Requests are submitted in order, but only while the results collected so
+        far plus those expected from in-flight requests fall short of ``target``.
+        A request that comes back short pulls in the next one; once ``target`` is
+        reached everything still outstanding is cancelled.
+
+        Args:
+            all_messages: Messages per request, in priority order
+            budgets: Number of results each request asks for
+            target: Number of results to collect before stopping
+            taskFunc: Parser called as taskFunc(index, response)
+            verbose: Print per-request detail (defaults to SDK_VERBOSE)
+
+        Returns:
+            Parsed results in priority order
+        """
+        verbose = self._verbose(verbose)
+        temperature = self.generation_config.get("temperature", 0.7)
+        batch_size = self.generation_config.get("batch_size", 32)
+
+        results: Dict[int, List[Dict[str, str]]] = {}
+        collected = 0
+        expected = 0
+        next_request = 0
+
+        # Truncated responses are resumed on the stream's own workers, so they
+        # never hold up responses that finish after them
+        with self.client.stream_completions(
+            temperature=temperature, max_in_flight=batch_size, continue_truncated=True
+        ) as stream:
+
+            def top_up():
+                nonlocal next_request, expected
+                while next_request < len(all_messages) and collected + expected < target:
+                    stream.submit(next_request, all_messages[next_request])
+                    expected += budgets[next_request]
+                    next_request += 1
+
+            top_up()
+            for position, messages, response in stream.as_completed():
+                expected -= budgets[position]
+
+                items = []
+                if response.startswith("ERROR:"):
+                    if verbose:
+                        print(f"  Request {position + 1} failed: {response}")
+                else:
+                    try:
+                        items = taskFunc(position, response)
+                    except Exception as e:
+                        if verbose:
+                            print(f"  Error parsing response {position + 1}: {str(e)}")
+                results[position] = items
+                collected += len(items)
+
+                if verbose:
+                    print(f"Generated {len(items)} pairs from chunk {position + 1}")
+                if collected >= target:
+                    break
+                top_up()
+
+            cancelled = stream.in_flight
+
         print(
-            f"Processing {len(chunks)} chunks to generate {pairs_per_chunk} QA pairs per chunk..."
+            f"Collected {collected} results from {len(results)} of {len(all_messages)} chunks"
+            + (f" (cancelled {cancelled} in flight)" if cancelled else "")
         )
-        result = self.batch_inference(all_messages, chunks, parse_qa_pairs)
-        return result
+        return [item for position in sorted(results) for item in results[position]]
 
     def batch_inference(
-        self, all_messages: str, chunks: List[str], taskFunc
+        self, all_messages: str, chunks: List[str], taskFunc, verbose: Optional[bool] = None
     ) -> List[Dict[str, str]]:
         """Inference using batched processing"""
-        verbose = os.environ.get("SDK_VERBOSE", "false").lower() == "true"
+        verbose = self._verbose(verbose)
         temperature = self.generation_config.get("temperature", 0.7)
         batch_size = self.generation_config.get("batch_size", 32)
-        # Set up progress tracking based on verbose mode
+        # Concurrent stages share one live display, one task each
         if verbose:
-            from rich.progress import (
-                Progress,
-                BarColumn,
-                TextColumn,
-                TimeElapsedColumn,
-                TimeRemainingColumn,
+            progress_ctx, generate_task = self._add_progress_task(
+                "Generating batch inference output", total=len(chunks)
             )
-
-            progress_columns = [
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                TimeElapsedColumn(),
-                TimeRemainingColumn(),
-            ]
-
-            progress_ctx = Progress(*progress_columns)
-            generate_task = progress_ctx.add_task(
-                f"Generating batch inference output", total=len(chunks)
-            )
-            progress_ctx.start()
         else:
             progress_ctx = None
             generate_task = None
 
         all_inference_outputs = []
-        # Process in batches
-        for batch_start in range(0, len(chunks), batch_size):
-            batch_end = min(batch_start + batch_size, len(chunks))
-            batch_messages = all_messages[batch_start:batch_end]
-            current_batch_size = len(batch_messages)
-
-            batch_num = batch_start // batch_size + 1
-            total_batches = (len(chunks) + batch_size - 1) // batch_size
-
-            # Simple progress indicator for non-verbose mode
-            if not verbose:
-                print(f"Processing batch {batch_num}/{total_batches}...", end="\r")
-            else:
-                print(
-                    f"Processing batch {batch_num}/{total_batches} with {current_batch_size} chunks ..."
-                )
+        try:
+            # Process in batches
+            for batch_start in range(0, len(chunks), batch_size):
+                batch_end = min(batch_start + batch_size, len(chunks))
+                batch_messages = all_messages[batch_start:batch_end]
+                current_batch_size = len(batch_messages)
+
+                batch_num = batch_start // batch_size + 1
+                total_batches = (len(chunks) + batch_size - 1) // batch_size
+
+                # Simple progress indicator for non-verbose mode
+                if not verbose:
+                    print(f"Processing batch {batch_num}/{total_batches}...", end="\r")
+                else:
+                    print(
+                        f"Processing batch {batch_num}/{total_batches} with {current_batch_size} chunks ..."
+                    )
 
-            try:
-                # Process the batch
-                batch_responses = self.client.batch_completion(
-                    batch_messages, temperature=temperature, batch_size=batch_size
-                )
-
-                # Process each response in the batch
-                for j, response in enumerate(batch_responses):
-                    chunk_index = batch_start + j
-                    chunk_pairs = taskFunc(chunk_index, response)
-                    if isinstance(chunk_pairs, list):
-                        all_inference_outputs.extend(chunk_pairs)
-                    else:
-                        all_inference_outputs.append(chunk_pairs)
+                try:
+                    # Process the batch
+                    batch_responses = self.client.batch_completion(
+                        batch_messages, temperature=temperature, batch_size=batch_size
+                    )
+
+                    # Resume responses cut off at max_tokens rather than losing the chunk
+                    if any(getattr(response, "truncated", False) for response in batch_responses):
+                        batch_responses = self.client.continue_truncated(
+                            batch_messages,
+                            batch_responses,
+                            temperature=temperature,
+                            batch_size=batch_size,
+                        )
+
+                    # Process each response in the batch
+                    for j, response in enumerate(batch_responses):
+                        chunk_index = batch_start + j
+                        chunk_pairs = taskFunc(chunk_index, response)
+                        if isinstance(chunk_pairs, list):
+                            all_inference_outputs.extend(chunk_pairs)
+                        else:
+                            all_inference_outputs.append(chunk_pairs)
+
+                        if verbose:
+                            print(f"Generated {len(chunk_pairs)} pairs from chunk {chunk_index+1}")
+                            if len(chunk_pairs) == 0:
+                                print(f"Empty resultset found {batch_messages}")
+
+                    # Update progress bar if in verbose mode
+                    if progress_ctx is not None:
+                        progress_ctx.update(generate_task, advance=current_batch_size)
 
+                except Exception as e:
                     if verbose:
-                        print(f"Generated {len(chunk_pairs)} pairs from chunk {chunk_index+1}")
-                        if len(chunk_pairs) == 0:
-                            print(f"Empty resultset found {batch_messages}")
-
-                # Update progress bar if in verbose mode
-                if progress_ctx and generate_task:
-                    progress_ctx.update(generate_task, advance=current_batch_size)
-
-            except Exception as e:
-                if verbose:
-                    print(f"  Error processing batch {batch_num}: {str(e)}")
+                        print(f"  Error processing batch {batch_num}: {str(e)}")
 
-                # Update progress bar if in verbose mode
-                if progress_ctx and generate_task:
-                    progress_ctx.update(generate_task, advance=current_batch_size)
-
-        # Stop progress bar if in verbose mode
-        if progress_ctx:
-            progress_ctx.stop()
+                    # Update progress bar if in verbose mode
+                    if progress_ctx is not None:
+                        progress_ctx.update(generate_task, advance=current_batch_size)
+        finally:
+            if progress_ctx is not None:
+                self._remove_progress_task(generate_task)
 
         # Clear the progress line in non-verbose mode
         if not verbose:
@@ -266,6 +772,306 @@ class QAGenerator:
         print(f"Generated {len(all_inference_outputs)} chunks output in total")
         return all_inference_outputs
 
+    def _add_progress_task(self, description: str, total: int) -> Tuple[Progress, Any]:
+        """Add a task to the progress display shared by this generator's running stages
+
+        Rich allows one live display at a time, so the first stage starts it
+        and the last one to finish stops it.
+        """
+        with self._progress_lock:
+            if self._progress is None:
+                progress = Progress(
+                    TextColumn("[progress.description]{task.description}"),
+                    BarColumn(),
+                    TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+                    TimeElapsedColumn(),
+                    TimeRemainingColumn(),
+                )
+                progress.start()
+                self._progress = progress
+            return self._progress, self._progress.add_task(description, total=total)
+
+    def _remove_progress_task(self, task: Any):
+        with self._progress_lock:
+            self._progress.remove_task(task)
+            if not self._progress.tasks:
+                self._progress.stop()
+                self._progress = None
+
+    def rate_pairs(
+        self,
+        qa_pairs: List[Dict[str, Any]],
+        chunks: Optional[Dict[str, str]] = None,
+        max_batch_size: Optional[int] = None,
+        temperature: Optional[float] = None,
+        inference_batch: Optional[int] = None,
+        on_settled=None,
+        judge: Optional["QAGenerator"] = None,
+        threshold: Optional[float] = None,
+        band: float = 1.0,
+    ) -> List[Dict[str, Any]]:
+        """Rate QA pairs, reusing cached ratings and retrying failed batches concurrently
+
+        With curate.cache enabled, stored ratings from this model and prompt are
+        looked up first, and only the other pairs are packed into prompts that
+        fill ``curate.max_prompt_tokens`` (see ``pack_rating_batches``).
+
+        Every round sends all pending batches through the client's concurrent
+        batch path. A batch whose response fails or cannot be parsed is split in
+        half for the next round, down to single pairs; pairs a response left
+        unrated are re-queued together, and a single pair whose rating fails is
+        dropped. Retries therefore run side by side instead of as one request
+        per pair.
+
+        With ``judge``, this generator's (cheap) model rates first; pairs rated
+        within ``band`` of ``threshold``, and pairs it failed to rate, are rated
+        again by the judge, whose rating replaces the first one.
+
+        Args:
+            qa_pairs: Pairs to rate
+            chunks: Source passages by chunk id, attached to the prompt as context
+            max_batch_size: Most pairs per prompt (default: curate.batch_size)
+            on_settled: Called with the number of pairs rated or dropped after each round
+            judge: Generator whose model decides borderline pairs
+            threshold: Rating the judge's band is centred on
+
+        Returns:
+            The rated pairs (original pairs plus ``rating`` and ``rating_source``,
+            the model that rated them), in input order
+        """
+        ratings = self._rate_pairs(
+            qa_pairs, chunks, max_batch_size, temperature, inference_batch, on_settled
+        )
+        if judge is not None:
+            escalate = [
+                i
+                for i in range(len(qa_pairs))
+                if i not in ratings or abs(ratings[i]["rating"] - threshold) <= band
+            ]
+            print(
+                f"Escalating {len(escalate)} of {len(qa_pairs)} borderline pairs "
+                f"to {judge._model_id()}"
+            )
+            if escalate:
+                judged = judge._rate_pairs(
+                    [qa_pairs[i] for i in escalate],
+                    chunks,
+                    max_batch_size,
+                    temperature,
+                    inference_batch,
+                )
+                ratings.update((escalate[j], pair) for j, pair in judged.items())
+        return [ratings[i] for i in sorted(ratings)]
+
+    def cached_ratings(
+        self, qa_pairs: List[Dict[str, Any]], chunks: Optional[Dict[str, str]] = None
+    ) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """Stored ratings by position in ``qa_pairs``, and the positions without one
+
+        Without curate.cache every position is a miss.
+        """
+        cache = self.rating_cache()
+        if cache is None or not qa_pairs:
+            return {}, list(range(len(qa_pairs)))
+        keys = self._rating_keys(qa_pairs, chunks)
+        stored = cache.get_many(keys)
+        model_id = self._model_id()
+        found = {
+            i: {**pair, "rating": stored[key], "rating_source": model_id}
+            for i, (pair, key) in enumerate(zip(qa_pairs, keys))
+            if key in stored
+        }
+        if found:
+            print(f"Reusing {len(found)} of {len(qa_pairs)} cached ratings from {model_id}")
+        return found, [i for i in range(len(qa_pairs)) if i not in found]
+
+    def _rating_prompt_template(self) -> str:
+        logprob_mode = self.curate_config.get("rating_mode", "json") == "logprob"
+        return get_prompt(self.config, "qa_rating_logprob" if logprob_mode else "qa_rating")
+
+    def _rating_keys(
+        self, qa_pairs: List[Dict[str, Any]], chunks: Optional[Dict[str, str]]
+    ) -> List[str]:
+        """Rating cache keys of the pairs for this model and rating prompt"""
+        rubric = content_hash(self._rating_prompt_template())
+        model_id = self._model_id()
+        cache = self.rating_cache()
+        return [
+            cache.key(pair["question"], pair["answer"], rubric, model_id, item.get("context"))
+            for pair, item in zip(qa_pairs, rating_payload(qa_pairs, chunks))
+        ]
+
+    def _rate_pairs(
+        self,
+        qa_pairs: List[Dict[str, Any]],
+        chunks: Optional[Dict[str, str]] = None,
+        max_batch_size: Optional[int] = None,
+        temperature: Optional[float] = None,
+        inference_batch: Optional[int] = None,
+        on_settled=None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """Rated pairs by position in ``qa_pairs``; see ``rate_pairs``"""
+        ratings, misses = self.cached_ratings(qa_pairs, chunks)
+        if ratings and on_settled is not None:
+            on_settled(len(ratings))
+        if not misses:
+            return ratings
+
+        pairs = [qa_pairs[i] for i in misses]
+        if self.curate_config.get("rating_mode", "json") == "logprob":
+            # Each pair is its own single-token request
+            groups = [[j] for j in range(len(pairs))]
+        else:
+            if max_batch_size is None:
+                max_batch_size = self.curate_config.get("batch_size", 32)
+            batches = pack_rating_batches(
+                pairs,
+                get_prompt(self.config, "qa_rating"),
+                self.curate_config.get("max_prompt_tokens", 4000),
+                max_batch_size=max_batch_size,
+                chunks=chunks,
+            )
+            groups, start = [], 0
+            for batch in batches:
+                groups.append(list(range(start, start + len(batch))))
+                start += len(batch)
+
+        rated = self._rate_groups(pairs, groups, chunks, temperature, inference_batch, on_settled)
+        cache = self.rating_cache()
+        if cache is not None and rated:
+            positions = sorted(rated)
+            keys = self._rating_keys([pairs[j] for j in positions], chunks)
+            cache.put_many({key: rated[j]["rating"] for key, j in zip(keys, positions)})
+        ratings.update((misses[j], pair) for j, pair in rated.items())
+        return ratings
+
+    def _rate_groups(
+        self,
+        pairs: List[Dict[str, Any]],
+        groups: List[List[int]],
+        chunks: Optional[Dict[str, str]] = None,
+        temperature: Optional[float] = None,
+        inference_batch: Optional[int] = None,
+        on_settled=None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """Rated pairs by index into ``pairs``, one prompt per group; see ``rate_pairs``
+
+        With curate.rating_mode "logprob", each group holds one pair, answered
+        with one score token; its rating is the expected score over that
+        token's top logprobs.
+        """
+        verbose = os.environ.get("SDK_VERBOSE", "false").lower() == "true"
+        if temperature is None:
+            temperature = self.curate_config.get("temperature", 0.1)
+        if inference_batch is None:
+            inference_batch = self.curate_config.get("inference_batch", 32)
+        logprob_mode = self.curate_config.get("rating_mode", "json") == "logprob"
+        rating_prompt_template = self._rating_prompt_template()
+
+        model_id = self._model_id()
+        ratings: Dict[int, Dict[str, Any]] = {}
+
+        pending = [group for group in groups if group]
+        first_round = True
+        while pending:
+            if not first_round:
+                retried = sum(len(group) for group in pending)
+                print(f"Retrying {retried} pairs in {len(pending)} batches")
+            first_round = False
+
+            all_messages = [
+                [
+                    {
+                        "role": "system",
+                        "content": (
+                            format_logprob_rating_prompt(
+                                rating_prompt_template, pairs[group[0]], chunks
+                            )
+                            if logprob_mode
+                            else format_rating_prompt(
+                                rating_prompt_template, [pairs[i] for i in group], chunks
+                            )
+                        ),
+                    }
+                ]
+                for group in pending
+            ]
+            try:
+                if logprob_mode:
+                    responses = self.client.batch_completion(
+                        all_messages,
+                        temperature=temperature,
+                        max_tokens=1,
+                        batch_size=inference_batch,
+                        top_logprobs=self.curate_config.get("top_logprobs", 20),
+                    )
+                else:
+                    responses = self.client.batch_completion(
+                        all_messages, temperature=temperature, batch_size=inference_batch
+                    )
+                if not logprob_mode and any(
+                    getattr(response, "truncated", False) for response in responses
+                ):
+                    responses = self.client.continue_truncated(
+                        all_messages, responses, temperature=temperature, batch_size=inference_batch
+                    )
+            except Exception as e:
+                if verbose:
+                    print(f"Rating request failed: {str(e)}")
+                responses = []
+
+            retry: List[List[int]] = []
+            settled = 0
+            for position, group in enumerate(pending):
+                response = responses[position] if position < len(responses) else "ERROR: no response"
+                matched = {}
+                try:
+                    if response.startswith("ERROR:"):
+                        raise ValueError(response)
+                    if logprob_mode:
+                        matched = {0: logprob_rating(response)}
+                    else:
+                        matched = match_ratings(
+                            [pairs[i] for i in group], parse_ratings(response)
+                        )
+                except Exception as e:
+                    if verbose:
+                        print(f"Error rating batch of {len(group)} pairs: {str(e)}")
+
+                for j, rating in matched.items():
+                    ratings[group[j]] = {
+                        **pairs[group[j]],
+                        "rating": rating,
+                        "rating_source": model_id,
+                    }
+                unrated = [i for j, i in enumerate(group) if j not in matched]
+
+                settled += len(group) - len(unrated)
+                if not unrated:
+                    continue
+                if len(unrated) < len(group):
+                    # The response was usable; only the pairs it skipped go again
+                    retry.append(unrated)
+                elif len(group) > 1:
+                    half = len(group) // 2
+                    retry.extend([group[:half], group[half:]])
+                else:
+                    settled += 1
+            pending = retry
+            if on_settled is not None:
+                on_settled(settled)
+
+        return ratings
+
+    def rating_cache(self) -> Optional[RatingCache]:
+        """The rating cache if curate.cache is enabled, else None"""
+        cache_config = self.curate_config.get("cache", {}) or {}
+        if not cache_config.get("enabled", False):
+            return None
+        if self._rating_cache is None:
+            self._rating_cache = RatingCache(cache_config.get("path", "data/cache/ratings.sqlite"))
+        return self._rating_cache
+
     def rate_qa_pairs(
         self, qa_pairs: List[Dict[str, str]], summary: str, threshold: Optional[float] = None
     ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
@@ -286,15 +1092,6 @@ class QAGenerator:
         batch_size = self.curate_config.get("batch_size", 8)
         temperature = self.curate_config.get("temperature", 0.1)
 
-        # Get rating prompt template
-        rating_prompt_template = get_prompt(self.config, "qa_rating")
-
-        # Process in batches
-        batches = [qa_pairs[i : i + batch_size] for i in range(0, len(qa_pairs), batch_size)]
-
-        rated_pairs = []
-        total_score = 0
-
         # Create progress bar
         progress_columns = [
             TextColumn("[progress.description]{task.description}"),
@@ -305,35 +1102,17 @@ class QAGenerator:
         ]
 
         with Progress(*progress_columns) as progress:
-            rating_task = progress.add_task(f"Rating QA pairs", total=len(batches))
-
-            for i, batch in enumerate(batches):
-                if verbose:
-                    print(f"Rating batch {i+1}/{len(batches)}...")
-                batch_json = json.dumps(batch, indent=2)
-
-                # Format the rating prompt with pairs
-                rating_prompt = rating_prompt_template.format(pairs=batch_json)
-
-                messages = [{"role": "system", "content": rating_prompt}]
-
-                try:
-                    response = self.client.chat_completion(messages, temperature=temperature)
-
-                    rated_batch = parse_ratings(response)
-
-                    for pair in rated_batch:
-                        if "rating" in pair:
-                            total_score += pair["rating"]
-                            if pair["rating"] >= threshold:
-                                rated_pairs.append(pair)
-
-                except Exception as e:
-                    if verbose:
-                        print(f"Error rating batch {i+1}: {str(e)}")
+            rating_task = progress.add_task(f"Rating QA pairs", total=len(qa_pairs))
+            # Cached ratings are reused; pacing of the rest is left to the client's rate limiter
+            rated = self.rate_pairs(
+                qa_pairs,
+                max_batch_size=batch_size,
+                temperature=temperature,
+                on_settled=lambda count: progress.update(rating_task, advance=count),
+            )
 
-                time.sleep(0.5)  # Avoid rate limits
-                progress.update(rating_task, advance=1)
+        total_score = sum(pair["rating"] for pair in rated)
+        rated_pairs = [pair for pair in rated if pair["rating"] >= threshold]
 
         # Calculate metrics
         metrics = {
@@ -349,30 +1128,98 @@ class QAGenerator:
         return rated_pairs, metrics
 
     def process_document(
-        self, document_text: str, num_pairs: int = 25, fileName: str = None, verbose: bool = False
+        self,
+        document_text: str,
+        num_pairs: int = 25,
+        fileName: str = None,
+        verbose: bool = False,
+        manifest: Optional[GenerationManifest] = None,
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """Process a document to generate QA pairs without rating"""
-        # Set the verbose environment variable
-        if verbose:
-            os.environ["SDK_VERBOSE"] = "true"
-        else:
-            os.environ["SDK_VERBOSE"] = "false"
+        """Process a document to generate QA pairs without rating
 
-        enable_rag = self.curate_config.get("enable_rag", False)
+        Args:
+            manifest: Outputs of the previous run of this document; only changed
+                requests are sent to the LLM and the manifest is updated in place
+            chunk_size: Override the configured chunk size for this document
+            overlap: Override the configured chunk overlap for this document
 
-        # Generate summary
-        summary = self.generate_summary(document_text, fileName=fileName, enable_rag=enable_rag)
+        Verbosity and chunking are passed down rather than stored on the generator
+        or in SDK_VERBOSE, so documents processed concurrently do not interfere.
+        """
+        enable_rag = self.curate_config.get("enable_rag", False)
 
-        # Generate QA pairs
-        qa_pairs = self.generate_qa_pairs(
-            document_text,
-            summary=summary,
-            num_pairs=num_pairs,
-            fileName=fileName,
-            enable_rag=enable_rag,
-        )
+        # The QA stage only has to wait for the summary if its prompt uses {summary}
+        qa_prompt_template = get_prompt(self.config, "qa_generation")
+        qa_deps = ["summary"] if "summary" in get_prompt_placeholders(qa_prompt_template) else []
+
+        stages = {
+            "summary": (
+                [],
+                lambda results: self.generate_summary(
+                    document_text,
+                    fileName=fileName,
+                    enable_rag=enable_rag,
+                    manifest=manifest,
+                    chunk_size=chunk_size,
+                    overlap=overlap,
+                    verbose=verbose,
+                ),
+            ),
+            "qa_pairs": (
+                qa_deps,
+                lambda results: self.generate_qa_pairs(
+                    document_text,
+                    summary=results.get("summary", ""),
+                    num_pairs=num_pairs,
+                    fileName=fileName,
+                    enable_rag=enable_rag,
+                    manifest=manifest,
+                    chunk_size=chunk_size,
+                    overlap=overlap,
+                    verbose=verbose,
+                ),
+            ),
+        }
+        results = self.run_stages(stages)
 
         # Prepare result - no rating at this stage
-        result = {"summary": summary, "qa_pairs": qa_pairs}
+        result = {
+            "summary": results["summary"],
+            "qa_pairs": results["qa_pairs"],
+            "chunks": self.source_chunks(document_text, results["qa_pairs"]),
+        }
 
         return result
+
+    def run_stages(self, stages: Dict[str, Tuple[List[str], Any]]) -> Dict[str, Any]:
+        """Run generation stages concurrently as soon as their dependencies finish
+
+        Args:
+            stages: Mapping of stage name to ``(dependencies, func)`` where ``func``
+                receives the results of finished stages and returns the stage output
+
+        Returns:
+            Mapping of stage name to its output
+        """
+        results: Dict[str, Any] = {}
+        pending = dict(stages)
+
+        with ThreadPoolExecutor(max_workers=max(1, len(stages))) as executor:
+            running = {}
+            while pending or running:
+                # Start every stage whose dependencies are satisfied
+                for name, (deps, func) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        running[executor.submit(func, dict(results))] = name
+                        del pending[name]
+
+                if not running:
+                    raise ValueError(f"Unresolvable stage dependencies: {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+
+        return results
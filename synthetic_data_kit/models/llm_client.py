@@ -4,16 +4,19 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 # Supports both vLLM and API endpoint (including OpenAI-compatible) providers
-from typing import List, Dict, Any, Optional, Union, Tuple
+from typing import List, Dict, Any, Optional, Union, Tuple, Iterator, Hashable
 import requests
 import json
 import time
 import os
 import logging
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from pathlib import Path
 
 from synthetic_data_kit.utils.config import load_config, get_vllm_config, get_openai_config, get_llm_provider
+from synthetic_data_kit.utils.text import trim_to_complete_json
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +31,165 @@ except ImportError:
     OPENAI_AVAILABLE = False
     logger.warning("OpenAI package not installed. To use API endpoint provider, install with 'pip install openai>=1.0.0'")
 
+CONTINUATION_PROMPT = (
+    "Your previous response was cut off. Continue exactly where it stopped, "
+    "without repeating anything you already wrote."
+)
+
+class Completion(str):
+    """Generated text that also carries the response's finish_reason
+    
+    Behaves exactly like a str, so callers that only need the text are unaffected.
+    When log probabilities were requested, ``top_logprobs`` holds one
+    ``{token: logprob}`` dict per generated token.
+    """
+    def __new__(cls, text: str, finish_reason: Optional[str] = None,
+                top_logprobs: Optional[List[Dict[str, float]]] = None):
+        obj = super().__new__(cls, text)
+        obj.finish_reason = finish_reason
+        obj.top_logprobs = top_logprobs
+        return obj
+    
+    @property
+    def truncated(self) -> bool:
+        """True if generation stopped because it hit max_tokens"""
+        return self.finish_reason in ('length', 'max_tokens')
+
+def _get_finish_reason(response: Any) -> Optional[str]:
+    """Read finish_reason from an OpenAI-style or Llama API response"""
+    try:
+        if hasattr(response, 'model_dump'):
+            response = response.model_dump()
+        elif not isinstance(response, dict) and hasattr(response, '__dict__'):
+            response = response.__dict__
+        if not isinstance(response, dict):
+            return None
+        choices = response.get('choices')
+        if choices:
+            choice = choices[0]
+            reason = choice.get('finish_reason') if isinstance(choice, dict) else getattr(choice, 'finish_reason', None)
+            return reason if isinstance(reason, str) else None
+        completion = response.get('completion_message')
+        if isinstance(completion, dict):
+            reason = completion.get('stop_reason')
+            return reason if isinstance(reason, str) else None
+    except Exception:
+        pass
+    return None
+
+def _get_top_logprobs(choice: Any) -> Optional[List[Dict[str, float]]]:
+    """Read per-token top logprobs from an OpenAI-style choice (object or dict)"""
+    try:
+        if hasattr(choice, 'model_dump'):
+            choice = choice.model_dump()
+        logprobs = choice.get('logprobs') if isinstance(choice, dict) else None
+        content = logprobs.get('content') if isinstance(logprobs, dict) else None
+        if not content:
+            return None
+        positions = []
+        for token in content:
+            alternatives = token.get('top_logprobs') or [token]
+            positions.append({alt['token']: alt['logprob'] for alt in alternatives})
+        return positions
+    except Exception:
+        return None
+
+class RateLimiter:
+    """Spaces requests evenly so they stay under ``requests_per_minute``
+    
+    Shared by every thread using a client. ``None`` or 0 means unlimited.
+    """
+    def __init__(self, requests_per_minute: Optional[float] = None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+    
+    def reserve(self) -> float:
+        """Claim the next send time, returning the seconds to wait until then"""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_slot)
+            self._next_slot = scheduled + self.interval
+        return scheduled - now
+    
+    def wait(self):
+        """Block until the next request may be sent"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+class CompletionStream:
+    """Chat completions submitted one at a time and consumed as they finish
+    
+    Requests run on a pool of ``max_in_flight`` worker threads. Callers submit
+    work under a key, iterate ``as_completed()`` and may keep submitting while
+    iterating. Closing the stream stops everything that has not started yet;
+    requests already on the wire finish in the background and are discarded.
+    
+    With ``continue_truncated``, a response cut off at max_tokens is resumed
+    (see ``LLMClient.continue_truncated``) on the same pool and yielded once
+    complete, so it never holds up responses that finish after it.
+    """
+    def __init__(self, client: 'LLMClient', max_in_flight: int,
+                 continue_truncated: bool = False, **generation_kwargs):
+        self.client = client
+        self.continue_truncated = continue_truncated
+        self.generation_kwargs = generation_kwargs
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight))
+        # future -> (key, messages, whether it is already a continuation)
+        self._pending: Dict[Future, Tuple[Hashable, List[Dict[str, str]], bool]] = {}
+        self.submitted = 0
+    
+    def submit(self, key: Hashable, messages: List[Dict[str, str]]):
+        """Queue one request; its response is yielded under ``key``"""
+        future = self._executor.submit(self.client.chat_completion, messages, **self.generation_kwargs)
+        self._pending[future] = (key, messages, False)
+        self.submitted += 1
+    
+    def _continue(self, messages: List[Dict[str, str]], response: str) -> str:
+        return self.client.continue_truncated([messages], [response], **self.generation_kwargs)[0]
+    
+    def as_completed(self) -> Iterator[Tuple[Hashable, List[Dict[str, str]], str]]:
+        """Yield (key, messages, response) as requests finish
+        
+        Failed requests yield an ``ERROR: ...`` string, like batch_completion.
+        """
+        while self._pending:
+            done, _ = wait(list(self._pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                key, messages, continued = self._pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    response = f"ERROR: {str(e)}"
+                if self.continue_truncated and not continued and getattr(response, 'truncated', False):
+                    resumed = self._executor.submit(self._continue, messages, response)
+                    self._pending[resumed] = (key, messages, True)
+                    continue
+                yield key, messages, response
+    
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+    
+    def close(self) -> int:
+        """Cancel outstanding requests, returning how many were dropped"""
+        dropped = len(self._pending)
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        # cancel_futures needs Python 3.9; every queued future was cancelled above
+        self._executor.shutdown(wait=False)
+        return dropped
+    
+    def __enter__(self) -> 'CompletionStream':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
 class LLMClient:
     def __init__(self, 
                  config_path: Optional[Path] = None,
@@ -51,6 +213,12 @@ class LLMClient:
         # Load config
         self.config = load_config(config_path)
         
+        # Cap on requests in flight across every thread using this client, so one
+        # shared client can serve many files without overloading the server
+        generation_config = self.config.get('generation', {})
+        max_in_flight = generation_config.get('max_in_flight') or generation_config.get('batch_size', 32)
+        self._request_slots = threading.BoundedSemaphore(max(1, max_in_flight))
+        
         # Determine provider (with CLI override taking precedence)
         self.provider = provider or get_llm_provider(self.config)
         
@@ -78,6 +246,7 @@ class LLMClient:
             self.model = model_name or api_endpoint_config.get('model')
             self.max_retries = max_retries or api_endpoint_config.get('max_retries')
             self.retry_delay = retry_delay or api_endpoint_config.get('retry_delay')
+            self._rate_limiter = RateLimiter(api_endpoint_config.get('requests_per_minute'))
             
             # Initialize OpenAI client
             self._init_openai_client()
@@ -90,6 +259,7 @@ class LLMClient:
             self.model = model_name or vllm_config.get('model')
             self.max_retries = max_retries or vllm_config.get('max_retries')
             self.retry_delay = retry_delay or vllm_config.get('retry_delay')
+            self._rate_limiter = RateLimiter(vllm_config.get('requests_per_minute'))
             
             # No client to initialize for vLLM as we use requests directly
             # Verify server is running
@@ -150,6 +320,8 @@ class LLMClient:
         
         verbose = os.environ.get('SDK_VERBOSE', 'false').lower() == 'true'
         
+        # Each attempt waits on the rate limiter, then holds a request slot only
+        # while its request is on the wire (never while sleeping)
         if self.provider == 'api-endpoint':
             return self._openai_chat_completion(messages, temperature, max_tokens, top_p, verbose)
         else:  # Default to vLLM
@@ -169,17 +341,21 @@ class LLMClient:
         for attempt in range(self.max_retries):
             try:
                 # Create the completion request
-                response = self.openai_client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    top_p=top_p
-                )
+                self._rate_limiter.wait()
+                with self._request_slots:
+                    response = self.openai_client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        top_p=top_p
+                    )
                 
                 if verbose:
                     logger.info(f"Received response from {self.provider}")
                 
+                finish_reason = _get_finish_reason(response)
+                
                 # Log the full response in debug mode
                 if debug_mode:
                     if hasattr(response, 'model_dump'):
@@ -194,7 +370,7 @@ class LLMClient:
                         choice = response.choices[0]
                         if hasattr(choice, 'message') and choice.message is not None:
                             if hasattr(choice.message, 'content') and choice.message.content is not None:
-                                return choice.message.content
+                                return Completion(choice.message.content, finish_reason)
                 except Exception as e:
                     if verbose:
                         logger.info(f"Standard format extraction failed: {e}, trying alternative formats...")
@@ -208,9 +384,9 @@ class LLMClient:
                             content = completion['content']
                             # Different Llama API response formats
                             if isinstance(content, dict) and 'text' in content:
-                                return content['text']
+                                return Completion(content['text'], finish_reason)
                             elif isinstance(content, str):
-                                return content
+                                return Completion(content, finish_reason)
                 except Exception as e:
                     if verbose:
                         logger.info(f"Llama API format extraction failed: {e}, trying dictionary access...")
@@ -235,9 +411,9 @@ class LLMClient:
                             if isinstance(comp, dict) and 'content' in comp:
                                 content = comp['content']
                                 if isinstance(content, dict) and 'text' in content:
-                                    return content['text']
+                                    return Completion(content['text'], finish_reason)
                                 elif isinstance(content, str):
-                                    return content
+                                    return Completion(content, finish_reason)
                         
                         # Try OpenAI format
                         if 'choices' in response_dict and response_dict['choices'] is not None and len(response_dict['choices']) > 0:
@@ -245,7 +421,7 @@ class LLMClient:
                             if isinstance(choice, dict) and 'message' in choice:
                                 message = choice['message']
                                 if isinstance(message, dict) and 'content' in message and message['content'] is not None:
-                                    return message['content']
+                                    return Completion(message['content'], finish_reason)
                 except Exception as e:
                     if verbose:
                         logger.info(f"Dictionary access failed: {e}")
@@ -298,18 +474,21 @@ class LLMClient:
                 if verbose:
                     logger.info(f"Sending request to vLLM model {self.model}...")
                 
-                response = requests.post(
-                    f"{self.api_base}/chat/completions",
-                    headers={"Content-Type": "application/json"},
-                    data=json.dumps(data),
-                    timeout=180  # Increased timeout to 180 seconds
-                )
+                self._rate_limiter.wait()
+                with self._request_slots:
+                    response = requests.post(
+                        f"{self.api_base}/chat/completions",
+                        headers={"Content-Type": "application/json"},
+                        data=json.dumps(data),
+                        timeout=180  # Increased timeout to 180 seconds
+                    )
                 
                 if verbose:
                     logger.info(f"Received response with status code: {response.status_code}")
                 
                 response.raise_for_status()
-                return response.json()["choices"][0]["message"]["content"]
+                choice = response.json()["choices"][0]
+                return Completion(choice["message"]["content"], choice.get("finish_reason"))
             
             except (requests.exceptions.RequestException, KeyError, IndexError) as e:
                 if attempt == self.max_retries - 1:
@@ -321,11 +500,14 @@ class LLMClient:
                        temperature: float = None, 
                        max_tokens: int = None,
                        top_p: float = None,
-                       batch_size: int = None) -> List[str]:
+                       batch_size: int = None,
+                       top_logprobs: int = None) -> List[str]:
         """Process multiple message sets in batches
         
         Instead of sending requests one at a time, this method processes
-        multiple prompts in batches to maximize throughput.
+        multiple prompts in batches to maximize throughput. With
+        ``top_logprobs``, each Completion also carries that many most likely
+        tokens (with their logprobs) at every generated position.
         """
         # Get defaults from config if not provided
         generation_config = self.config.get('generation', {})
@@ -337,9 +519,9 @@ class LLMClient:
         verbose = os.environ.get('SDK_VERBOSE', 'false').lower() == 'true'
         
         if self.provider == 'api-endpoint':
-            return self._openai_batch_completion(message_batches, temperature, max_tokens, top_p, batch_size, verbose)
+            return self._openai_batch_completion(message_batches, temperature, max_tokens, top_p, batch_size, verbose, top_logprobs)
         else:  # Default to vLLM
-            return self._vllm_batch_completion(message_batches, temperature, max_tokens, top_p, batch_size, verbose)
+            return self._vllm_batch_completion(message_batches, temperature, max_tokens, top_p, batch_size, verbose, top_logprobs)
     
     async def _process_message_async(self, 
                                     messages: List[Dict[str, str]], 
@@ -347,7 +529,8 @@ class LLMClient:
                                     max_tokens: int,
                                     top_p: float,
                                     verbose: bool,
-                                    debug_mode: bool):
+                                    debug_mode: bool,
+                                    top_logprobs: Optional[int] = None):
         """Process a single message set asynchronously using the OpenAI API"""
         try:
             from openai import AsyncOpenAI
@@ -362,17 +545,30 @@ class LLMClient:
             client_kwargs['base_url'] = self.api_base
             
         async_client = AsyncOpenAI(**client_kwargs)
+        logprob_kwargs = {'logprobs': True, 'top_logprobs': top_logprobs} if top_logprobs else {}
         
+        loop = asyncio.get_running_loop()
         for attempt in range(self.max_retries):
             try:
-                # Asynchronously call the API
-                response = await async_client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    top_p=top_p
-                )
+                # Wait for the rate limiter before taking a slot: slot holders must
+                # never need an executor thread, or blocked acquires starve them
+                delay = self._rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Wait for a free request slot without blocking the event loop
+                await loop.run_in_executor(None, self._request_slots.acquire)
+                try:
+                    # Asynchronously call the API
+                    response = await async_client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        top_p=top_p,
+                        **logprob_kwargs
+                    )
+                finally:
+                    self._request_slots.release()
                 
                 if verbose:
                     logger.info(f"Received response from {self.provider}")
@@ -386,6 +582,7 @@ class LLMClient:
                         logger.debug(f"Response attributes: {dir(response)}")
                 
                 content = None
+                logprobs = None
                 
                 # Method 1: Try standard OpenAI API response format
                 try:
@@ -394,6 +591,8 @@ class LLMClient:
                         if hasattr(choice, 'message') and choice.message is not None:
                             if hasattr(choice.message, 'content') and choice.message.content is not None:
                                 content = choice.message.content
+                                if top_logprobs:
+                                    logprobs = _get_top_logprobs(choice)
                 except Exception as e:
                     if verbose:
                         logger.info(f"Standard format extraction failed: {e}, trying alternative formats...")
@@ -470,7 +669,7 @@ class LLMClient:
                     
                     raise ValueError(f"Could not extract content from response using any known method")
                 
-                return content
+                return Completion(content, _get_finish_reason(response), logprobs)
                 
             except Exception as e:
                 if verbose:
@@ -487,7 +686,8 @@ class LLMClient:
                                 max_tokens: int,
                                 top_p: float,
                                 batch_size: int,
-                                verbose: bool) -> List[str]:
+                                verbose: bool,
+                                top_logprobs: Optional[int] = None) -> List[str]:
         """Process multiple message sets using the OpenAI API or compatible APIs asynchronously"""
         debug_mode = os.environ.get('SDK_DEBUG', 'false').lower() == 'true'
         results = []
@@ -514,7 +714,8 @@ class LLMClient:
                         max_tokens=max_tokens,
                         top_p=top_p,
                         verbose=verbose,
-                        debug_mode=debug_mode
+                        debug_mode=debug_mode,
+                        top_logprobs=top_logprobs
                     )
                     tasks.append(task)
                 
@@ -524,10 +725,6 @@ class LLMClient:
             # Run the async batch processing
             batch_results = asyncio.run(process_batch())
             results.extend(batch_results)
-            
-            # Small delay between batches to avoid rate limits
-            if i + batch_size < len(message_batches):
-                time.sleep(0.5)
         
         return results
     
@@ -537,7 +734,8 @@ class LLMClient:
                              max_tokens: int,
                              top_p: float,
                              batch_size: int,
-                             verbose: bool) -> List[str]:
+                             verbose: bool,
+                             top_logprobs: Optional[int] = None) -> List[str]:
         """Process multiple message sets in batches using vLLM's API"""
         results = []
         
@@ -550,47 +748,144 @@ class LLMClient:
             # Create batch request payload for VLLM
             batch_requests = []
             for messages in batch_chunk:
-                batch_requests.append({
+                request_data = {
                     "model": self.model,
                     "messages": messages,
                     "temperature": temperature,
                     "max_tokens": max_tokens,
                     "top_p": top_p
-                })
+                }
+                if top_logprobs:
+                    request_data.update({"logprobs": True, "top_logprobs": top_logprobs})
+                batch_requests.append(request_data)
             
-            try:
-                # For now, we run these in parallel with multiple requests
-                batch_results = []
-                for request_data in batch_requests:
-                    # Only print if verbose mode is enabled
-                    if verbose:
-                        logger.info(f"Sending batch request to vLLM model {self.model}...")
-                    
+            def send(request_data):
+                # Only print if verbose mode is enabled
+                if verbose:
+                    logger.info(f"Sending batch request to vLLM model {self.model}...")
+                
+                self._rate_limiter.wait()
+                with self._request_slots:
                     response = requests.post(
                         f"{self.api_base}/chat/completions",
                         headers={"Content-Type": "application/json"},
                         data=json.dumps(request_data),
                         timeout=180  # Increased timeout for batch processing
                     )
-                    
-                    if verbose:
-                        logger.info(f"Received response with status code: {response.status_code}")
-                    
-                    response.raise_for_status()
-                    content = response.json()["choices"][0]["message"]["content"]
-                    batch_results.append(content)
+                
+                if verbose:
+                    logger.info(f"Received response with status code: {response.status_code}")
+                
+                response.raise_for_status()
+                choice = response.json()["choices"][0]
+                logprobs = _get_top_logprobs(choice) if top_logprobs else None
+                return Completion(choice["message"]["content"], choice.get("finish_reason"), logprobs)
+            
+            try:
+                # Send the batch's requests in parallel so the server sees them together
+                with ThreadPoolExecutor(max_workers=len(batch_requests)) as executor:
+                    batch_results = list(executor.map(send, batch_requests))
                 
                 results.extend(batch_results)
                 
             except (requests.exceptions.RequestException, KeyError, IndexError) as e:
                 raise Exception(f"Failed to process vLLM batch: {str(e)}")
-            
-            # Small delay between batches
-            if i + batch_size < len(message_batches):
-                time.sleep(0.1)
         
         return results
     
+    def continue_truncated(self,
+                           message_batches: List[List[Dict[str, str]]],
+                           responses: List[str],
+                           max_rounds: int = None,
+                           temperature: float = None,
+                           max_tokens: int = None,
+                           top_p: float = None,
+                           batch_size: int = None) -> List[str]:
+        """Resume responses that were cut off at max_tokens instead of regenerating them
+        
+        Each truncated response is trimmed back to its last complete JSON value and
+        sent back as the assistant turn with a request to continue. The continuation
+        is appended to the trimmed text, so every object the model already produced
+        is kept even if the continuation fails.
+        
+        Args:
+            message_batches: The messages that produced each response
+            responses: Responses from batch_completion/chat_completion, same order
+            max_rounds: Maximum continuation requests per response
+                (defaults to generation.continuation.max_rounds, 0 disables)
+            
+        Returns:
+            List of responses with truncated entries extended
+        """
+        continuation_config = self.config.get('generation', {}).get('continuation', {}) or {}
+        if max_rounds is None:
+            max_rounds = continuation_config.get('max_rounds', 1) if continuation_config.get('enabled', True) else 0
+        verbose = os.environ.get('SDK_VERBOSE', 'false').lower() == 'true'
+        
+        responses = list(responses)
+        for round_num in range(max_rounds):
+            pending = [i for i, response in enumerate(responses) if getattr(response, 'truncated', False)]
+            if not pending:
+                break
+            if verbose:
+                logger.info(f"Continuing {len(pending)} truncated responses (round {round_num + 1}/{max_rounds})")
+            
+            prefixes = [trim_to_complete_json(responses[i]) for i in pending]
+            continuation_batches = [
+                message_batches[i] + [
+                    {"role": "assistant", "content": prefix},
+                    {"role": "user", "content": CONTINUATION_PROMPT},
+                ]
+                for i, prefix in zip(pending, prefixes)
+            ]
+            try:
+                continuations = self.batch_completion(
+                    continuation_batches,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=top_p,
+                    batch_size=batch_size
+                )
+            except Exception as e:
+                if verbose:
+                    logger.error(f"Continuation request failed: {str(e)}")
+                break
+            
+            for i, prefix, continuation in zip(pending, prefixes, continuations):
+                if isinstance(continuation, str) and continuation.startswith('ERROR:'):
+                    responses[i] = Completion(prefix, 'stop')
+                    continue
+                responses[i] = Completion(prefix + continuation, getattr(continuation, 'finish_reason', None))
+        
+        return responses
+    
+    def stream_completions(self,
+                           temperature: float = None,
+                           max_tokens: int = None,
+                           top_p: float = None,
+                           max_in_flight: int = None,
+                           continue_truncated: bool = False) -> CompletionStream:
+        """Open a stream for submitting requests and consuming them as they complete
+        
+        Unlike batch_completion, the caller sees each response as soon as it
+        arrives and can stop early by closing the stream.
+        
+        Args:
+            max_in_flight: Concurrent requests (defaults to generation.batch_size)
+            continue_truncated: Resume responses cut off at max_tokens before
+                yielding them
+        """
+        if max_in_flight is None:
+            max_in_flight = self.config.get('generation', {}).get('batch_size', 32)
+        return CompletionStream(
+            self,
+            max_in_flight,
+            continue_truncated=continue_truncated,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p
+        )
+    
     @classmethod
     def from_config(cls, config_path: Path) -> 'LLMClient':
         """Create a client from configuration file"""
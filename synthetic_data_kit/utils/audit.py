@@ -0,0 +1,85 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Sampled quality audit: estimate a document's pass rate from a random sample
+import math
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Tuple
+
+
+def _z(confidence: float) -> float:
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def audit_sample_size(
+    margin: float = 0.1, confidence: float = 0.95, population: Optional[int] = None
+) -> int:
+    """Pairs to rate so the pass rate is known within ``margin`` at worst (rate 0.5)
+
+    ``z^2 / (4 * margin^2)`` pairs for an unbounded document, reduced by the
+    finite-population correction ``n / (1 + (n - 1) / population)`` when the
+    document's pair count is given.
+    """
+    size = math.ceil(_z(confidence) ** 2 / (4 * margin**2))
+    if population:
+        size = math.ceil(size / (1 + (size - 1) / population))
+    return size
+
+
+def wilson_interval(
+    passed: int, total: int, confidence: float = 0.95, population: Optional[int] = None
+) -> Tuple[float, float]:
+    """Wilson score interval for a pass rate of ``passed`` out of ``total``
+
+    With ``population``, the sample was drawn without replacement from that
+    many pairs: the interval is computed for the effective sample size
+    ``n * (N - 1) / (N - n)``, and a sample of every pair is exact.
+    """
+    if total == 0:
+        return 0.0, 1.0
+    rate = passed / total
+    if population and population > 1:
+        if total >= population:
+            return rate, rate
+        total = total * (population - 1) / (population - total)
+    z = _z(confidence)
+    denominator = 1 + z**2 / total
+    center = (rate + z**2 / (2 * total)) / denominator
+    half_width = z * math.sqrt(rate * (1 - rate) / total + z**2 / (4 * total**2)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def audit_decision(
+    passed: int, sampled: int, audit_config: Dict[str, Any], population: Optional[int] = None
+) -> Dict[str, Any]:
+    """Estimate of a document's pass rate and what to do with its unrated pairs
+
+    The decision is ``"accept"`` (keep them) when the whole interval is at or
+    above ``accept_rate``, ``"reject"`` (drop them) when it is at or below
+    ``reject_rate`` and ``"full"`` (rate them) when it reaches into the band
+    in between. ``population`` is the number of pairs the sample was drawn
+    from (see ``wilson_interval``).
+
+    The default rates of 0.85 and 0.15 settle a document of any size once
+    about 93% of a 97-pair sample lands on one side of the threshold (90 of
+    97 pairs). Rates of 0.9 and 0.1 would take 94 of 97, so nearly every
+    document would be rated in full and the sample would only add calls.
+    """
+    confidence = audit_config.get("confidence", 0.95)
+    low, high = wilson_interval(passed, sampled, confidence, population)
+    if low >= audit_config.get("accept_rate", 0.85):
+        decision = "accept"
+    elif high <= audit_config.get("reject_rate", 0.15):
+        decision = "reject"
+    else:
+        decision = "full"
+    return {
+        "sampled": sampled,
+        "passed": passed,
+        "pass_rate": round(passed / sampled, 3) if sampled else 0,
+        "interval": [round(low, 3), round(high, 3)],
+        "confidence": confidence,
+        "decision": decision,
+    }
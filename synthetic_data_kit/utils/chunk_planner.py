@@ -0,0 +1,146 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Decide which chunks to query, and for how many pairs, given a pair budget
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from synthetic_data_kit.utils.vectorize import tfidf_vectors
+
+
+def kmeans(vectors: np.ndarray, k: int, seed: int = 0, max_iter: int = 25) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means with k-means++ initialisation
+
+    Args:
+        vectors: L2-normalised row vectors
+        k: Number of clusters
+
+    Returns:
+        Tuple of (centroids, labels)
+    """
+    rng = np.random.RandomState(seed)
+    n = vectors.shape[0]
+
+    # k-means++ seeding on cosine distance
+    centroids = [vectors[rng.randint(n)]]
+    distances = 1.0 - vectors @ centroids[0]
+    for _ in range(1, k):
+        weights = np.clip(distances, 0, None) ** 2
+        total = weights.sum()
+        index = rng.choice(n, p=weights / total) if total > 0 else rng.randint(n)
+        centroids.append(vectors[index])
+        distances = np.minimum(distances, 1.0 - vectors @ vectors[index])
+    centroids = np.stack(centroids)
+
+    labels = np.full(n, -1)
+    for _ in range(max_iter):
+        new_labels = np.argmax(vectors @ centroids.T, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = vectors[labels == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                centroids[c] = centroid / norm if norm > 0 else centroid
+    return centroids, labels
+
+
+def rank_chunks(
+    chunks: List[str], k: int, seed: int = 0, extra: Optional[int] = None
+) -> List[int]:
+    """Order chunk indices so the first ``k`` cover the document's content
+
+    The first ``k`` entries are the chunks closest to the centroids of a k-means
+    clustering of their TF-IDF vectors, largest cluster first. Up to ``extra``
+    further chunks follow (all of them if None), each the least similar to
+    anything already ranked, so any prefix of the ranking is a reasonable
+    coverage set.
+    """
+    n = len(chunks)
+    if n <= 1:
+        return list(range(n))
+    k = max(1, min(k, n))
+
+    vectors = tfidf_vectors(chunks)
+    centroids, labels = kmeans(vectors, k, seed=seed)
+    similarity = vectors @ centroids.T
+
+    ranked: List[int] = []
+    cluster_order = sorted(range(k), key=lambda c: -int((labels == c).sum()))
+    for c in cluster_order:
+        members = np.flatnonzero(labels == c)
+        if len(members) == 0:
+            continue
+        ranked.append(int(members[np.argmax(similarity[members, c])]))
+
+    # Farthest-first for the rest (also fills in for empty clusters). Ranked
+    # chunks are masked with +inf, so one running maximum serves every step.
+    count = n - len(ranked) if extra is None else min(max(extra, 0), n - len(ranked))
+    if count:
+        closest = np.max(vectors @ vectors[ranked].T, axis=1)
+        closest[ranked] = np.inf
+        for _ in range(count):
+            index = int(np.argmin(closest))
+            ranked.append(index)
+            closest[index] = np.inf
+            np.maximum(closest, vectors @ vectors[index], out=closest)
+    return ranked
+
+
+def plan_chunk_allocation(
+    chunks: List[str],
+    num_pairs: int,
+    max_pairs_per_chunk: int = 5,
+    strategy: str = "coverage",
+    seed: int = 0,
+    include_backups: bool = False,
+    max_backups: Optional[int] = None,
+) -> List[Tuple[int, int]]:
+    """Choose which chunks to query and how many pairs to request from each
+
+    Args:
+        chunks: Chunk texts in document order
+        num_pairs: Total number of QA pairs requested for the document
+        max_pairs_per_chunk: Pairs to ask for per call before adding another chunk
+        strategy: ``"coverage"`` picks representative chunks so the number of
+            calls follows ``num_pairs``; ``"all"`` queries every chunk
+        include_backups: Append the unselected chunks, in ranked order, so a
+            caller that stops early can fall back on them if the selection
+            yields too few pairs
+        max_backups: Most backups to append (default: as many as selected
+            chunks, enough to replace the whole selection once)
+
+    Returns:
+        List of ``(chunk_index, pairs)`` in priority order
+    """
+    n = len(chunks)
+    if n == 0 or num_pairs <= 0:
+        return []
+
+    if strategy == "all":
+        pairs_per_chunk = max(1, round(num_pairs / n))
+        return [(i, pairs_per_chunk) for i in range(n)]
+    if strategy != "coverage":
+        raise ValueError(f"Unknown chunk selection strategy: {strategy}")
+
+    num_calls = min(n, math.ceil(num_pairs / max(1, max_pairs_per_chunk)))
+    backups = 0
+    if include_backups:
+        backups = num_calls if max_backups is None else max_backups
+    ranked = rank_chunks(chunks, num_calls, seed=seed, extra=backups)
+
+    # Spread the budget evenly, giving any remainder to the highest-priority chunks
+    base, remainder = divmod(num_pairs, num_calls)
+    plan = [
+        (index, base + (1 if rank < remainder else 0))
+        for rank, index in enumerate(ranked[:num_calls])
+    ]
+    if include_backups:
+        plan.extend((index, max(1, min(base, max_pairs_per_chunk))) for index in ranked[num_calls:])
+    return plan
@@ -6,8 +6,9 @@
 # Config Utilities
 import yaml
 import os
+import string
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set
 
 # Default config location relative to the package (original)
 ORIGINAL_CONFIG_PATH = os.path.abspath(
@@ -120,6 +121,23 @@ def get_curate_config(config: Dict[str, Any]) -> Dict[str, Any]:
         'temperature': 0.1
     })
 
+def get_embedding_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Get embedding model configuration"""
+    return config.get('embedding', {
+        'model': 'default',
+        'batch_size': 256,
+        'cache_path': None
+    })
+
+def get_rag_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Get vector store configuration"""
+    return config.get('rag', {
+        'backend': 'numpy',
+        'path': 'data/rag',
+        'collection': 'synthetic_data_kit',
+        'dtype': 'float32'
+    })
+
 def get_format_config(config: Dict[str, Any]) -> Dict[str, Any]:
     """Get format configuration"""
     return config.get('format', {
@@ -135,6 +153,14 @@ def get_prompt(config: Dict[str, Any], prompt_name: str) -> str:
         raise ValueError(f"Prompt '{prompt_name}' not found in configuration")
     return prompts[prompt_name]
 
+def get_prompt_placeholders(template: str) -> Set[str]:
+    """Get the names of the {placeholders} a prompt template actually uses"""
+    names = set()
+    for _, field_name, _, _ in string.Formatter().parse(template):
+        if field_name:
+            names.add(field_name.split('.')[0].split('[')[0])
+    return names
+
 def merge_configs(base_config: Dict[str, Any], override_config: Dict[str, Any]) -> Dict[str, Any]:
     """Merge two configuration dictionaries"""
     result = base_config.copy()
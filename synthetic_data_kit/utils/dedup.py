@@ -0,0 +1,214 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Near-duplicate detection with MinHash signatures and banded LSH
+import re
+import zlib
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# Mersenne prime used by the universal hash family (a * x + b) mod p
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingle_hashes(text: str, shingle_size: int = 5) -> np.ndarray:
+    """Hash the word shingles of a text into a uint64 array
+
+    Text is lowercased and split on word characters, so whitespace and
+    punctuation differences between copies of the same boilerplate do not
+    produce different shingles.
+    """
+    tokens = re.findall(r"\w+", text.lower())
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+    if len(tokens) < shingle_size:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = [
+            " ".join(tokens[i : i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)
+        ]
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in set(shingles)]
+    return np.asarray(hashes, dtype=np.uint64)
+
+
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Pick (bands, rows) so the LSH S-curve crosses closest to the threshold"""
+    best = (1, num_perm)
+    best_error = float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        if rows == 0:
+            break
+        # Jaccard similarity at which P(candidate) = 0.5 is roughly (1/b)^(1/r)
+        crossing = (1.0 / bands) ** (1.0 / rows)
+        error = abs(crossing - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHashLSH:
+    """MinHash signatures indexed with banded locality sensitive hashing"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, seed: int = 1):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"Jaccard threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+
+        self._buckets: List[Dict[bytes, List[Any]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Any, np.ndarray] = {}
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        """Compute the MinHash signature of a set of shingle hashes"""
+        if hashes.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # (num_perm, n_shingles) permuted hashes; uint64 overflow wraps, which is fine for hashing
+        permuted = ((self._a * hashes[np.newaxis, :] + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[i * self.rows : (i + 1) * self.rows].tobytes() for i in range(self.bands)
+        ]
+
+    def query(self, signature: np.ndarray) -> List[Any]:
+        """Return keys whose estimated Jaccard similarity reaches the threshold"""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        matches = []
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold:
+                matches.append(candidate)
+        return matches
+
+    def insert(self, key: Any, signature: np.ndarray):
+        """Index a signature under the given key"""
+        self._signatures[key] = signature
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+class ChunkDeduplicator:
+    """Skips chunks that are near-duplicates of chunks seen before
+
+    The index persists across calls, so one instance can be shared between
+    documents to drop boilerplate repeated across a whole directory.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        self.shingle_size = shingle_size
+        self.lsh = MinHashLSH(threshold=threshold, num_perm=num_perm, seed=seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, generation_config: Dict[str, Any]) -> Optional["ChunkDeduplicator"]:
+        """Build a deduplicator from the generation config, or None if disabled"""
+        dedup_config = generation_config.get("dedup", {}) or {}
+        if not dedup_config.get("enabled", False):
+            return None
+        return cls(
+            threshold=dedup_config.get("threshold", 0.8),
+            num_perm=dedup_config.get("num_perm", 128),
+            shingle_size=dedup_config.get("shingle_size", 5),
+        )
+
+    def filter_chunks(self, chunks: List[str], source: Optional[str] = None) -> List[int]:
+        """Return the indices of chunks that are not near-duplicates
+
+        Args:
+            chunks: Chunk texts in document order
+            source: Name of the document the chunks come from (used in index keys)
+
+        Returns:
+            Indices into ``chunks`` that should be sent to the LLM
+        """
+        kept = []
+        with self._lock:
+            for i, chunk in enumerate(chunks):
+                signature = self.lsh.signature(shingle_hashes(chunk, self.shingle_size))
+                if self.lsh.query(signature):
+                    continue
+                self.lsh.insert((source, i), signature)
+                kept.append(i)
+        return kept
+
+
+def select_distinct(vectors: np.ndarray, threshold: float, block_size: int = 1024) -> List[int]:
+    """Greedily keep rows whose cosine similarity to every earlier kept row is below threshold
+
+    Rows are processed ``block_size`` at a time and compared against the kept
+    rows one block at a time, so peak memory is O(block_size ** 2) rather than
+    O(n ** 2).
+
+    Args:
+        vectors: L2-normalised row vectors, in priority order
+        threshold: Cosine similarity at or above which a row is a duplicate
+
+    Returns:
+        Indices of the rows to keep, in order
+    """
+    kept: List[int] = []
+    kept_blocks: List[np.ndarray] = []
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start : start + block_size]
+
+        # Similarity to everything kept from earlier blocks
+        duplicate = np.zeros(len(block), dtype=bool)
+        for kept_block in kept_blocks:
+            duplicate |= (block @ kept_block.T).max(axis=1) >= threshold
+
+        # Within the block the greedy choice depends on earlier rows, so walk it in order
+        within = block @ block.T
+        block_kept: List[int] = []
+        for row in range(len(block)):
+            if duplicate[row]:
+                continue
+            if block_kept and within[row, block_kept].max() >= threshold:
+                continue
+            block_kept.append(row)
+
+        kept.extend(start + row for row in block_kept)
+        if block_kept:
+            kept_blocks.append(block[block_kept])
+    return kept
+
+
+def dedup_qa_pairs(
+    qa_pairs: List[Dict[str, Any]], embedder, threshold: float = 0.92, block_size: int = 1024
+) -> List[Dict[str, Any]]:
+    """Drop QA pairs whose question is a near-duplicate of an earlier one
+
+    Args:
+        qa_pairs: Generated pairs, earlier pairs take precedence
+        embedder: Object with ``encode(texts) -> np.ndarray`` returning unit vectors
+
+    Returns:
+        The pairs that were kept, in their original order
+    """
+    if len(qa_pairs) < 2:
+        return list(qa_pairs)
+    vectors = embedder.encode([str(pair.get("question", "")) for pair in qa_pairs])
+    return [qa_pairs[i] for i in select_distinct(vectors, threshold, block_size)]
@@ -6,6 +6,7 @@
 # Directory processing utilities for batch operations
 
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable
 from rich.console import Console
@@ -233,11 +234,16 @@ def process_directory_create(
         num_pairs: Target number of QA pairs or examples
         verbose: Show detailed progress
         provider: LLM provider to use
+        chunk_size: Override the configured chunk size
+        chunk_overlap: Override the configured chunk overlap
     
     Returns:
         Dictionary with processing results
     """
+    from synthetic_data_kit.core import create
     from synthetic_data_kit.core.create import process_file
+    from synthetic_data_kit.utils.config import load_config, get_generation_config
+    from synthetic_data_kit.utils.dedup import ChunkDeduplicator
     
     # For create command, we process .txt files (output from ingest)
     # For cot-enhance, we process .json files instead
@@ -265,6 +271,38 @@ def process_directory_create(
     
     console.print(f"Found {len(supported_files)} {content_type} files to process", style="blue")
     
+    generation_config = get_generation_config(load_config(config_path))
+    
+    # One near-duplicate index for the whole directory, so boilerplate repeated
+    # across files is only sent to the LLM once
+    deduplicator = None
+    if content_type == "qa":
+        deduplicator = ChunkDeduplicator.from_config(generation_config)
+    
+    # One client for every file: its max_in_flight cap is the global request
+    # window, and running several files at once keeps that window full when
+    # individual files are too small to fill it. If the client cannot be built
+    # here, each file builds its own and reports the error itself.
+    shared_client = None
+    shared_generator = None
+    try:
+        shared_client = create.LLMClient(
+            config_path=config_path,
+            provider=provider,
+            api_base=api_base,
+            model_name=model
+        )
+    except Exception as e:
+        shared_client = None
+        if verbose:
+            console.print(
+                f"Could not create a shared LLM client ({e}); each file will create its own",
+                style="yellow"
+            )
+    if shared_client is not None and content_type == "qa":
+        shared_generator = create.QAGenerator(shared_client, config_path, deduplicator=deduplicator)
+    concurrent_files = max(1, generation_config.get("concurrent_files", 8))
+    
     # Initialize results tracking
     results = {
         "total_files": len(supported_files),
@@ -287,12 +325,11 @@ def process_directory_create(
         
         task = progress.add_task(f"Generating {content_type} content", total=len(supported_files))
         
-        for file_path in supported_files:
-            filename = os.path.basename(file_path)
-            
-            try:
-                # Process individual file
-                output_path = process_file(
+        with ThreadPoolExecutor(max_workers=concurrent_files) as executor:
+            # Each file writes its own output as soon as it finishes
+            futures = {
+                executor.submit(
+                    process_file,
                     file_path,
                     output_dir,
                     config_path,
@@ -303,39 +340,51 @@ def process_directory_create(
                     verbose,
                     provider=provider,
                     chunk_size=chunk_size,
-                    chunk_overlap=chunk_overlap
-                )
-                
-                # Record success
-                results["successful"] += 1
-                results["results"].append({
-                    "input_file": file_path,
-                    "output_file": output_path,
-                    "content_type": content_type,
-                    "status": "success"
-                })
-                
-                if verbose:
-                    console.print(f"✓ Generated {content_type} from {filename} -> {os.path.basename(output_path)}", style="green")
-                else:
-                    console.print(f"✓ {filename}", style="green")
+                    chunk_overlap=chunk_overlap,
+                    deduplicator=deduplicator,
+                    client=shared_client,
+                    generator=shared_generator
+                ): file_path
+                for file_path in supported_files
+            }
+            
+            for future in as_completed(futures):
+                file_path = futures[future]
+                filename = os.path.basename(file_path)
                 
-            except Exception as e:
-                # Record failure
-                results["failed"] += 1
-                results["errors"].append({
-                    "input_file": file_path,
-                    "error": str(e),
-                    "content_type": content_type,
-                    "status": "failed"
-                })
+                try:
+                    output_path = future.result()
+                    
+                    # Record success
+                    results["successful"] += 1
+                    results["results"].append({
+                        "input_file": file_path,
+                        "output_file": output_path,
+                        "content_type": content_type,
+                        "status": "success"
+                    })
+                    
+                    if verbose:
+                        console.print(f"✓ Generated {content_type} from {filename} -> {os.path.basename(output_path)}", style="green")
+                    else:
+                        console.print(f"✓ {filename}", style="green")
+                    
+                except Exception as e:
+                    # Record failure
+                    results["failed"] += 1
+                    results["errors"].append({
+                        "input_file": file_path,
+                        "error": str(e),
+                        "content_type": content_type,
+                        "status": "failed"
+                    })
+                    
+                    if verbose:
+                        console.print(f"✗ Failed to process {filename}: {e}", style="red")
+                    else:
+                        console.print(f"✗ {filename}: {e}", style="red")
                 
-                if verbose:
-                    console.print(f"✗ Failed to process {filename}: {e}", style="red")
-                else:
-                    console.print(f"✗ {filename}: {e}", style="red")
-            
-            progress.update(task, advance=1)
+                progress.update(task, advance=1)
     
     # Show summary
     console.print("\n" + "="*50, style="bold")
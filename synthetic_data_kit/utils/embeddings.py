@@ -0,0 +1,170 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Local CPU text embeddings
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from synthetic_data_kit.utils.sqlite_cache import SQLiteCache
+from synthetic_data_kit.utils.vectorize import hashed_counts, l2_normalize
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache(SQLiteCache):
+    """On-disk cache of embeddings keyed by a hash of encoder name and text (SQLite)"""
+
+    table = "embeddings"
+    column = "vector"
+
+    @staticmethod
+    def key(encoder: str, text: str) -> str:
+        return hashlib.sha256(f"{encoder}\0{text}".encode("utf-8")).hexdigest()
+
+    def _encode(self, vector: np.ndarray) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    def _decode(self, blob: bytes) -> np.ndarray:
+        return np.frombuffer(blob, dtype=np.float32)
+
+
+class Embedder:
+    """Batched, L2-normalised text embeddings from a local model
+
+    ``model`` is ``"default"`` for Chroma's bundled ONNX MiniLM, any
+    sentence-transformers model name, or ``"hashing"`` for hashed word and
+    bigram counts. If the model cannot be loaded or fails (e.g. no network to
+    fetch weights), encoding raises unless ``fallback`` allows switching to
+    the hashing encoder. Its vectors have another width and meaning, so
+    ``encoder_name`` tells which encoder is in use.
+    """
+
+    def __init__(
+        self,
+        model: str = "default",
+        batch_size: int = 64,
+        hashing_dim: int = 4096,
+        cache: Optional[EmbeddingCache] = None,
+        fallback: bool = False,
+    ):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.hashing_dim = hashing_dim
+        self.cache = cache
+        self.fallback = fallback
+        self.last_stats: Dict[str, float] = {}
+        self._function = None
+        self._loaded = False
+
+    @classmethod
+    def from_config(cls, embedding_config: Dict[str, Any]) -> "Embedder":
+        """Build an embedder from the ``embedding`` config section"""
+        cache_path = embedding_config.get("cache_path")
+        return cls(
+            model=embedding_config.get("model", "default"),
+            batch_size=embedding_config.get("batch_size", 64),
+            cache=EmbeddingCache(cache_path) if cache_path else None,
+            fallback=embedding_config.get("fallback_to_hashing", False),
+        )
+
+    def _load(self):
+        if self._loaded:
+            return self._function
+        self._loaded = True
+        if self.model == "hashing":
+            return None
+        try:
+            if self.model == "default":
+                from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+                self._function = DefaultEmbeddingFunction()
+            else:
+                from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+
+                self._function = SentenceTransformerEmbeddingFunction(model_name=self.model)
+        except Exception as e:
+            self._fall_back(f"Could not load embedding model '{self.model}'", e)
+        return self._function
+
+    def _fall_back(self, reason: str, error: Exception):
+        """Switch to the hashing encoder if ``fallback`` allows it, otherwise raise"""
+        if not self.fallback:
+            raise RuntimeError(
+                f"{reason}: {error}. Set embedding.fallback_to_hashing to use the hashing "
+                f"encoder instead (indexes built with '{self.model}' must then be rebuilt)"
+            ) from error
+        logger.warning(f"{reason}, using hashing-{self.hashing_dim} instead: {error}")
+        self._function = None
+
+    def _hashing_encode(self, texts: List[str]) -> np.ndarray:
+        return hashed_counts(texts, dim=self.hashing_dim, ngram_range=(1, 2))
+
+    @property
+    def encoder_name(self) -> str:
+        """Name of the encoder actually in use (differs from ``model`` after a fallback)"""
+        if self._load() is None:
+            return f"hashing-{self.hashing_dim}"
+        return self.model
+
+    def _encode_batches(self, texts: List[str]) -> np.ndarray:
+        blocks = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            function = self._load()
+            if function is None:
+                blocks.append(self._hashing_encode(batch))
+                continue
+            try:
+                blocks.append(np.asarray(function(batch), dtype=np.float32))
+            except Exception as e:
+                # Mixed dimensions would break stacking, so redo everything with hashing
+                self._fall_back(f"Embedding model '{self.model}' failed", e)
+                return self._encode_batches(texts)
+        return l2_normalize(np.vstack(blocks))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, reusing cached vectors and encoding the rest ``batch_size`` at a time
+
+        Counts and throughput of the call are left in ``last_stats``.
+
+        Returns:
+            float32 array of shape (len(texts), dim) with unit-length rows
+        """
+        if not texts:
+            return np.zeros((0, self.hashing_dim), dtype=np.float32)
+
+        start_time = time.perf_counter()
+        encoder = self.encoder_name
+        unique = list(dict.fromkeys(texts))
+
+        vectors: Dict[str, np.ndarray] = {}
+        if self.cache is not None:
+            keys = {text: self.cache.key(encoder, text) for text in unique}
+            stored = self.cache.get_many(list(keys.values()))
+            vectors = {text: stored[key] for text, key in keys.items() if key in stored}
+
+        misses = [text for text in unique if text not in vectors]
+        if misses:
+            encoded = self._encode_batches(misses)
+            if self.encoder_name != encoder:
+                # The model failed part way; cached vectors are from the other encoder
+                return self.encode(texts)
+            vectors.update(zip(misses, encoded))
+            if self.cache is not None:
+                self.cache.put_many({self.cache.key(encoder, text): vectors[text] for text in misses})
+
+        seconds = time.perf_counter() - start_time
+        self.last_stats = {
+            "texts": len(texts),
+            "cached": len(unique) - len(misses),
+            "encoded": len(misses),
+            "seconds": seconds,
+            "texts_per_second": len(texts) / seconds if seconds > 0 else float("inf"),
+        }
+        return np.vstack([vectors[text] for text in texts])
@@ -6,9 +6,12 @@
 # Output utilities
 import re
 import json
+import math
 import os
 from typing import List, Dict, Any, Optional
 
+from synthetic_data_kit.utils.text import find_json_values
+
 
 def parse_summary(chunk_index: int, text: str) -> Dict[str, str]:
     """Parse QA pairs from LLM output with enhanced error handling"""
@@ -23,6 +26,31 @@ def parse_summary(chunk_index: int, text: str) -> Dict[str, str]:
     return {"id": chunk_index, "data": cleaned_text} 
 
 
+def _collect_items(values: List[Any], required_keys: tuple) -> List[Dict[str, Any]]:
+    """Gather dicts carrying all required keys from extracted JSON values
+
+    Accepts single objects, arrays of objects and one level of nesting
+    (e.g. an array wrapped in an object or a list of arrays).
+    """
+    items = []
+
+    def visit(value, depth=0):
+        if isinstance(value, dict):
+            if all(key in value for key in required_keys):
+                items.append(value)
+            elif depth == 0:
+                for nested in value.values():
+                    if isinstance(nested, list):
+                        visit(nested, depth + 1)
+        elif isinstance(value, list) and depth <= 1:
+            for item in value:
+                visit(item, depth + 1)
+
+    for value in values:
+        visit(value)
+    return items
+
+
 def parse_qa_pairs(chunk_index: int, text: str) -> List[Dict[str, str]]:
     """Parse QA pairs from LLM output with enhanced error handling"""
     verbose = os.environ.get('SDK_VERBOSE', 'false').lower() == 'true'
@@ -30,49 +58,15 @@ def parse_qa_pairs(chunk_index: int, text: str) -> List[Dict[str, str]]:
     if verbose:
         print(f"Parsing response of length {len(text)}")
     
-    try:
-        # Try direct JSON parsing
-        if '[' in text and ']' in text:
-            # Find the first [ and last ]
-            start = text.find('[')
-            end = text.rfind(']') + 1
-            json_text = text[start:end]
-            
-            # Try to clean up the JSON to fix common issues
-            cleaned_text = re.sub(r'(\n\s*|\r\s*)', ' ', json_text)  # Remove newlines and extra spaces
-            cleaned_text = re.sub(r',(\s*\}|\s*\])', r'\1', cleaned_text)  # Remove trailing commas
-            
-            try:
-                pairs = json.loads(cleaned_text)
-                if verbose:
-                    print(f"Successfully parsed {len(pairs)} QA pairs")
-                return pairs
-            except json.JSONDecodeError as e:
-                if verbose:
-                    print(f"Direct JSON parsing failed: {e}")
-                    print(f"Attempted to parse: {cleaned_text[:200]}...")
-    except Exception as e:
-        if verbose:
-            print(f"Error during JSON extraction: {e}")
-    
-    # Fallback to regex pattern matching
-    if verbose:
-        print("Falling back to regex pattern matching")
-    qa_pattern = r'"question":\s*"((?:[^"\\]|\\.)*)"\s*,\s*"answer":\s*"((?:[^"\\]|\\.)*)"\s*'
-    pairs = []
-    
-    for match in re.finditer(qa_pattern, text):
-        try:
-            q = match.group(1).replace('\\"', '"')
-            a = match.group(2).replace('\\"', '"')
-            pairs.append({"question": q, "answer": a})
-        except Exception as e:
-            if verbose:
-                print(f"Error extracting pair: {e}")
+    values = [value for value, _, _ in find_json_values(text)]
+    pairs = [
+        {**item, "question": str(item["question"]), "answer": str(item["answer"])}
+        for item in _collect_items(values, ("question", "answer"))
+    ]
     
     if verbose:
         if pairs:
-            print(f"Extracted {len(pairs)} QA pairs with regex")
+            print(f"Successfully parsed {len(pairs)} QA pairs")
         else:
             print("No QA pairs extracted. Check the model output format.")
     
@@ -101,178 +95,23 @@ def parse_ratings(text: str, original_items: List[Dict[str, str]] = None) -> Lis
         print(f"Parsing ratings response of length {len(text)}")
         print(f"Raw response: {repr(text[:500])}")
     
-    # The multiple passes are to for edge cases that emerge when using 8B or smaller models for generating synthetic data. This is to make a comprehensive parser for faster protoyping.
-    # With 70B or bigger model, `json.load()` should "just work"
-    try:
-        # Handle the common case of indented JSON with newlines
-        # First, remove any markdown or text before/after the JSON
-        # Look for standard JSON start/end markers
-        json_content = text.strip()
-        
-        # Try to normalize escape sequences
-        json_content = json_content.replace('\\n', '\n').replace('\\r', '\r').replace('\\t', '\t')
-        
-        # Check if we have a JSON object
-        if '{' in json_content and '}' in json_content:
-            start_idx = json_content.find('{')
-            end_idx = json_content.rfind('}') + 1
-            json_text = json_content[start_idx:end_idx]
-            
-            # Clean up the JSON string to handle common issues
-            # First, convert newlines to spaces in JSON
-            json_text = re.sub(r'\s*\n\s*', ' ', json_text)
-            
-            # Now, try to parse it
-            try:
-                parsed = json.loads(json_text)
-                if isinstance(parsed, dict) and ("question" in parsed and "answer" in parsed and "rating" in parsed):
-                    if verbose:
-                        print("Successfully parsed single JSON object")
-                    return [parsed]
-            except json.JSONDecodeError as e:
-                if verbose:
-                    print(f"JSON parse error for object: {str(e)}")
-        
-        # Check if we have a JSON array
-        if '[' in json_content and ']' in json_content:
-            start_idx = json_content.find('[')
-            end_idx = json_content.rfind(']') + 1
-            json_text = json_content[start_idx:end_idx]
-            
-            # Clean up the JSON string
-            json_text = re.sub(r'\s*\n\s*', ' ', json_text)
-            
+    # A single linear scan handles code fences, surrounding prose, trailing commas
+    # and truncated arrays, which covers the quirks of 8B and smaller models
+    values = [value for value, _, _ in find_json_values(text)]
+    rated_items = []
+    for item in _collect_items(values, ("rating",)):
+        rating = item["rating"]
+        if isinstance(rating, bool) or not isinstance(rating, (int, float)):
             try:
-                parsed = json.loads(json_text)
-                if isinstance(parsed, list):
-                    for item in parsed:
-                        if not isinstance(item, dict) or "rating" not in item:
-                            if verbose:
-                                print(f"Array contains invalid item: {item}")
-                            return []
-                    if verbose:
-                        print(f"Successfully parsed {len(parsed)} items in JSON array")
-                    return parsed
-            except json.JSONDecodeError as e:
-                if verbose:
-                    print(f"JSON parse error for array: {str(e)}")
-    
-    except Exception as e:
-        if verbose:
-            print(f"Error in primary parsing approach: {str(e)}")
-    
-    # Fallback to more specific methods
-    # Method 1: Code block extraction
-    try:
-        code_blocks = re.findall(r'```(?:json)?\s*([\s\S]*?)```', text)
-        if code_blocks:
-            for block in code_blocks:
-                try:
-                    # Clean up newlines in the code block
-                    clean_block = re.sub(r'\s*\n\s*', ' ', block.strip())
-                    parsed = json.loads(clean_block)
-                    if isinstance(parsed, dict) and ("question" in parsed and "answer" in parsed and "rating" in parsed):
-                        if verbose:
-                            print("Successfully parsed from code block (single object)")
-                        return [parsed]
-                    elif isinstance(parsed, list):
-                        valid_items = True
-                        for item in parsed:
-                            if not isinstance(item, dict) or "rating" not in item:
-                                valid_items = False
-                                break
-                        if valid_items and len(parsed) > 0:
-                            if verbose:
-                                print(f"Successfully parsed {len(parsed)} items from code block")
-                            return parsed
-                except json.JSONDecodeError:
-                    pass
-    except Exception as e:
-        if verbose:
-            print(f"Error in code block extraction: {str(e)}")
-    
-    # Method 2: Regex
-    try:
-        # Look for JSON patterns in the text
-        json_patterns = [
-            # Single object pattern
-            r'(\{\s*"question"\s*:\s*"[^"]*"\s*,\s*"answer"\s*:\s*"[^"]*"\s*,\s*"rating"\s*:\s*\d+(?:\.\d+)?\s*\})',
-            # Array pattern
-            r'(\[\s*\{\s*"question"\s*:.*"rating"\s*:\s*\d+(?:\.\d+)?\s*\}\s*\])'
-        ]
-        
-        for pattern in json_patterns:
-            matches = re.findall(pattern, text, re.DOTALL)
-            if matches:
-                for match in matches:
-                    try:
-                        # Clean up newlines in the match
-                        clean_match = re.sub(r'\s*\n\s*', ' ', match)
-                        parsed = json.loads(clean_match)
-                        if isinstance(parsed, dict) and ("question" in parsed and "answer" in parsed and "rating" in parsed):
-                            if verbose:
-                                print("Successfully parsed using regex (single object)")
-                            return [parsed]
-                        elif isinstance(parsed, list) and all("rating" in item for item in parsed):
-                            if verbose:
-                                print(f"Successfully parsed {len(parsed)} items using regex")
-                            return parsed
-                    except json.JSONDecodeError:
-                        pass
-    except Exception as e:
-        if verbose:
-            print(f"Error in regex extraction: {str(e)}")
+                item["rating"] = float(rating)
+            except (TypeError, ValueError):
+                continue
+        rated_items.append(item)
     
-    # Method 3: Try using json5 if available (more lenient parser)
-    try:
-        import json5
-        try:
-            parsed = json5.loads(text)
-            if isinstance(parsed, dict) and ("question" in parsed and "answer" in parsed and "rating" in parsed):
-                if verbose:
-                    print("Successfully parsed using json5 (single object)")
-                return [parsed]
-            elif isinstance(parsed, list) and all("rating" in item for item in parsed):
-                if verbose:
-                    print(f"Successfully parsed {len(parsed)} items using json5")
-                return parsed
-        except:
-            pass
-    except ImportError:
-        if verbose:
-            print("json5 not available")
-    
-    # If we reach here, try one last aggressive approach
-    try:
-        # Try line-by-line parsing for each item
-        if original_items and len(original_items) > 0:
-            # Look for patterns that include both the question and rating
-            found_items = []
-            for item in original_items:
-                # Escape regex special characters in question text
-                question_escaped = re.escape(item.get("question", ""))
-                pattern = f'.*{question_escaped}.*"rating"\\s*:\\s*(\\d+(?:\\.\\d+)?)'
-                match = re.search(pattern, text, re.DOTALL)
-                if match:
-                    try:
-                        rating = float(match.group(1))
-                        found_items.append({
-                            "question": item.get("question", ""),
-                            "answer": item.get("answer", ""),
-                            "rating": rating
-                        })
-                        if verbose:
-                            print(f"Found rating {rating} for question: {item.get('question', '')[:30]}...")
-                    except:
-                        pass
-            
-            if found_items:
-                if verbose:
-                    print(f"Extracted {len(found_items)} ratings using pattern matching")
-                return found_items
-    except Exception as e:
+    if rated_items:
         if verbose:
-            print(f"Error in final extraction attempt: {str(e)}")
+            print(f"Successfully parsed {len(rated_items)} rated items")
+        return rated_items
     
     # If we reach here, we couldn't extract valid JSON
     if verbose:
@@ -282,6 +121,143 @@ def parse_ratings(text: str, original_items: List[Dict[str, str]] = None) -> Lis
     error_snippet = text[:100] if len(text) > 100 else text
     raise ValueError(f"Could not parse JSON with ratings: {error_snippet}")
 
+def rating_payload(qa_pairs: List[Dict[str, Any]],
+                   chunks: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Build the items shown to the rater for a batch of QA pairs
+    
+    Each pair is sent with its position in the batch as ``id``, which the
+    rater returns instead of echoing the pair. Provenance and other
+    bookkeeping stay out of the prompt. With ``chunks`` (chunk id -> text, as
+    saved by create), the passage each pair was generated from is attached
+    as ``context``.
+    """
+    payload = []
+    for i, pair in enumerate(qa_pairs):
+        item = {"id": i, "question": pair["question"], "answer": pair["answer"]}
+        source = pair.get("source") or {}
+        if chunks and source.get("chunk_id") in chunks:
+            item["context"] = chunks[source["chunk_id"]]
+        payload.append(item)
+    return payload
+
+def _rating_id(item: Dict[str, Any]) -> Optional[int]:
+    value = item.get("id")
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def match_ratings(original_items: List[Dict[str, Any]],
+                  rated_items: List[Dict[str, Any]]) -> Dict[int, Any]:
+    """Map positions in ``original_items`` to the rating the rater gave them
+    
+    Ratings are joined by the ``id`` sent in ``rating_payload``. Items without
+    a usable id (e.g. from a prompt that still echoes pairs) fall back to an
+    exact match on question text. Each original is rated at most once, and
+    ratings that match no original are dropped.
+    """
+    by_question = {}
+    for i, pair in enumerate(original_items):
+        by_question.setdefault(str(pair.get("question", "")).strip(), i)
+    
+    matched = {}
+    for item in rated_items:
+        index = _rating_id(item)
+        if index is None or not 0 <= index < len(original_items):
+            index = by_question.get(str(item.get("question", "")).strip())
+        if index is None or index in matched:
+            continue
+        matched[index] = item["rating"]
+    return matched
+
+def expected_score(top_logprobs: Dict[str, float], low: int = 1, high: int = 10) -> Optional[float]:
+    """Probability-weighted mean of the score tokens among one position's top logprobs
+    
+    Tokens that are whole numbers from ``low`` to ``high`` in ASCII digits
+    (ignoring surrounding whitespace) count as scores; other digit characters
+    such as superscripts are skipped. Their probabilities are renormalised
+    over the scores found. Returns None if none is present.
+    """
+    weights = {}
+    for token, logprob in top_logprobs.items():
+        token = token.strip()
+        if not (token.isascii() and token.isdecimal()):
+            continue
+        score = int(token)
+        if low <= score <= high:
+            weights[score] = weights.get(score, 0.0) + math.exp(logprob)
+    total = sum(weights.values())
+    if total <= 0:
+        return None
+    return sum(score * weight for score, weight in weights.items()) / total
+
+def logprob_rating(response: str, low: int = 1, high: int = 10) -> float:
+    """Rating from a single-score-token response (see ``qa_rating_logprob``)
+    
+    Uses the expected score over the first token's ``top_logprobs`` when the
+    response carries them, otherwise the score written in the text.
+    
+    Raises:
+        ValueError: If the response holds neither
+    """
+    positions = getattr(response, 'top_logprobs', None)
+    if positions:
+        score = expected_score(positions[0], low, high)
+        if score is not None:
+            return round(score, 3)
+    match = re.match(r'\s*(\d+)', response)
+    if match and low <= int(match.group(1)) <= high:
+        return float(match.group(1))
+    raise ValueError(f"No score token in rating response: {response[:100]}")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of ``text`` (about four characters per token)"""
+    return len(text) // 4 + 1
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def format_rating_prompt(template: str, qa_pairs: List[Dict[str, Any]],
+                         chunks: Optional[Dict[str, str]] = None) -> str:
+    """Fill the ``qa_rating`` template with a batch serialised as compact JSON"""
+    return template.format(pairs=_compact_json(rating_payload(qa_pairs, chunks)))
+
+def format_logprob_rating_prompt(template: str, qa_pair: Dict[str, Any],
+                                 chunks: Optional[Dict[str, str]] = None) -> str:
+    """Fill the ``qa_rating_logprob`` template with one pair serialised as compact JSON"""
+    item = rating_payload([qa_pair], chunks)[0]
+    del item["id"]
+    return template.format(pair=_compact_json(item))
+
+def pack_rating_batches(qa_pairs: List[Dict[str, Any]], template: str,
+                        max_prompt_tokens: int, max_batch_size: Optional[int] = None,
+                        chunks: Optional[Dict[str, str]] = None) -> List[List[Dict[str, Any]]]:
+    """Group QA pairs into rating batches that fit a prompt token budget
+    
+    Pairs are packed in order; a batch is closed when the next pair would take
+    its prompt past ``max_prompt_tokens`` or it holds ``max_batch_size`` pairs.
+    A pair that alone exceeds the budget is rated on its own.
+    """
+    overhead = estimate_tokens(template.format(pairs="[]"))
+    batches = []
+    current = []
+    used = overhead
+    for i, item in enumerate(rating_payload(qa_pairs, chunks)):
+        # Ids restart in every batch, so the estimate allows for a few digits
+        cost = estimate_tokens(_compact_json(item)) + 1
+        full = max_batch_size is not None and len(current) >= max_batch_size
+        if current and (full or used + cost > max_prompt_tokens):
+            batches.append(current)
+            current = []
+            used = overhead
+        current.append(qa_pairs[i])
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
 def convert_to_conversation_format(qa_pairs: List[Dict[str, str]], 
                                  system_prompt: Optional[str] = None) -> List[List[Dict[str, str]]]:
     """Convert QA pairs to conversation format"""
@@ -0,0 +1,87 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Per-document record of generated outputs, for incremental regeneration
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+MANIFEST_VERSION = 1
+
+
+class GenerationManifest:
+    """Generated outputs of one document, keyed by a hash of everything that produced them
+
+    Keys cover the request content (chunk text and formatted prompt), the model
+    and any generation parameters passed to ``key``, so a cached entry is only
+    reused when re-sending that request would be pointless. Entries that were
+    not used during a run are dropped on ``save``, which keeps the manifest in
+    step with the current version of the document.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Any] = {}
+        self._used: Set[str] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @classmethod
+    def for_document(
+        cls, output_dir: str, document_name: str, manifest_dir: str = ".manifests"
+    ) -> "GenerationManifest":
+        """Open (or start) the manifest for a document under ``output_dir``"""
+        return cls(os.path.join(output_dir, manifest_dir, f"{document_name}.json"))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # A damaged manifest only costs a full regeneration
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self._entries = data.get("entries", {})
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Content hash of the given request parts"""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored output for ``key``, or None"""
+        with self._lock:
+            if key in self._entries:
+                self._used.add(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        """Store the output produced for ``key``"""
+        with self._lock:
+            self._entries[key] = value
+            self._used.add(key)
+
+    def save(self):
+        """Write entries used in this run, atomically replacing the previous manifest"""
+        with self._lock:
+            entries = {key: value for key, value in self._entries.items() if key in self._used}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
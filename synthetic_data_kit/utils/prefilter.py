@@ -0,0 +1,109 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Rule-based QA pair checks that run before LLM rating
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from synthetic_data_kit.utils.text import content_hash
+from synthetic_data_kit.utils.vectorize import hashed_counts, tokenize
+
+
+def support_scores(
+    answers: List[str], sources: List[Optional[str]], dim: int = 4096, block_size: int = 1024
+) -> np.ndarray:
+    """Share of each answer's terms that occur in its source passage
+
+    Terms are weighted by their inverse document frequency across the distinct
+    sources (as in BM25), so an answer is not supported merely by sharing
+    common words with its passage. Pairs without a source score NaN.
+
+    Returns:
+        float32 array of shape (len(answers),) with values in [0, 1]
+    """
+    scores = np.full(len(answers), np.nan, dtype=np.float32)
+    distinct = list(dict.fromkeys(source for source in sources if source is not None))
+    if not distinct:
+        return scores
+
+    present = hashed_counts(distinct, dim=dim) > 0
+    document_frequency = present.sum(axis=0)
+    idf = (np.log((1 + len(distinct)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+
+    row_of = {source: row for row, source in enumerate(distinct)}
+    with_source = np.array([i for i, source in enumerate(sources) if source is not None])
+    for start in range(0, len(with_source), block_size):
+        block = with_source[start : start + block_size]
+        terms = (hashed_counts([answers[i] for i in block], dim=dim) > 0) * idf
+        found = present[[row_of[sources[i]] for i in block]]
+        total = terms.sum(axis=1)
+        supported = (terms * found).sum(axis=1)
+        scores[block] = np.divide(supported, total, out=np.zeros_like(total), where=total > 0)
+    return scores
+
+
+def prefilter_qa_pairs(
+    qa_pairs: List[Dict[str, Any]],
+    chunks: Optional[Dict[str, str]],
+    prefilter_config: Dict[str, Any],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split pairs into those still to be rated, auto-accepted and rejected
+
+    Pairs are rejected for a missing or too short question or answer, an answer
+    longer than ``max_answer_ratio`` times its source chunk, a question that
+    repeats an earlier one verbatim (ignoring case, punctuation and spacing) or
+    a support score below ``min_support``. With ``accept_support`` set, pairs
+    supported at least that well skip rating and get ``accepted_rating``.
+    Length and support checks need the ``chunks`` map saved by create.
+
+    Returns:
+        ``(to_rate, accepted, rejected)``; rejected pairs carry the reason under
+        ``prefilter``
+    """
+    chunks = chunks or {}
+    questions = [str(pair.get("question", "")).strip() for pair in qa_pairs]
+    answers = [str(pair.get("answer", "")).strip() for pair in qa_pairs]
+    sources = [chunks.get((pair.get("source") or {}).get("chunk_id")) for pair in qa_pairs]
+
+    question_chars = np.array([len(q) for q in questions])
+    answer_chars = np.array([len(a) for a in answers])
+    source_chars = np.array([len(s) if s is not None else np.inf for s in sources])
+    support = support_scores(answers, sources)
+
+    # First occurrence of each normalised question is kept
+    hashes = [content_hash(" ".join(tokenize(q))) for q in questions]
+    _, first = np.unique(hashes, return_index=True)
+    duplicate = np.ones(len(qa_pairs), dtype=bool)
+    duplicate[first] = False
+
+    min_support = prefilter_config.get("min_support", 0.1)
+    checks = [
+        ("question too short", question_chars < prefilter_config.get("min_question_chars", 5)),
+        ("answer too short", answer_chars < prefilter_config.get("min_answer_chars", 1)),
+        (
+            "answer longer than source",
+            answer_chars > prefilter_config.get("max_answer_ratio", 1.0) * source_chars,
+        ),
+        ("duplicate question", duplicate),
+        ("unsupported by source", np.nan_to_num(support, nan=1.0) < min_support),
+    ]
+    reasons: List[Optional[str]] = [None] * len(qa_pairs)
+    for reason, failed in checks:
+        for i in np.flatnonzero(failed):
+            reasons[i] = reasons[i] or reason
+
+    accept_support = prefilter_config.get("accept_support")
+    accepted_rating = prefilter_config.get("accepted_rating", 8.0)
+
+    to_rate, accepted, rejected = [], [], []
+    for i, pair in enumerate(qa_pairs):
+        if reasons[i] is not None:
+            rejected.append({**pair, "prefilter": reasons[i]})
+        elif accept_support is not None and support[i] >= accept_support:
+            accepted.append({**pair, "rating": accepted_rating, "rating_source": "prefilter"})
+        else:
+            to_rate.append(pair)
+    return to_rate, accepted, rejected
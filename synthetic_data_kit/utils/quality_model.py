@@ -0,0 +1,209 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Local QA pair quality classifier trained on past LLM ratings
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from synthetic_data_kit.utils.prefilter import support_scores
+from synthetic_data_kit.utils.vectorize import hashed_counts, tokenize
+
+# Ratings that did not come from an LLM are never used as training labels
+UNLEARNED_SOURCES = ("prefilter", "predictor", "audit")
+
+
+def _dense_features(
+    questions: List[str], answers: List[str], sources: List[Optional[str]]
+) -> np.ndarray:
+    """Length and overlap features of each pair, before standardisation"""
+    features = np.zeros((len(questions), 6), dtype=np.float32)
+    for row, (question, answer) in enumerate(zip(questions, answers)):
+        question_terms = set(tokenize(question))
+        answer_terms = set(tokenize(answer))
+        features[row, 0] = np.log1p(len(question))
+        features[row, 1] = np.log1p(len(answer))
+        features[row, 2] = np.log1p(len(answer_terms))
+        features[row, 3] = len(question_terms & answer_terms) / max(len(question_terms), 1)
+    support = support_scores(answers, sources)
+    features[:, 4] = np.nan_to_num(support, nan=0.0)
+    features[:, 5] = ~np.isnan(support)
+    return features
+
+
+class QualityPredictor:
+    """Logistic regression predicting whether the LLM would rate a pair at or above threshold
+
+    Features are log-scaled hashed unigram and bigram counts of the question
+    and of the answer (``dim`` buckets each), plus standardised lengths,
+    question/answer term overlap and support of the answer by its source
+    chunk (see ``support_scores``). Trained with mini-batch Adam in NumPy.
+
+    ``threshold`` is the rating the labels were cut at; ``accepted_rating`` and
+    ``rejected_rating`` are the mean LLM ratings of the training pairs on
+    either side, recorded for pairs the predictor decides alone.
+    """
+
+    def __init__(self, dim: int = 2048, l2: float = 1e-4):
+        self.dim = dim
+        self.l2 = l2
+        self.weights = np.zeros(2 * dim + 6, dtype=np.float32)
+        self.bias = 0.0
+        self.mean = np.zeros(6, dtype=np.float32)
+        self.std = np.ones(6, dtype=np.float32)
+        self.threshold: Optional[float] = None
+        self.accepted_rating: Optional[float] = None
+        self.rejected_rating: Optional[float] = None
+        self.report: Dict[str, Any] = {}
+
+    def _raw_features(
+        self, qa_pairs: List[Dict[str, Any]], chunks: Optional[Dict[str, str]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        chunks = chunks or {}
+        questions = [str(pair.get("question", "")) for pair in qa_pairs]
+        answers = [str(pair.get("answer", "")) for pair in qa_pairs]
+        sources = [chunks.get((pair.get("source") or {}).get("chunk_id")) for pair in qa_pairs]
+        text = np.hstack(
+            [
+                np.log1p(hashed_counts(questions, dim=self.dim, ngram_range=(1, 2))),
+                np.log1p(hashed_counts(answers, dim=self.dim, ngram_range=(1, 2))),
+            ]
+        )
+        return text, _dense_features(questions, answers, sources)
+
+    def features(
+        self, qa_pairs: List[Dict[str, Any]], chunks: Optional[Dict[str, str]] = None
+    ) -> np.ndarray:
+        """Feature matrix of shape (len(qa_pairs), 2 * dim + 6)"""
+        text, dense = self._raw_features(qa_pairs, chunks)
+        return np.hstack([text, (dense - self.mean) / self.std])
+
+    def fit(
+        self,
+        qa_pairs: List[Dict[str, Any]],
+        labels: np.ndarray,
+        chunks: Optional[Dict[str, str]] = None,
+        epochs: int = 5,
+        batch_size: int = 256,
+        learning_rate: float = 0.05,
+        seed: int = 0,
+    ) -> "QualityPredictor":
+        """Fit on pairs labelled True where the LLM rated them at or above threshold
+
+        Features are computed per mini-batch, so memory use does not grow
+        with the number of training pairs.
+        """
+        labels = np.asarray(labels, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+
+        # Standardisation statistics of the dense features over the whole set
+        dense = np.vstack(
+            [
+                self._raw_features(qa_pairs[start : start + 4096], chunks)[1]
+                for start in range(0, len(qa_pairs), 4096)
+            ]
+        )
+        self.mean = dense.mean(axis=0)
+        self.std = dense.std(axis=0)
+        self.std[self.std == 0] = 1.0
+
+        # Adam state for the weights and the bias (stored as the last entry)
+        params = np.append(self.weights, np.float32(self.bias)).astype(np.float32)
+        first = np.zeros_like(params)
+        second = np.zeros_like(params)
+        step = 0
+        for _ in range(epochs):
+            order = rng.permutation(len(qa_pairs))
+            for start in range(0, len(order), batch_size):
+                batch = order[start : start + batch_size]
+                x = self.features([qa_pairs[i] for i in batch], chunks)
+                y = labels[batch]
+                p = 1.0 / (1.0 + np.exp(-(x @ params[:-1] + params[-1])))
+                error = (p - y) / len(batch)
+                gradient = np.append(x.T @ error + self.l2 * params[:-1], error.sum())
+
+                step += 1
+                first = 0.9 * first + 0.1 * gradient
+                second = 0.999 * second + 0.001 * gradient**2
+                corrected = first / (1 - 0.9**step)
+                params -= learning_rate * corrected / (np.sqrt(second / (1 - 0.999**step)) + 1e-8)
+
+        self.weights = params[:-1]
+        self.bias = float(params[-1])
+        return self
+
+    def predict_proba(
+        self,
+        qa_pairs: List[Dict[str, Any]],
+        chunks: Optional[Dict[str, str]] = None,
+        block_size: int = 1024,
+    ) -> np.ndarray:
+        """Probability that each pair would be rated at or above ``threshold``"""
+        probabilities = np.zeros(len(qa_pairs), dtype=np.float32)
+        for start in range(0, len(qa_pairs), block_size):
+            x = self.features(qa_pairs[start : start + block_size], chunks)
+            probabilities[start : start + block_size] = 1.0 / (
+                1.0 + np.exp(-(x @ self.weights + self.bias))
+            )
+        return probabilities
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        meta = {
+            "dim": self.dim,
+            "l2": self.l2,
+            "bias": self.bias,
+            "threshold": self.threshold,
+            "accepted_rating": self.accepted_rating,
+            "rejected_rating": self.rejected_rating,
+            "report": self.report,
+        }
+        with open(path, "wb") as f:
+            np.savez(
+                f, weights=self.weights, mean=self.mean, std=self.std, meta=np.array(json.dumps(meta))
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "QualityPredictor":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            predictor = cls(dim=meta["dim"], l2=meta["l2"])
+            predictor.weights = data["weights"]
+            predictor.mean = data["mean"]
+            predictor.std = data["std"]
+        predictor.bias = meta["bias"]
+        predictor.threshold = meta["threshold"]
+        predictor.accepted_rating = meta["accepted_rating"]
+        predictor.rejected_rating = meta["rejected_rating"]
+        predictor.report = meta.get("report", {})
+        return predictor
+
+
+def evaluate_predictions(
+    probabilities: np.ndarray, labels: np.ndarray, accept: float, reject: float
+) -> Dict[str, Any]:
+    """Agreement of predictions with LLM labels, overall and where the predictor is confident
+
+    Pairs with probability at or above ``accept`` or at or below ``reject`` are
+    the ones curate would not send to the LLM; ``coverage`` is their share and
+    ``confident_accuracy`` how often they match the LLM.
+    """
+    labels = np.asarray(labels, dtype=bool)
+    predicted = probabilities >= 0.5
+    confident = (probabilities >= accept) | (probabilities <= reject)
+    report = {
+        "pairs": int(len(labels)),
+        "positive_rate": round(float(labels.mean()), 3) if len(labels) else 0,
+        "accuracy": round(float((predicted == labels).mean()), 3) if len(labels) else 0,
+        "coverage": round(float(confident.mean()), 3) if len(labels) else 0,
+        "confident_accuracy": (
+            round(float((predicted[confident] == labels[confident]).mean()), 3)
+            if confident.any()
+            else None
+        ),
+    }
+    return report
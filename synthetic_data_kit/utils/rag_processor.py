@@ -4,44 +4,129 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 # Output utilities
-import os
-import chromadb
-from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+from typing import Any, Dict, List, Optional, Tuple
 
+from synthetic_data_kit.utils.config import load_config, get_rag_config, get_embedding_config
+from synthetic_data_kit.utils.text import chunk_id, content_hash, document_id
+from synthetic_data_kit.utils.vector_store import VectorStore, get_vector_store
 
-def get_collection(collection_name: str, truncate: bool = False) -> chromadb.Collection:
-    client = chromadb.HttpClient(host="ubuntu.wsl.local", port=9000)
-    # Create collection. get_collection, get_or_create_collection, delete_collection also available!
-    if truncate:
-        try:
-            collection = client.delete_collection(name=collection_name)
-            collection = client.create_collection(name=collection_name)
-        except Exception as e:
-            # Collection does not exist, create it
-            collection = client.create_collection(name=collection_name)
-    else:
-        try:
-            collection = client.get_or_create_collection(name=collection_name)
-        except Exception as e:
-            # Collection does not exist, create it
-            raise ValueError(f"Could not create vectordatabase collection:\n {str(e)}")
 
+def get_collection(
+    collection_name: Optional[str] = None,
+    truncate: bool = False,
+    config: Optional[Dict[str, Any]] = None,
+) -> VectorStore:
+    """Open the configured vector store (see the ``rag`` config section)
+
+    Stores are cached per process, so repeated calls do not reconnect.
+    """
+    config = config if config is not None else load_config()
+    rag_config = dict(get_rag_config(config))
+    if collection_name is not None:
+        rag_config["collection"] = collection_name
+    try:
+        collection = get_vector_store(rag_config, get_embedding_config(config))
+    except Exception as e:
+        raise ValueError(f"Could not create vectordatabase collection:\n {str(e)}")
+
+    if truncate:
+        collection.reset()
     return collection
 
 
-def reset_collection(collection_name: str = "synthetic_data_kit"):
-    get_collection(collection_name=collection_name, truncate=True)
+def reset_collection(collection_name: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
+    get_collection(collection_name=collection_name, truncate=True, config=config)
+
+
+def delete_document(
+    filename: str, collection_name: Optional[str] = None, config: Optional[Dict[str, Any]] = None
+):
+    """Remove every chunk written for one document, leaving other documents in place"""
+    get_collection(collection_name, config=config).delete(where={"filename": filename})
 
 
 def wrte_chunks(
-    chunks: list[str], metas: list[dict], collection_name: str = "synthetic_data_kit"
+    chunks: List[str],
+    metas: List[dict],
+    collection_name: Optional[str] = None,
+    ids: Optional[List[str]] = None,
+    config: Optional[Dict[str, Any]] = None,
 ) -> bool:
     try:
-        collection = get_collection(collection_name)
-        ids = [str(i) for i in range(len(chunks))]
-        collection.add(ids=ids, documents=chunks, metadatas=metas)
-        print(f"Loaded {str(collection.count())} chunks into {collection_name}")
+        collection = get_collection(collection_name, config=config)
+        if ids is None:
+            ids = [content_hash(chunk) for chunk in chunks]
+
+        # Embed up front in large batches; unchanged chunks come from the embedding cache
+        embeddings = collection.embedder.encode(chunks)
+        stats = collection.embedder.last_stats
+        print(
+            f"Embedded {len(chunks)} chunks ({stats.get('cached', 0)} cached, "
+            f"{stats.get('encoded', 0)} encoded) at {stats.get('texts_per_second', 0):.1f} chunks/s"
+        )
+
+        collection.upsert(ids=ids, documents=chunks, metadatas=metas, embeddings=embeddings)
+        collection.flush()
+        print(f"Loaded {str(collection.count())} chunks into {collection_name or 'the vector store'}")
         return True
     except Exception as e:
         print(f"  Error processing with exception:/n {str(e)}")
         return False
+
+
+def sync_document(
+    filename: str,
+    chunks: List[Tuple[int, str]],
+    metas: List[dict],
+    collection_name: Optional[str] = None,
+    config: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """Bring one document's chunks in the index up to date
+
+    Chunks are stored under ``<document id>:<offset>`` ids. Unchanged chunks are
+    left alone, new or changed ones are upserted and chunks that no longer exist
+    are deleted, so other documents in the index are never touched.
+
+    Args:
+        filename: Source document path
+        chunks: ``(offset, text)`` pairs from ``split_into_chunks_with_offsets``
+        metas: Extra metadata per chunk (e.g. its summary)
+    """
+    try:
+        collection = get_collection(collection_name, config=config)
+        doc_id = document_id(filename)
+        ids = [chunk_id(doc_id, offset) for offset, _ in chunks]
+        metas = [
+            {
+                **meta,
+                "filename": filename,
+                "doc_id": doc_id,
+                "offset": offset,
+                "content_hash": content_hash(text),
+            }
+            for (offset, text), meta in zip(chunks, metas)
+        ]
+
+        existing = collection.get(where={"doc_id": doc_id})
+        current = set(ids)
+        stale = [item_id for item_id in existing if item_id not in current]
+        changed = [i for i, item_id in enumerate(ids) if existing.get(item_id) != metas[i]]
+
+        if stale:
+            collection.delete(ids=stale)
+        print(
+            f"Indexing {filename}: {len(ids) - len(changed)} chunks unchanged, "
+            f"{len(changed)} to write, {len(stale)} removed"
+        )
+        if not changed:
+            return True
+        return wrte_chunks(
+            [chunks[i][1] for i in changed],
+            [metas[i] for i in changed],
+            collection_name,
+            ids=[ids[i] for i in changed],
+            config=config,
+        )
+    except Exception as e:
+        print(f"  Error processing with exception:/n {str(e)}")
+        return False
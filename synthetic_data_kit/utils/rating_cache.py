@@ -0,0 +1,42 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# On-disk cache of QA pair ratings
+import hashlib
+import json
+from typing import Optional
+
+from synthetic_data_kit.utils.sqlite_cache import SQLiteCache
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+class RatingCache(SQLiteCache):
+    """Ratings keyed by a hash of the normalised pair, rating prompt and model (SQLite)
+
+    Anything that could change a rating is part of the key: question and
+    answer (case and whitespace folded), the attached context, the rating
+    prompt template and the model. Re-running curate with another threshold
+    therefore rates nothing again.
+    """
+
+    table = "ratings"
+    column = "rating"
+    column_type = "REAL"
+
+    @staticmethod
+    def key(
+        question: str, answer: str, rubric: str, model: str, context: Optional[str] = None
+    ) -> str:
+        payload = json.dumps(
+            [_normalize(question), _normalize(answer), context or "", rubric, model],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _encode(self, rating: float) -> float:
+        return float(rating)
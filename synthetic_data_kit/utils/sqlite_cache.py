@@ -0,0 +1,68 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Key/value cache tables in a local SQLite file
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List
+
+
+class SQLiteCache:
+    """Thread-safe key/value table in a SQLite file, shared by the on-disk caches
+
+    Subclasses name the ``table`` and its value ``column`` (with its SQL
+    ``column_type``) and convert values with ``_encode`` and ``_decode``.
+    """
+
+    table = "cache"
+    column = "value"
+    column_type = "BLOB"
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            f"(key TEXT PRIMARY KEY, {self.column} {self.column_type} NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def _encode(self, value: Any) -> Any:
+        return value
+
+    def _decode(self, stored: Any) -> Any:
+        return stored
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Stored values for whichever of ``keys`` are present"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, {self.column} FROM {self.table} "
+                    f"WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, stored in rows:
+                    found[key] = self._decode(stored)
+        return found
+
+    def put_many(self, items: Dict[str, Any]):
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, {self.column}) VALUES (?, ?)",
+                [(key, self._encode(value)) for key, value in items.items()],
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
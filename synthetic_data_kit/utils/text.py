@@ -4,9 +4,10 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 # Text processing utilities
-import re
+import hashlib
 import json
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Tuple
 
 # def split_into_chunks(text: str, chunk_size: int = 4000, overlap: int = 200) -> List[str]:
 #     """Split text into chunks with optional overlap"""
@@ -35,7 +36,9 @@ from typing import List, Dict, Any
 #     return chunks
 
 
-def split_into_chunks(text: str, chunk_size: int = 4000, overlap: int = 200) -> List[str]:
+def split_into_chunks_with_offsets(
+    text: str, chunk_size: int = 4000, overlap: int = 200
+) -> List[Tuple[int, str]]:
     """
     Split the input text into chunks of at most `chunk_size` characters,
     ensuring that each successive chunk overlaps the previous by
@@ -43,13 +46,16 @@ def split_into_chunks(text: str, chunk_size: int = 4000, overlap: int = 200) ->
 
     The function tries to break at paragraph boundaries first, then at
     sentence boundaries, and finally at word boundaries if necessary.
+
+    Returns:
+        List of ``(offset, chunk)`` where ``offset`` is the chunk's start in ``text``
     """
 
-    chunks: List[str] = []
+    chunks: List[Tuple[int, str]] = []
 
     # Edge-case: if the text is already shorter than the chunk size
     if len(text) <= chunk_size:
-        return [text]
+        return [(0, text)]
 
     start = 0
     split_at = 0
@@ -61,7 +67,7 @@ def split_into_chunks(text: str, chunk_size: int = 4000, overlap: int = 200) ->
 
         if end >= text_len:
             # Last chunk: just take the rest
-            chunks.append(text[start:])
+            chunks.append((start, text[start:]))
             break
 
         # 1. Look back for a paragraph break
@@ -82,7 +88,7 @@ def split_into_chunks(text: str, chunk_size: int = 4000, overlap: int = 200) ->
                     # Fallback: hard cut at chunk_size
                     split_at = end
 
-        chunks.append(text[start:split_at])
+        chunks.append((start, text[start:split_at]))
         # Move the start pointer back by `overlap`, but never before 0
         start = max(split_at - overlap, 0)
 
@@ -93,33 +99,174 @@ def split_into_chunks(text: str, chunk_size: int = 4000, overlap: int = 200) ->
     return chunks
 
 
-def extract_json_from_text(text: str) -> Dict[str, Any]:
-    """Extract JSON from text that might contain markdown or other content"""
-    text = text.strip()
+def split_into_chunks(text: str, chunk_size: int = 4000, overlap: int = 200) -> List[str]:
+    """Split text into chunks (see ``split_into_chunks_with_offsets``)"""
+    return [chunk for _, chunk in split_into_chunks_with_offsets(text, chunk_size, overlap)]
 
-    # Try to parse as complete JSON
-    if text.startswith("{") and text.endswith("}") or text.startswith("[") and text.endswith("]"):
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
-
-    # Look for JSON within Markdown code blocks
-    json_pattern = r"```(?:json)?\s*([\s\S]*?)\s*```"
-    match = re.search(json_pattern, text)
-    if match:
-        try:
-            return json.loads(match.group(1).strip())
-        except json.JSONDecodeError:
-            pass
-
-    # Try a more aggressive pattern
-    json_pattern = r"\{[\s\S]*\}|\[[\s\S]*\]"
-    match = re.search(json_pattern, text)
-    if match:
+
+def document_id(name: str) -> str:
+    """Stable id for a source document, derived from its absolute path"""
+    return hashlib.sha1(os.path.abspath(name).encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_id(doc_id: str, offset: int) -> str:
+    """Id of the chunk starting at ``offset`` in document ``doc_id``"""
+    return f"{doc_id}:{offset}"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+_JSON_OPENERS = {"{": "}", "[": "]"}
+_JSON_DECODER = json.JSONDecoder(strict=False)  # models often emit raw newlines inside strings
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket, outside of strings"""
+    out = []
+    in_string = False
+    escaped = False
+    pending_comma = None  # index into out of a comma that may be trailing
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch in "}]" and pending_comma is not None:
+            out[pending_comma] = ""
+        if ch == ",":
+            pending_comma = len(out)
+        elif not ch.isspace():
+            pending_comma = None
+        if ch == '"':
+            in_string = True
+        out.append(ch)
+    return "".join(out)
+
+
+def _decode_span(text: str) -> Tuple[bool, Any]:
+    """Decode a bracket-balanced span, tolerating trailing commas"""
+    for candidate in (text, None):
+        if candidate is None:
+            candidate = _strip_trailing_commas(text)
+            if candidate == text:
+                break
         try:
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
-            pass
+            value, end = _JSON_DECODER.raw_decode(candidate)
+        except (json.JSONDecodeError, RecursionError):
+            continue
+        if not candidate[end:].strip():
+            return True, value
+    return False, None
+
+
+def _scan_json_spans(text: str) -> List[Tuple[int, int, bool, List[Tuple[int, int]]]]:
+    """Find top-level bracket spans in a single pass over the text
+
+    Returns a list of ``(start, end, closed, children)`` tuples where
+    ``children`` are the balanced spans directly nested in the top-level one.
+    Quotes are only tracked inside brackets, so prose around the JSON cannot
+    confuse the string state.
+    """
+    spans = []
+    stack: List[Tuple[str, int]] = []
+    children: List[Tuple[int, int]] = []
+    in_string = False
+    escaped = False
+
+    for i, ch in enumerate(text):
+        if not stack:
+            if ch in _JSON_OPENERS:
+                stack.append((_JSON_OPENERS[ch], i))
+                children = []
+            continue
+
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _JSON_OPENERS:
+            stack.append((_JSON_OPENERS[ch], i))
+        elif ch in "}]":
+            closer, start = stack.pop()
+            if ch != closer:
+                # Mismatched bracket: give up on this value but keep what nested cleanly
+                spans.append((stack[0][1] if stack else start, i + 1, False, children))
+                stack = []
+            elif len(stack) == 1:
+                children.append((start, i + 1))
+            elif not stack:
+                spans.append((start, i + 1, True, children))
+
+    if stack:
+        # Unterminated value, e.g. a response cut off at max_tokens
+        spans.append((stack[0][1], len(text), False, children))
+
+    return spans
+
+
+def find_json_values(text: str, salvage: bool = True) -> List[Tuple[Any, int, int]]:
+    """Extract every complete top-level JSON value from LLM output
+
+    The text is scanned once for balanced ``{...}``/``[...]`` spans and each
+    span is decoded with ``json.JSONDecoder.raw_decode``, so parsing time is
+    linear in the length of the response. Markdown code fences and prose
+    around the JSON are ignored and trailing commas are tolerated.
+
+    Args:
+        text: Raw model response
+        salvage: If a top-level value is truncated or malformed, return the
+            complete values nested directly inside it instead
+
+    Returns:
+        List of ``(value, start, end)`` tuples in order of appearance
+    """
+    values = []
+    for start, end, closed, children in _scan_json_spans(text):
+        if closed:
+            ok, value = _decode_span(text[start:end])
+            if ok:
+                values.append((value, start, end))
+                continue
+        if salvage:
+            for child_start, child_end in children:
+                ok, value = _decode_span(text[child_start:child_end])
+                if ok:
+                    values.append((value, child_start, child_end))
+    return values
+
+
+def trim_to_complete_json(text: str) -> str:
+    """Cut a truncated response back to the end of its last complete nested value
+
+    Used before asking the model to continue a response that hit max_tokens, so
+    the continuation starts from a clean boundary (e.g. just after ``}``) rather
+    than in the middle of a string. Text without an unterminated JSON value is
+    returned unchanged.
+    """
+    spans = _scan_json_spans(text)
+    if spans:
+        _, _, closed, children = spans[-1]
+        if not closed and children:
+            return text[: children[-1][1]]
+    return text
+
+
+def extract_json_from_text(text: str) -> Dict[str, Any]:
+    """Extract JSON from text that might contain markdown or other content"""
+    values = find_json_values(text, salvage=False)
+    if values:
+        return values[0][0]
 
     raise ValueError("Could not extract valid JSON from the response")
@@ -0,0 +1,566 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Vector stores for RAG chunks: an in-process NumPy index or a local Chroma database
+import json
+import logging
+from abc import ABC, abstractmethod
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from synthetic_data_kit.utils.embeddings import Embedder
+
+logger = logging.getLogger(__name__)
+
+QueryResult = Dict[str, List[List[Any]]]
+
+
+def _matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    return not where or all(metadata.get(key) == value for key, value in where.items())
+
+
+class VectorStore(ABC):
+    """Interface shared by the vector store backends
+
+    Results of ``query`` use Chroma's layout: one list per query text under
+    ``ids``, ``documents``, ``metadatas`` and ``distances`` (cosine distance).
+    """
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[np.ndarray] = None,
+    ):
+        """Insert or replace documents by id"""
+
+    @abstractmethod
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """Remove documents by id and/or metadata equality filter"""
+
+    @abstractmethod
+    def query(
+        self, query_texts: List[str], n_results: int = 5, where: Optional[Dict[str, Any]] = None
+    ) -> QueryResult:
+        """Nearest documents to each query text"""
+
+    @abstractmethod
+    def get(self, where: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """Metadata of stored documents by id, optionally filtered by metadata"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored documents"""
+
+    @abstractmethod
+    def reset(self):
+        """Remove every document"""
+
+    def flush(self):
+        """Persist pending writes"""
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process vector index kept in append-only files
+
+    Vectors are appended as raw rows to ``<collection>.<generation>.vectors``
+    (float32, or int8 quantised per row with scales in ``.scales``, a quarter
+    of the size) and memory-mapped for queries. Ids, documents and metadata
+    are appended to ``<collection>.<generation>.rows.jsonl``; deletes and
+    replaced ids are recorded there as tombstones. ``<collection>.json`` says
+    how much of each file is committed, so an interrupted write is discarded
+    on the next open. It also records the encoder and vector width: vectors
+    of another width are refused, and an index built by another encoder is
+    dropped on open so its documents are indexed again.
+
+    Upserts are buffered and appended when ``flush_size`` rows are pending or
+    on ``flush()``; reads include pending rows without writing them. Dead rows
+    stay on disk until ``compact()`` rewrites the live ones into the next
+    generation, which flushes do on their own once dead rows make up
+    ``compact_ratio`` of the index.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        collection: str = "synthetic_data_kit",
+        embedder: Optional[Embedder] = None,
+        dtype: str = "float32",
+        flush_size: int = 1024,
+        block_size: int = 8192,
+        compact_ratio: float = 0.5,
+    ):
+        super().__init__(embedder or Embedder())
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.path = path
+        self.collection = collection
+        self.dtype = dtype
+        self.flush_size = flush_size
+        self.block_size = block_size
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+
+        # One entry per row on disk, dead ones included; _row_of maps live ids to rows
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._alive: List[bool] = []
+        self._row_of: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._encoder: Optional[str] = None
+        self._generation = 0
+        self._log_bytes = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._pending: Dict[str, Tuple[str, Dict[str, Any], np.ndarray]] = {}
+        self._load()
+
+    def _file(self, suffix: str, generation: Optional[int] = None) -> str:
+        if generation is None:
+            return os.path.join(self.path, f"{self.collection}.{suffix}")
+        return os.path.join(self.path, f"{self.collection}.{generation}.{suffix}")
+
+    @property
+    def _vector_dtype(self):
+        return np.int8 if self.dtype == "int8" else np.float32
+
+    def _load(self):
+        header_path = self._file("json")
+        if not os.path.exists(header_path):
+            return
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("dtype", "float32") != self.dtype:
+            raise ValueError(
+                f"Collection {self.collection} is stored as {header.get('dtype')}, not {self.dtype}"
+            )
+        self._generation = header["generation"]
+        encoder = header.get("encoder")
+        if encoder is not None and encoder != self.embedder.encoder_name:
+            logger.warning(
+                f"Collection {self.collection} was embedded with '{encoder}', not "
+                f"'{self.embedder.encoder_name}'; dropping it so documents are indexed again"
+            )
+            self.reset()
+            return
+        self._encoder = encoder
+        self._dim = header["dim"]
+        self._log_bytes = header["log_bytes"]
+        rows = header["rows"]
+
+        # Drop anything appended after the last committed write
+        sizes = {
+            "vectors": rows * (self._dim or 0) * np.dtype(self._vector_dtype).itemsize,
+            "scales": rows * 4 if self.dtype == "int8" else None,
+            "rows.jsonl": self._log_bytes,
+        }
+        for suffix, size in sizes.items():
+            path = self._file(suffix, self._generation)
+            if size is not None and os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+        with open(self._file("rows.jsonl", self._generation), "rb") as f:
+            for line in f.read(self._log_bytes).splitlines():
+                self._apply(json.loads(line))
+        self._map()
+
+    def _apply(self, entry: Dict[str, Any]):
+        """Replay one log entry onto the in-memory row tables"""
+        if "tombstone" in entry:
+            row = entry["tombstone"]
+            self._alive[row] = False
+            if self._row_of.get(self._ids[row]) == row:
+                del self._row_of[self._ids[row]]
+            return
+        self._row_of[entry["id"]] = len(self._ids)
+        self._ids.append(entry["id"])
+        self._documents.append(entry["document"])
+        self._metadatas.append(entry["metadata"])
+        self._alive.append(True)
+
+    def _map(self):
+        """Memory-map the committed rows"""
+        self._vectors = None
+        self._scales = None
+        rows = len(self._ids)
+        if rows:
+            self._vectors = np.memmap(
+                self._file("vectors", self._generation),
+                dtype=self._vector_dtype,
+                mode="r",
+                shape=(rows, self._dim),
+            )
+            if self.dtype == "int8":
+                self._scales = np.memmap(
+                    self._file("scales", self._generation),
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(rows,),
+                )
+
+    def _write_header(self):
+        tmp_path = self._file("tmp.json")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dtype": self.dtype,
+                    "dim": self._dim,
+                    "encoder": self._encoder,
+                    "generation": self._generation,
+                    "rows": len(self._ids),
+                    "log_bytes": self._log_bytes,
+                },
+                f,
+            )
+        os.replace(tmp_path, self._file("json"))
+
+    def _quantise(self, matrix: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self.dtype != "int8":
+            return matrix, None
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(matrix / scales[:, np.newaxis]).astype(np.int8), scales.astype(np.float32)
+
+    def _append(self, entries: List[Dict[str, Any]], vectors: Optional[np.ndarray] = None):
+        """Append log entries (and the vectors of their new rows), then commit the header"""
+        os.makedirs(self.path, exist_ok=True)
+        if vectors is not None and len(vectors):
+            if self._dim is None:
+                self._dim = int(vectors.shape[1])
+                self._encoder = self.embedder.encoder_name
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(
+                    f"Collection {self.collection} holds {self._dim}-dim vectors, "
+                    f"got {vectors.shape[1]}-dim ones"
+                )
+            matrix, scales = self._quantise(vectors)
+            with open(self._file("vectors", self._generation), "ab") as f:
+                f.write(matrix.tobytes())
+            if scales is not None:
+                with open(self._file("scales", self._generation), "ab") as f:
+                    f.write(scales.tobytes())
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")
+        with open(self._file("rows.jsonl", self._generation), "ab") as f:
+            f.write(data)
+
+        for entry in entries:
+            self._apply(entry)
+        self._log_bytes += len(data)
+        self._write_header()
+        self._map()
+
+    def _dead_rows(self) -> int:
+        return len(self._ids) - len(self._row_of)
+
+    def _dense(self, rows: slice) -> np.ndarray:
+        block = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self.dtype == "int8":
+            block = block * np.asarray(self._scales[rows])[:, np.newaxis]
+        return block
+
+    def compact(self):
+        """Rewrite only the live rows into a new generation of files"""
+        with self._lock:
+            self.flush(compact=False)
+            if not self._dead_rows():
+                return
+            live = np.flatnonzero(self._alive)
+            generation = self._generation + 1
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._file("vectors", generation), "wb") as vectors_file, open(
+                self._file("scales", generation), "wb"
+            ) as scales_file:
+                for start in range(0, len(live), self.block_size):
+                    block = live[start : start + self.block_size]
+                    vectors_file.write(np.asarray(self._vectors[block]).tobytes())
+                    if self.dtype == "int8":
+                        scales_file.write(np.asarray(self._scales[block]).tobytes())
+            entries = [
+                {
+                    "id": self._ids[row],
+                    "document": self._documents[row],
+                    "metadata": self._metadatas[row],
+                }
+                for row in live
+            ]
+            data = "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")
+            with open(self._file("rows.jsonl", generation), "wb") as f:
+                f.write(data)
+
+            old_generation = self._generation
+            self._ids, self._documents, self._metadatas, self._alive = [], [], [], []
+            self._row_of = {}
+            for entry in entries:
+                self._apply(entry)
+            self._generation = generation
+            self._log_bytes = len(data)
+            self._vectors = None
+            self._scales = None
+            self._write_header()
+            self._map()
+            for suffix in ("vectors", "scales", "rows.jsonl"):
+                old_path = self._file(suffix, old_generation)
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+
+    def upsert(self, ids, documents, metadatas=None, embeddings=None):
+        if not len(ids):
+            return
+        if metadatas is None:
+            metadatas = [{} for _ in ids]
+        if embeddings is None:
+            embeddings = self.embedder.encode(list(documents))
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            # Checked before buffering, so a bad batch cannot fail a later flush
+            expected = self._dim
+            if expected is None and self._pending:
+                expected = len(next(iter(self._pending.values()))[2])
+            if expected is not None and embeddings.shape[1] != expected:
+                raise ValueError(
+                    f"Collection {self.collection} holds {expected}-dim vectors, "
+                    f"got {embeddings.shape[1]}-dim ones"
+                )
+            for i, item_id in enumerate(ids):
+                self._pending[str(item_id)] = (documents[i], metadatas[i], embeddings[i])
+            if len(self._pending) >= self.flush_size:
+                self.flush()
+
+    def flush(self, compact: bool = True):
+        with self._lock:
+            if self._pending:
+                pending = self._pending
+                self._pending = {}
+                entries = [
+                    {"tombstone": self._row_of[item_id]}
+                    for item_id in pending
+                    if item_id in self._row_of
+                ]
+                entries.extend(
+                    {"id": item_id, "document": document, "metadata": metadata}
+                    for item_id, (document, metadata, _) in pending.items()
+                )
+                self._append(entries, np.stack([vector for _, _, vector in pending.values()]))
+            if compact and self._dead_rows() > self.compact_ratio * max(len(self._ids), 1):
+                self.compact()
+
+    def delete(self, ids=None, where=None):
+        if ids is None and not where:
+            return
+        with self._lock:
+            id_set = set(ids) if ids is not None else None
+            for item_id, (_, metadata, _) in list(self._pending.items()):
+                if (id_set is None or item_id in id_set) and _matches(metadata, where):
+                    del self._pending[item_id]
+            entries = [
+                {"tombstone": row}
+                for item_id, row in self._row_of.items()
+                if (id_set is None or item_id in id_set) and _matches(self._metadatas[row], where)
+            ]
+            if entries:
+                self._append(entries)
+                if self._dead_rows() > self.compact_ratio * len(self._ids):
+                    self.compact()
+
+    def _visible_rows(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Mask of committed rows that are live, not replaced by a pending upsert and match"""
+        return np.array(
+            [
+                alive and item_id not in self._pending and _matches(meta, where)
+                for item_id, meta, alive in zip(self._ids, self._metadatas, self._alive)
+            ],
+            dtype=bool,
+        )
+
+    def query(self, query_texts, n_results=5, where=None):
+        queries = self.embedder.encode(list(query_texts))
+        result: QueryResult = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            committed = len(self._ids)
+            pending = [
+                (item_id, document, metadata, vector)
+                for item_id, (document, metadata, vector) in self._pending.items()
+                if _matches(metadata, where)
+            ]
+            allowed = self._visible_rows(where)
+            scores = np.full((len(queries), committed + len(pending)), -np.inf, dtype=np.float32)
+            for start in range(0, committed, self.block_size):
+                rows = slice(start, min(start + self.block_size, committed))
+                block = self._dense(rows)
+                norms = np.linalg.norm(block, axis=1)
+                norms[norms == 0] = 1.0
+                scores[:, rows] = (queries @ block.T) / norms
+            scores[:, :committed][:, ~allowed] = -np.inf
+            if pending:
+                block = np.stack([vector for _, _, _, vector in pending]).astype(np.float32)
+                norms = np.linalg.norm(block, axis=1)
+                norms[norms == 0] = 1.0
+                scores[:, committed:] = (queries @ block.T) / norms
+
+            def entry(i):
+                if i < committed:
+                    return self._ids[i], self._documents[i], self._metadatas[i]
+                return pending[i - committed][:3]
+
+            for row in scores:
+                k = min(n_results, int(np.isfinite(row).sum()))
+                top = [entry(i) + (float(1.0 - row[i]),) for i in np.argsort(-row)[:k]]
+                result["ids"].append([item[0] for item in top])
+                result["documents"].append([item[1] for item in top])
+                result["metadatas"].append([item[2] for item in top])
+                result["distances"].append([item[3] for item in top])
+        return result
+
+    def get(self, where=None):
+        with self._lock:
+            found = {
+                self._ids[row]: self._metadatas[row]
+                for row in np.flatnonzero(self._visible_rows(where))
+            }
+            found.update(
+                (item_id, metadata)
+                for item_id, (_, metadata, _) in self._pending.items()
+                if _matches(metadata, where)
+            )
+            return found
+
+    def count(self):
+        with self._lock:
+            return len(self._row_of) + sum(
+                item_id not in self._row_of for item_id in self._pending
+            )
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+            old_generation = self._generation
+            self._ids, self._documents, self._metadatas, self._alive = [], [], [], []
+            self._row_of = {}
+            self._dim = None
+            self._encoder = None
+            self._generation = old_generation + 1
+            self._log_bytes = 0
+            self._vectors = None
+            self._scales = None
+            os.makedirs(self.path, exist_ok=True)
+            open(self._file("rows.jsonl", self._generation), "wb").close()
+            self._write_header()
+            for suffix in ("vectors", "scales", "rows.jsonl"):
+                old_path = self._file(suffix, old_generation)
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+
+
+class ChromaVectorStore(VectorStore):
+    """Local persistent Chroma collection, embedded with the same Embedder as the NumPy store
+
+    The encoder is recorded in the collection metadata; a collection built by
+    another encoder is dropped on open so its documents are indexed again.
+    """
+
+    def __init__(self, path: str, collection: str = "synthetic_data_kit", embedder: Optional[Embedder] = None):
+        super().__init__(embedder or Embedder())
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection_name = collection
+        self.collection = self._open()
+
+    def _open(self):
+        encoder = self.embedder.encoder_name
+        collection = self.client.get_or_create_collection(
+            name=self.collection_name, metadata={"hnsw:space": "cosine", "encoder": encoder}
+        )
+        stored = (collection.metadata or {}).get("encoder")
+        if stored is not None and stored != encoder:
+            logger.warning(
+                f"Collection {self.collection_name} was embedded with '{stored}', not "
+                f"'{encoder}'; dropping it so documents are indexed again"
+            )
+            self.client.delete_collection(name=self.collection_name)
+            collection = self.client.get_or_create_collection(
+                name=self.collection_name, metadata={"hnsw:space": "cosine", "encoder": encoder}
+            )
+        return collection
+
+    def upsert(self, ids, documents, metadatas=None, embeddings=None):
+        if embeddings is None:
+            embeddings = self.embedder.encode(list(documents))
+        self.collection.upsert(
+            ids=[str(item_id) for item_id in ids],
+            documents=list(documents),
+            metadatas=metadatas,
+            embeddings=np.asarray(embeddings).tolist(),
+        )
+
+    def delete(self, ids=None, where=None):
+        if ids is None and not where:
+            return
+        self.collection.delete(ids=ids, where=where or None)
+
+    def query(self, query_texts, n_results=5, where=None):
+        return self.collection.query(
+            query_embeddings=self.embedder.encode(list(query_texts)).tolist(),
+            n_results=n_results,
+            where=where or None,
+        )
+
+    def get(self, where=None):
+        result = self.collection.get(where=where or None, include=["metadatas"])
+        return dict(zip(result["ids"], result["metadatas"]))
+
+    def count(self):
+        return self.collection.count()
+
+    def reset(self):
+        self.client.delete_collection(name=self.collection_name)
+        self.collection = self._open()
+
+
+_STORES: Dict[Tuple[str, str, str], VectorStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_vector_store(
+    rag_config: Dict[str, Any], embedding_config: Optional[Dict[str, Any]] = None
+) -> VectorStore:
+    """Return the store described by the ``rag`` config section
+
+    Stores are opened once per process and reused, so writing each document
+    does not reconnect or reload the index.
+    """
+    backend = rag_config.get("backend", "numpy")
+    path = os.path.abspath(rag_config.get("path", "data/rag"))
+    collection = rag_config.get("collection", "synthetic_data_kit")
+
+    key = (backend, path, collection)
+    with _STORES_LOCK:
+        if key not in _STORES:
+            embedder = Embedder.from_config(embedding_config or {})
+            if backend == "numpy":
+                _STORES[key] = NumpyVectorStore(
+                    path,
+                    collection,
+                    embedder=embedder,
+                    dtype=rag_config.get("dtype", "float32"),
+                    flush_size=rag_config.get("flush_size", 1024),
+                    compact_ratio=rag_config.get("compact_ratio", 0.5),
+                )
+            elif backend == "chroma":
+                _STORES[key] = ChromaVectorStore(path, collection, embedder=embedder)
+            else:
+                raise ValueError(f"Unknown vector store backend: {backend}")
+        return _STORES[key]
@@ -0,0 +1,64 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+# Lightweight hashed bag-of-words vectors with NumPy
+import re
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _ngrams(tokens: List[str], ngram_range: Tuple[int, int]) -> List[str]:
+    low, high = ngram_range
+    grams = []
+    for n in range(low, high + 1):
+        if n == 1:
+            grams.extend(tokens)
+        else:
+            grams.extend(" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+    return grams
+
+
+def hashed_counts(
+    texts: List[str], dim: int = 4096, ngram_range: Tuple[int, int] = (1, 1)
+) -> np.ndarray:
+    """Term counts of each text hashed into ``dim`` buckets
+
+    Returns:
+        float32 array of shape (len(texts), dim)
+    """
+    counts = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        grams = _ngrams(tokenize(text), ngram_range)
+        if grams:
+            buckets = np.fromiter(
+                (zlib.crc32(g.encode("utf-8")) % dim for g in grams), dtype=np.int64, count=len(grams)
+            )
+            counts[row] = np.bincount(buckets, minlength=dim)
+    return counts
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (all-zero rows are left as zeros)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def tfidf_vectors(texts: List[str], dim: int = 4096) -> np.ndarray:
+    """L2-normalised TF-IDF vectors over hashed unigrams"""
+    counts = hashed_counts(texts, dim=dim)
+    document_frequency = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0
+    tf = np.log1p(counts)
+    return l2_normalize(tf * idf.astype(np.float32))
@@ -50,6 +50,24 @@ def sample_qa_pairs():
     ]
 
 
+@pytest.fixture
+def rated_qa_pairs():
+    """Return QA pairs rated 9 (informative answer, odd positions) or 2 (evasive answer)."""
+    topics = ["photosynthesis", "volcanoes", "tides", "glaciers", "vaccines", "magnets"]
+    pairs = []
+    for i in range(200):
+        topic = topics[i % len(topics)]
+        if i % 2:
+            answer = f"{topic.capitalize()} work because energy moves through the system {i}."
+            rating = 9
+        else:
+            answer = "Not sure, it is unclear."
+            rating = 2
+        question = f"How do {topic} work in case {i}?"
+        pairs.append({"question": question, "answer": answer, "rating": rating})
+    return pairs
+
+
 @pytest.fixture
 def sample_qa_pairs_file():
     """Create a temporary file with sample QA pairs for testing."""
@@ -0,0 +1,64 @@
+"""Unit tests for budget-aware chunk selection."""
+
+import pytest
+
+from synthetic_data_kit.utils.chunk_planner import plan_chunk_allocation, rank_chunks
+
+TOPICS = {
+    "plants": "Photosynthesis lets plants turn sunlight, water and carbon dioxide into sugar.",
+    "volcanoes": "Volcanic eruptions release magma, ash and gas from beneath the crust.",
+    "trade": "Medieval merchants moved silk and spices along long overland trade routes.",
+}
+
+
+@pytest.mark.unit
+def test_rank_chunks_covers_each_topic_first():
+    """The first k ranked chunks come from k different topics."""
+    chunks = []
+    for topic, text in TOPICS.items():
+        chunks.extend(f"{text} Note {i} on {topic}." for i in range(4))
+
+    ranked = rank_chunks(chunks, k=3)
+
+    assert sorted(ranked) == list(range(len(chunks)))
+    assert {index // 4 for index in ranked[:3]} == {0, 1, 2}
+
+
+@pytest.mark.unit
+def test_plan_chunk_allocation_budget():
+    """The number of calls follows num_pairs and the budget is fully allocated."""
+    chunks = [f"{text} Section {i}." for i in range(5) for text in TOPICS.values()]
+
+    plan = plan_chunk_allocation(chunks, num_pairs=12, max_pairs_per_chunk=5)
+    assert len(plan) == 3
+    assert sum(pairs for _, pairs in plan) == 12
+    assert len({index for index, _ in plan}) == 3
+
+    # More pairs than chunks: every chunk is used
+    plan = plan_chunk_allocation(chunks[:4], num_pairs=30, max_pairs_per_chunk=5)
+    assert sorted(index for index, _ in plan) == [0, 1, 2, 3]
+    assert sum(pairs for _, pairs in plan) == 30
+
+    # Legacy behaviour queries every chunk
+    assert len(plan_chunk_allocation(chunks, num_pairs=2, strategy="all")) == len(chunks)
+
+    with pytest.raises(ValueError):
+        plan_chunk_allocation(chunks, num_pairs=2, strategy="random")
+
+
+@pytest.mark.unit
+def test_plan_chunk_allocation_ranks_only_needed_backups():
+    """Backups are ranked only on request, and only as many as asked for."""
+    chunks = [f"{text} Section {i}." for i in range(20) for text in TOPICS.values()]
+
+    assert len(rank_chunks(chunks, k=3, extra=0)) == 3
+    assert rank_chunks(chunks, k=3, extra=5) == rank_chunks(chunks, k=3)[:8]
+
+    plan = plan_chunk_allocation(chunks, num_pairs=12, max_pairs_per_chunk=5)
+    assert len(plan) == 3
+    plan = plan_chunk_allocation(chunks, num_pairs=12, max_pairs_per_chunk=5, include_backups=True)
+    assert len(plan) == 6
+    plan = plan_chunk_allocation(
+        chunks, num_pairs=12, max_pairs_per_chunk=5, include_backups=True, max_backups=10
+    )
+    assert len(plan) == 13 and len({index for index, _ in plan}) == 13
@@ -0,0 +1,192 @@
+"""Unit tests for QA pair curation."""
+
+import json
+import re
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from synthetic_data_kit.core import curate
+from synthetic_data_kit.generators import qa_generator
+from synthetic_data_kit.utils.config import load_config
+
+
+def _rating_client(window):
+    """Mock client rating Qn? pairs n, whose config curates ``window`` pairs at a time"""
+    config = load_config()
+    config["curate"]["stream"] = {"window": window}
+    client = MagicMock(config=config)
+
+    def rate(messages, **kwargs):
+        responses = []
+        for m in messages:
+            ids = re.findall(r'"id":(\d+)', m[0]["content"])
+            scores = re.findall(r'"question":"Q(\d+)\?"', m[0]["content"])
+            responses.append(
+                json.dumps([{"id": int(i), "rating": int(q)} for i, q in zip(ids, scores)])
+            )
+        return responses
+
+    client.batch_completion.side_effect = rate
+    return client
+
+
+@contextmanager
+def _patch_client(client):
+    """Make curate (and the generators it builds) use ``client`` and its config"""
+    with patch.multiple(
+        curate,
+        LLMClient=MagicMock(return_value=client),
+        load_config=MagicMock(return_value=client.config),
+    ), patch.object(qa_generator, "load_config", return_value=client.config):
+        yield
+
+
+@pytest.mark.unit
+def test_curate_stream_appends_results_and_resumes(patch_config, tmp_path):
+    """Test that streaming curation writes JSONL per window and resumes after a crash."""
+    input_path = tmp_path / "pairs.jsonl"
+    with open(input_path, "w") as f:
+        for rating in (9, 3, 8, 7, 2):
+            f.write(json.dumps({"question": f"Q{rating}?", "answer": "A."}) + "\n")
+    output_path = str(tmp_path / "out" / "cleaned.json")
+
+    client = _rating_client(window=2)
+    rate = client.batch_completion.side_effect
+
+    def crash_on_second_window(messages, **kwargs):
+        if client.batch_completion.call_count == 2:
+            raise KeyboardInterrupt
+        return rate(messages, **kwargs)
+
+    client.batch_completion.side_effect = crash_on_second_window
+    with _patch_client(client):
+        with pytest.raises(KeyboardInterrupt):
+            curate.curate_qa_pairs(str(input_path), output_path, threshold=7.0, stream=True)
+
+    kept_path = tmp_path / "out" / "cleaned.jsonl"
+    assert [json.loads(line)["question"] for line in open(kept_path)] == ["Q9?"]
+
+    client = _rating_client(window=2)
+    with _patch_client(client):
+        result_path = curate.curate_qa_pairs(
+            str(input_path), output_path, threshold=7.0, stream=True
+        )
+
+    assert result_path == str(kept_path)
+    assert [json.loads(line)["question"] for line in open(kept_path)] == ["Q9?", "Q8?", "Q7?"]
+    rejected_path = tmp_path / "out" / "cleaned_rejected.jsonl"
+    rejected = [json.loads(line)["question"] for line in open(rejected_path)]
+    assert rejected == ["Q3?", "Q2?"]
+    # Only the three pairs left after the crash were rated again
+    assert client.batch_completion.call_count == 2
+
+    progress = json.load(open(tmp_path / "out" / "cleaned.progress.json"))
+    assert progress["complete"] and progress["result"]["filtered"] == 3
+
+
+@pytest.mark.unit
+def test_curate_threshold_resweep_runs_from_cache(patch_config, tmp_path):
+    """Test that re-curating cached pairs at another threshold never creates a client."""
+    input_path = tmp_path / "pairs.json"
+    pairs = [{"question": f"Q{rating}?", "answer": "A."} for rating in (9, 3, 8, 7, 2)]
+    with open(input_path, "w") as f:
+        json.dump({"qa_pairs": pairs}, f)
+
+    client = _rating_client(window=2)
+    client.config["curate"]["cache"] = {"enabled": True, "path": str(tmp_path / "ratings.sqlite")}
+    with _patch_client(client):
+        curate.curate_qa_pairs(str(input_path), str(tmp_path / "first.json"), threshold=7.0)
+        assert client.batch_completion.call_count == 1
+
+        curate.LLMClient.reset_mock()
+        output_path = curate.curate_qa_pairs(
+            str(input_path), str(tmp_path / "second.json"), threshold=8.0
+        )
+        curate.LLMClient.assert_not_called()
+
+    result = json.load(open(output_path))
+    assert [pair["question"] for pair in result["qa_pairs"]] == ["Q9?", "Q8?"]
+
+
+@pytest.mark.unit
+def test_curate_predictor_skips_confident_pairs(patch_config, rated_qa_pairs, tmp_path):
+    """Test that pairs the quality predictor is sure about are not sent to the LLM."""
+    from synthetic_data_kit.core.train_predictor import train_quality_predictor
+
+    history = tmp_path / "history_cleaned.json"
+    with open(history, "w") as f:
+        json.dump({"qa_pairs": rated_qa_pairs}, f)
+    model_path = str(tmp_path / "quality.npz")
+    train_quality_predictor([str(history)], model_path, threshold=7.0)
+
+    input_path = tmp_path / "new.json"
+    new_pairs = [
+        {"question": pair["question"], "answer": pair["answer"]} for pair in rated_qa_pairs[:6]
+    ]
+    with open(input_path, "w") as f:
+        json.dump({"qa_pairs": new_pairs}, f)
+
+    client = _rating_client(window=2)
+    client.config["curate"]["predictor"] = {"path": model_path}
+    with _patch_client(client):
+        output_path = curate.curate_qa_pairs(
+            str(input_path), str(tmp_path / "out.json"), threshold=7.0, predictor=True
+        )
+
+    client.batch_completion.assert_not_called()
+    result = json.load(open(output_path))
+    assert [pair["question"] for pair in result["qa_pairs"]] == [
+        pair["question"] for pair in new_pairs[1::2]
+    ]
+    assert {pair["rating_source"] for pair in result["bad_qa_pairs"]} == {"predictor"}
+    assert result["metrics"]["predictor"] == {"accepted": 3, "rejected": 3, "rated": 0}
+    # The predictor's stand-in ratings are not LLM scores
+    assert result["metrics"]["avg_score"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "size, ratings, decision, sampled, rated",
+    [
+        (150, (9,), "accept", 60, 60),
+        (150, (9, 2), "full", 60, 150),
+        # A small document needs nearly all of its pairs sampled
+        (20, (2,), "reject", 17, 17),
+    ],
+)
+def test_curate_audit_sample(patch_config, tmp_path, size, ratings, decision, sampled, rated):
+    """Test that a clear-cut sample settles the document and an uncertain one rates it all."""
+    input_path = tmp_path / "doc.json"
+    pairs = [{"question": f"Q{ratings[i % len(ratings)]}?", "answer": "A."} for i in range(size)]
+    with open(input_path, "w") as f:
+        json.dump({"qa_pairs": pairs}, f)
+
+    client = _rating_client(window=2)
+    with _patch_client(client):
+        output_path = curate.curate_qa_pairs(
+            str(input_path), str(tmp_path / "out.json"), threshold=7.0, audit_sample=True
+        )
+
+    rated_pairs = sum(
+        len(re.findall(r'"id":\d', messages[0]["content"]))
+        for call in client.batch_completion.call_args_list
+        for messages in call.args[0]
+    )
+    assert rated_pairs == rated
+
+    result = json.load(open(output_path))
+    audit = result["metrics"]["audit"]
+    assert audit["decision"] == decision and audit["sampled"] == sampled
+    assert audit["interval"][0] <= audit["pass_rate"] <= audit["interval"][1]
+    assert audit["unrated"] == size - rated
+    assert len(result["qa_pairs"]) == sum(pair["question"] == "Q9?" for pair in pairs)
+
+    # Settled pairs carry a stand-in rating that the average leaves out
+    output_pairs = result["qa_pairs"] + result["bad_qa_pairs"]
+    settled = [pair for pair in output_pairs if pair["rating_source"] == "audit"]
+    assert len(settled) == size - rated
+    assert all(isinstance(pair["rating"], (int, float)) for pair in output_pairs)
+    llm_rated = [pair["rating"] for pair in output_pairs if pair not in settled]
+    assert result["metrics"]["avg_score"] == round(sum(llm_rated) / len(llm_rated), 1)
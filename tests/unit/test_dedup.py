@@ -0,0 +1,68 @@
+"""Unit tests for near-duplicate chunk detection."""
+
+import pytest
+
+from synthetic_data_kit.utils.dedup import ChunkDeduplicator, MinHashLSH, shingle_hashes
+
+BOILERPLATE = (
+    "This report contains forward-looking statements within the meaning of the Private "
+    "Securities Litigation Reform Act. Actual results may differ materially from those "
+    "projected due to risks and uncertainties described in our filings with the SEC."
+)
+
+
+@pytest.mark.unit
+def test_minhash_similarity_estimate():
+    """Identical texts match; unrelated texts do not."""
+    lsh = MinHashLSH(threshold=0.8, num_perm=128)
+    sig_a = lsh.signature(shingle_hashes(BOILERPLATE))
+    sig_b = lsh.signature(shingle_hashes(BOILERPLATE.upper()))
+    sig_c = lsh.signature(shingle_hashes("Photosynthesis converts light energy into chemical energy."))
+
+    lsh.insert("a", sig_a)
+    assert lsh.query(sig_b) == ["a"]
+    assert lsh.query(sig_c) == []
+
+
+@pytest.mark.unit
+def test_chunk_deduplicator_skips_repeats_across_calls():
+    """Near-duplicate chunks are skipped within and across documents."""
+    dedup = ChunkDeduplicator(threshold=0.8)
+    unique = "Chlorophyll absorbs mostly blue and red light and reflects green light."
+
+    kept = dedup.filter_chunks([BOILERPLATE, unique, BOILERPLATE + " "], source="doc1")
+    assert kept == [0, 1]
+
+    # The same boilerplate in a second document is dropped as well
+    kept = dedup.filter_chunks([BOILERPLATE, "A new paragraph about quarterly revenue growth."], source="doc2")
+    assert kept == [1]
+
+
+@pytest.mark.unit
+def test_chunk_deduplicator_from_config():
+    """The deduplicator is only built when enabled in config."""
+    assert ChunkDeduplicator.from_config({}) is None
+    assert ChunkDeduplicator.from_config({"dedup": {"enabled": False}}) is None
+
+    dedup = ChunkDeduplicator.from_config({"dedup": {"enabled": True, "threshold": 0.9}})
+    assert isinstance(dedup, ChunkDeduplicator)
+    assert dedup.lsh.threshold == 0.9
+
+
+@pytest.mark.unit
+def test_dedup_qa_pairs_drops_similar_questions():
+    """Near-identical questions are dropped, in blocks smaller than the input."""
+    from synthetic_data_kit.utils.dedup import dedup_qa_pairs
+    from synthetic_data_kit.utils.embeddings import Embedder
+
+    qa_pairs = [
+        {"question": "What is the capital of France?", "answer": "Paris."},
+        {"question": "What pigment makes leaves green?", "answer": "Chlorophyll."},
+        {"question": "What is the capital of France ?", "answer": "Paris, France."},
+        {"question": "How fast does light travel in a vacuum?", "answer": "About 300,000 km/s."},
+        {"question": "what pigment makes leaves green", "answer": "Chlorophyll a and b."},
+    ]
+
+    kept = dedup_qa_pairs(qa_pairs, Embedder(model="hashing"), threshold=0.9, block_size=2)
+
+    assert kept == [qa_pairs[0], qa_pairs[1], qa_pairs[3]]
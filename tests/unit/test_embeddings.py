@@ -0,0 +1,63 @@
+"""Unit tests for the embedding stage."""
+
+import numpy as np
+import pytest
+
+from synthetic_data_kit.utils.embeddings import Embedder, EmbeddingCache
+
+
+@pytest.mark.unit
+def test_embedder_reuses_cached_vectors(tmp_path):
+    """Texts embedded before are read from the cache instead of being re-encoded."""
+    cache_path = str(tmp_path / "embeddings.sqlite")
+    texts = ["first chunk of text", "second chunk of text", "first chunk of text"]
+
+    embedder = Embedder(model="hashing", batch_size=2, cache=EmbeddingCache(cache_path))
+    first = embedder.encode(texts)
+    assert first.shape[0] == 3
+    assert np.allclose(first[0], first[2])
+    assert embedder.last_stats["encoded"] == 2
+    assert embedder.last_stats["cached"] == 0
+
+    # A new process (new embedder and connection) only encodes the new text
+    embedder = Embedder(model="hashing", batch_size=2, cache=EmbeddingCache(cache_path))
+    second = embedder.encode(texts[:2] + ["a third, new chunk"])
+    assert np.allclose(second[:2], first[:2])
+    assert embedder.last_stats["cached"] == 2
+    assert embedder.last_stats["encoded"] == 1
+    assert embedder.last_stats["texts_per_second"] > 0
+
+
+@pytest.mark.unit
+def test_embedder_batches_model_calls():
+    """The model is called once per batch, not once per text."""
+    calls = []
+
+    def fake_model(batch):
+        calls.append(len(batch))
+        return [[1.0, 0.0, 0.0] for _ in batch]
+
+    embedder = Embedder(model="fake", batch_size=4)
+    embedder._function, embedder._loaded = fake_model, True
+
+    vectors = embedder.encode([f"text {i}" for i in range(10)])
+    assert vectors.shape == (10, 3)
+    assert calls == [4, 4, 2]
+
+
+@pytest.mark.unit
+def test_embedder_falls_back_to_hashing_only_when_allowed():
+    """A failing model raises unless the hashing fallback is enabled, which renames the encoder."""
+
+    def broken_model(batch):
+        raise OSError("no network")
+
+    embedder = Embedder(model="fake", hashing_dim=64)
+    embedder._function, embedder._loaded = broken_model, True
+    with pytest.raises(RuntimeError, match="fallback_to_hashing"):
+        embedder.encode(["some text"])
+
+    embedder = Embedder(model="fake", hashing_dim=64, fallback=True)
+    embedder._function, embedder._loaded = broken_model, True
+    assert embedder.encode(["some text"]).shape == (1, 64)
+    assert embedder.encoder_name == "hashing-64"
@@ -1,5 +1,6 @@
 """Unit tests for LLM client."""
 
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -123,3 +124,252 @@ def test_llm_client_vllm_chat_completion(patch_config, test_env):
         assert response == "This is a test response"
         # Check that vLLM API was called
         assert mock_post.called
+
+
+@pytest.mark.unit
+def test_llm_client_reports_finish_reason(patch_config, test_env):
+    """Test that completions carry the finish_reason of the response."""
+    with patch("requests.post") as mock_post, patch("requests.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200)
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "choices": [{"message": {"content": '[{"question": "Q1'}, "finish_reason": "length"}]
+        }
+        mock_post.return_value = mock_response
+
+        client = LLMClient(provider="vllm")
+        response = client.chat_completion([{"role": "user", "content": "Hi"}])
+
+        assert response == '[{"question": "Q1'
+        assert response.finish_reason == "length"
+        assert response.truncated
+
+
+@pytest.mark.unit
+def test_llm_client_returns_top_logprobs(patch_config, test_env):
+    """Test that batch completions request and carry top logprobs when asked."""
+    with patch("requests.post") as mock_post, patch("requests.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200)
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "choices": [
+                {
+                    "message": {"content": "8"},
+                    "finish_reason": "length",
+                    "logprobs": {
+                        "content": [
+                            {
+                                "token": "8",
+                                "logprob": -0.1,
+                                "top_logprobs": [
+                                    {"token": "8", "logprob": -0.1},
+                                    {"token": "7", "logprob": -2.5},
+                                ],
+                            }
+                        ]
+                    },
+                }
+            ]
+        }
+        mock_post.return_value = mock_response
+
+        client = LLMClient(provider="vllm")
+        responses = client.batch_completion(
+            [[{"role": "user", "content": "Rate"}]], max_tokens=1, top_logprobs=2
+        )
+
+        request = json.loads(mock_post.call_args.kwargs["data"])
+        assert request["logprobs"] is True and request["top_logprobs"] == 2
+        assert responses[0].top_logprobs == [{"8": -0.1, "7": -2.5}]
+
+
+@pytest.mark.unit
+def test_llm_client_continue_truncated(patch_config, test_env):
+    """Test that truncated responses are resumed from their last complete object."""
+    from synthetic_data_kit.models.llm_client import Completion
+
+    with patch("requests.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200)
+        client = LLMClient(provider="vllm")
+
+    truncated = Completion('[{"question": "Q1?", "answer": "A1."}, {"question": "Q2', "length")
+    complete = Completion('[{"question": "Q3?", "answer": "A3."}]', "stop")
+    client.batch_completion = MagicMock(
+        return_value=[Completion(', {"question": "Q2?", "answer": "A2."}]', "stop")]
+    )
+
+    messages = [[{"role": "system", "content": "one"}], [{"role": "system", "content": "two"}]]
+    responses = client.continue_truncated(messages, [truncated, complete], max_rounds=1)
+
+    # Only the truncated response is continued, from the end of its last complete object
+    continuation_messages = client.batch_completion.call_args[0][0]
+    assert len(continuation_messages) == 1
+    assert continuation_messages[0][1] == {
+        "role": "assistant",
+        "content": '[{"question": "Q1?", "answer": "A1."}',
+    }
+    assert responses[0] == '[{"question": "Q1?", "answer": "A1."}, {"question": "Q2?", "answer": "A2."}]'
+    assert not responses[0].truncated
+    assert responses[1] is complete
+
+
+@pytest.mark.unit
+def test_llm_client_stream_completions_cancels_on_close(patch_config, test_env):
+    """Test that closing a stream drops requests that have not started."""
+    import time
+
+    with patch("requests.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200)
+        client = LLMClient(provider="vllm")
+
+    def slow_completion(messages, **kwargs):
+        time.sleep(0.05)
+        return messages[0]["content"]
+
+    client.chat_completion = MagicMock(side_effect=slow_completion)
+
+    with client.stream_completions(max_in_flight=1) as stream:
+        for i in range(5):
+            stream.submit(i, [{"role": "user", "content": f"prompt {i}"}])
+        key, _, response = next(stream.as_completed())
+
+    assert (key, response) == (0, "prompt 0")
+    time.sleep(0.1)
+    assert client.chat_completion.call_count <= 2
+
+
+@pytest.mark.unit
+def test_llm_client_stream_continues_truncated_in_background(patch_config, test_env):
+    """Test that a truncated response is resumed without holding up later ones."""
+    import threading
+
+    from synthetic_data_kit.models.llm_client import Completion
+
+    with patch("requests.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200)
+        client = LLMClient(provider="vllm")
+
+    release = threading.Event()
+
+    def completion(messages, **kwargs):
+        text = messages[0]["content"]
+        return Completion(text, "length" if text == "long" else "stop")
+
+    def resume(message_batches, responses, **kwargs):
+        release.wait(timeout=5)
+        return [Completion(responses[0] + " resumed", "stop")]
+
+    client.chat_completion = MagicMock(side_effect=completion)
+    client.continue_truncated = MagicMock(side_effect=resume)
+
+    order = []
+    with client.stream_completions(max_in_flight=2, continue_truncated=True) as stream:
+        stream.submit("long", [{"role": "user", "content": "long"}])
+        stream.submit("short", [{"role": "user", "content": "short"}])
+        for key, _, response in stream.as_completed():
+            order.append((key, str(response)))
+            release.set()
+
+    assert order == [("short", "short"), ("long", "long resumed")]
+    assert client.continue_truncated.call_count == 1
+
+
+@pytest.mark.unit
+def test_llm_client_caps_requests_in_flight(patch_config, test_env):
+    """Test that threads sharing a client never exceed max_in_flight requests."""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fake_post(*args, **kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": "ok"}}]}
+        return response
+
+    with patch("requests.post", side_effect=fake_post), patch("requests.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200)
+        client = LLMClient(provider="vllm")
+        client._request_slots = threading.BoundedSemaphore(2)
+
+        messages = [{"role": "user", "content": "Hi"}]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            single = [executor.submit(client.chat_completion, messages) for _ in range(4)]
+            batched = executor.submit(client.batch_completion, [messages] * 4, batch_size=4)
+            assert [f.result() for f in single] == ["ok"] * 4
+            assert batched.result() == ["ok"] * 4
+
+    assert peak == 2
+
+
+@pytest.mark.unit
+def test_llm_client_async_batches_do_not_starve_slots(patch_config, test_env):
+    """Test that rate-limited async batches larger than max_in_flight finish."""
+    import asyncio
+    import threading
+    from types import SimpleNamespace
+
+    from synthetic_data_kit.models.llm_client import RateLimiter
+
+    class FakeAsyncOpenAI:
+        def __init__(self, **kwargs):
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+        async def create(self, **kwargs):
+            await asyncio.sleep(0.001)
+            message = SimpleNamespace(content="ok")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+    with patch("synthetic_data_kit.models.llm_client.OpenAI"), patch(
+        "openai.AsyncOpenAI", FakeAsyncOpenAI
+    ):
+        client = LLMClient(provider="api-endpoint")
+        client._request_slots = threading.BoundedSemaphore(4)
+        client._rate_limiter = RateLimiter(requests_per_minute=60000)
+
+        messages = [[{"role": "user", "content": "Hi"}]] * 48
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(client.batch_completion(messages, batch_size=48)),
+                daemon=True,
+            )
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=20)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert results == [["ok"] * 48] * 2
+
+
+@pytest.mark.unit
+def test_rate_limiter_spaces_requests():
+    """Test that the rate limiter spaces requests instead of sleeping per batch."""
+    import time
+
+    from synthetic_data_kit.models.llm_client import RateLimiter
+
+    unlimited = RateLimiter(None)
+    start = time.monotonic()
+    for _ in range(100):
+        unlimited.wait()
+    assert time.monotonic() - start < 0.05
+
+    limiter = RateLimiter(requests_per_minute=1200)  # one request every 50ms
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.wait()
+    assert time.monotonic() - start >= 0.14
@@ -55,6 +55,26 @@ def test_parse_qa_pairs_with_regex():
     assert result[1]["question"] == "Why use synthetic data?"
 
 
+@pytest.mark.unit
+def test_parse_ratings():
+    """Test parsing ratings from fenced, object-per-line and malformed output."""
+    fenced = """```json
+[
+  {"question": "What is AI?", "answer": "Artificial intelligence.", "rating": 8},
+  {"question": "What is ML?", "answer": "Machine learning.", "rating": 6},
+]
+```"""
+    result = llm_processing.parse_ratings(fenced)
+    assert [item["rating"] for item in result] == [8, 6]
+
+    one_per_line = '{"question": "Q1", "answer": "A1", "rating": 9}\n{"question": "Q2", "answer": "A2", "rating": "7"}'
+    result = llm_processing.parse_ratings(one_per_line)
+    assert [item["rating"] for item in result] == [9, 7.0]
+
+    with pytest.raises(ValueError):
+        llm_processing.parse_ratings("I cannot rate these pairs.")
+
+
 @pytest.mark.unit
 def test_convert_to_conversation_format():
     """Test converting QA pairs to conversation format."""
@@ -84,3 +104,67 @@ def test_convert_to_conversation_format():
 
     # Check second conversation
     assert conversations[1][1]["content"] == "Why use synthetic data?"
+
+
+@pytest.mark.unit
+def test_rating_payload_and_match_ratings():
+    """Test that ratings are joined back to the original pairs by id."""
+    pairs = [
+        {"question": "Q1?", "answer": "A1.", "source": {"chunk_id": "doc:0"}},
+        {"question": "Q2?", "answer": "A2.", "source": {"chunk_id": "doc:50"}},
+    ]
+    assert llm_processing.rating_payload(pairs) == [
+        {"id": 0, "question": "Q1?", "answer": "A1."},
+        {"id": 1, "question": "Q2?", "answer": "A2."},
+    ]
+    assert llm_processing.rating_payload(pairs, {"doc:50": "Passage."})[1]["context"] == "Passage."
+
+    rated = llm_processing.parse_ratings(
+        '[{"id": 1, "rating": 9}, {"id": "0", "rating": 4}, {"id": 7, "rating": 2}]'
+    )
+    assert llm_processing.match_ratings(pairs, rated) == {1: 9, 0: 4}
+
+    # Echoed pairs without ids still match by question
+    echoed = [{"question": "Q2?", "answer": "A2.", "rating": 6}]
+    assert llm_processing.match_ratings(pairs, echoed) == {1: 6}
+
+
+@pytest.mark.unit
+def test_pack_rating_batches_fills_token_budget():
+    """Test that rating batches are sized by prompt tokens rather than pair count."""
+    template = "Rate these pairs:\n{pairs}"
+    short = [{"question": f"Q{i}?", "answer": "Yes."} for i in range(40)]
+    long = [{"question": f"Why {i}?", "answer": "Because " + "step " * 200} for i in range(6)]
+
+    batches = llm_processing.pack_rating_batches(short + long, template, max_prompt_tokens=600)
+
+    assert [pair for batch in batches for pair in batch] == short + long
+    assert len(batches[0]) == 40
+    for batch in batches:
+        prompt = llm_processing.format_rating_prompt(template, batch)
+        assert llm_processing.estimate_tokens(prompt) <= 600 or len(batch) == 1
+    assert '"id":0' in llm_processing.format_rating_prompt(template, short[:1])
+
+    capped = llm_processing.pack_rating_batches(short, template, 600, max_batch_size=16)
+    assert [len(batch) for batch in capped] == [16, 16, 8]
+
+
+@pytest.mark.unit
+def test_logprob_rating_uses_expected_score():
+    """Test that a single score token is rated by its probability-weighted mean."""
+    from math import log
+
+    from synthetic_data_kit.models.llm_client import Completion
+
+    response = Completion("8", "length", [{"8": log(0.5), " 9": log(0.25), "x": log(0.25)}])
+    # "x" is not a score, so 8 and 9 are renormalised to 2/3 and 1/3
+    assert llm_processing.logprob_rating(response) == pytest.approx(8.333, abs=1e-3)
+
+    # Non-ASCII digits are not scores, even where str.isdigit() accepts them
+    top_logprobs = {"\u00b2": log(0.5), "\u0664": log(0.2), "7": log(0.3)}
+    assert llm_processing.expected_score(top_logprobs) == pytest.approx(7.0)
+
+    # Without logprobs the written score is used; anything else fails
+    assert llm_processing.logprob_rating("7") == 7.0
+    with pytest.raises(ValueError):
+        llm_processing.logprob_rating("great pair")
@@ -0,0 +1,43 @@
+"""Unit tests for the rule-based QA pre-filter."""
+
+import pytest
+
+from synthetic_data_kit.utils.prefilter import prefilter_qa_pairs
+
+
+@pytest.mark.unit
+def test_prefilter_rejects_trivially_bad_pairs():
+    """Test that bad pairs are rejected with a reason and good ones are kept."""
+    chunks = {
+        "doc:0": "Photosynthesis converts light energy into chemical energy stored in glucose.",
+        "doc:80": "Volcanic eruptions release ash, gases and molten rock called lava.",
+    }
+
+    def on_chunk(chunk_id, question, answer):
+        return {"question": question, "answer": answer, "source": {"chunk_id": chunk_id}}
+
+    pairs = [
+        on_chunk("doc:0", "What does photosynthesis produce?", "Chemical energy stored in glucose."),
+        on_chunk("doc:0", "what does photosynthesis  produce", "Glucose."),
+        on_chunk("doc:80", "What is lava?", ""),
+        on_chunk("doc:80", "Who won the 1998 World Cup?", "France beat Brazil in the final."),
+        on_chunk("doc:80", "Describe eruptions.", "Volcanic eruptions release ash. " * 5),
+        on_chunk("doc:80", "What do eruptions release?", "Ash, gases and molten rock."),
+    ]
+
+    to_rate, accepted, rejected = prefilter_qa_pairs(pairs, chunks, {"min_support": 0.3})
+
+    assert [pair["question"] for pair in to_rate] == [pairs[0]["question"], pairs[5]["question"]]
+    assert accepted == []
+    assert [pair["prefilter"] for pair in rejected] == [
+        "duplicate question",
+        "answer too short",
+        "unsupported by source",
+        "answer longer than source",
+    ]
+
+    # Well supported pairs can skip rating altogether
+    config = {"min_support": 0.3, "accept_support": 0.9}
+    to_rate, accepted, _ = prefilter_qa_pairs(pairs, chunks, config)
+    assert to_rate == []
+    assert [pair["rating"] for pair in accepted] == [8.0, 8.0]
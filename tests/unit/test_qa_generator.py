@@ -90,20 +90,22 @@ def test_rate_qa_pairs(patch_config):
     """Test rating QA pairs."""
     # Create mock LLM client
     mock_client = MagicMock()
-    mock_client.chat_completion.return_value = json.dumps(
-        [
-            {
-                "question": "What is synthetic data?",
-                "answer": "Synthetic data is artificially generated data.",
-                "rating": 8,
-            },
-            {
-                "question": "Why use synthetic data?",
-                "answer": "To protect privacy and create diverse training examples.",
-                "rating": 6,
-            },
-        ]
-    )
+    mock_client.batch_completion.return_value = [
+        json.dumps(
+            [
+                {
+                    "question": "What is synthetic data?",
+                    "answer": "Synthetic data is artificially generated data.",
+                    "rating": 8,
+                },
+                {
+                    "question": "Why use synthetic data?",
+                    "answer": "To protect privacy and create diverse training examples.",
+                    "rating": 6,
+                },
+            ]
+        )
+    ]
 
     # Initialize generator
     generator = QAGenerator(client=mock_client)
@@ -135,8 +137,9 @@ def test_rate_qa_pairs(patch_config):
     assert metrics["filtered"] == 1
     assert metrics["retention_rate"] == 0.5
 
-    # Check that client was called
-    assert mock_client.chat_completion.called
+    # Check that ratings went through the concurrent batch path
+    assert mock_client.batch_completion.called
+    mock_client.chat_completion.assert_not_called()
 
 
 @pytest.mark.unit
@@ -177,3 +180,466 @@ def test_process_document(patch_config):
     assert "qa_pairs" in result
     assert result["summary"] == "This is a summary of the document."
     assert len(result["qa_pairs"]) == 2
+
+
+@pytest.mark.unit
+def test_generate_qa_pairs_skips_duplicate_chunks(patch_config):
+    """Test that near-duplicate chunks are not sent to the LLM."""
+    from synthetic_data_kit.utils.dedup import ChunkDeduplicator
+
+    mock_client = MagicMock()
+    mock_client.batch_completion.side_effect = lambda messages, **kwargs: [
+        json.dumps([{"question": "Q?", "answer": "A."}]) for _ in messages
+    ]
+
+    generator = QAGenerator(client=mock_client, deduplicator=ChunkDeduplicator(threshold=0.8))
+    generator.generation_config["chunk_size"] = 150
+    generator.generation_config["overlap"] = 0
+
+    paragraph = (
+        "All statements in this filing other than statements of historical fact are "
+        "forward-looking statements and involve risks and uncertainties."
+    )
+    document = "\n\n".join([paragraph, "Revenue grew by twelve percent year over year.", paragraph])
+
+    generator.generate_qa_pairs(document, summary="", num_pairs=10)
+
+    sent_messages = mock_client.batch_completion.call_args[0][0]
+    assert len(generator.split_article_into_chunks(document)) == 3
+    assert len(sent_messages) == 2
+
+
+@pytest.mark.unit
+def test_generate_qa_pairs_calls_scale_with_num_pairs(patch_config):
+    """Test that a small pair budget only queries a few representative chunks."""
+    mock_client = MagicMock()
+    mock_client.batch_completion.side_effect = lambda messages, **kwargs: [
+        json.dumps([{"question": "Q?", "answer": "A."}] * 5) for _ in messages
+    ]
+
+    generator = QAGenerator(client=mock_client)
+    generator.generation_config["chunk_size"] = 120
+    generator.generation_config["overlap"] = 0
+    generator.generation_config["max_pairs_per_chunk"] = 5
+
+    topics = ["photosynthesis in plants", "volcanic eruptions", "medieval trade routes", "neural networks"]
+    document = "\n\n".join(
+        f"Paragraph {i} discusses {topics[i % 4]} and related details about {topics[i % 4]}."
+        for i in range(20)
+    )
+    assert len(generator.split_article_into_chunks(document)) == 20
+
+    result = generator.generate_qa_pairs(document, summary="", num_pairs=10)
+
+    sent_messages = mock_client.batch_completion.call_args[0][0]
+    assert len(sent_messages) == 2
+    assert len(result) == 10
+
+
+@pytest.mark.unit
+def test_generate_qa_pairs_stops_early(patch_config):
+    """Test that streaming mode stops once enough pairs arrive and backfills short chunks."""
+    from synthetic_data_kit.models.llm_client import CompletionStream
+
+    five_pairs = json.dumps([{"question": "Q?", "answer": "A."}] * 5)
+    mock_client = MagicMock()
+    mock_client.chat_completion.side_effect = ["[]"] + [five_pairs] * 19
+    mock_client.stream_completions.side_effect = lambda **kwargs: CompletionStream(
+        mock_client, 1
+    )
+
+    generator = QAGenerator(client=mock_client)
+    generator.generation_config["chunk_size"] = 120
+    generator.generation_config["overlap"] = 0
+    generator.generation_config["max_pairs_per_chunk"] = 5
+    generator.generation_config["early_stop"] = {"enabled": True, "overgenerate_ratio": 0.2}
+
+    document = "\n\n".join(
+        f"Paragraph {i} is about topic number {i} and nothing else whatsoever." for i in range(20)
+    )
+    result = generator.generate_qa_pairs(document, summary="", num_pairs=10)
+
+    # Target is 12 pairs: three planned chunks, plus one backup for the empty response
+    assert mock_client.chat_completion.call_count == 4
+    assert len(result) == 15
+    mock_client.batch_completion.assert_not_called()
+
+
+@pytest.mark.unit
+def test_generate_qa_pairs_reuses_manifest(patch_config, tmp_path):
+    """Test that a re-run only sends chunks whose request changed."""
+    from synthetic_data_kit.utils.manifest import GenerationManifest
+
+    mock_client = MagicMock()
+    mock_client.batch_completion.side_effect = lambda messages, **kwargs: [
+        json.dumps([{"question": f"About {m[0]['content'][-12:]}?", "answer": "A."}])
+        for m in messages
+    ]
+
+    generator = QAGenerator(client=mock_client)
+    generator.generation_config["chunk_size"] = 60
+    generator.generation_config["overlap"] = 0
+    generator.generation_config["chunk_selection"] = "all"
+
+    paragraphs = [f"Paragraph {i} covers a separate subject, numbered {i} here." for i in range(4)]
+    manifest_path = tmp_path / ".manifests" / "doc.json"
+
+    manifest = GenerationManifest(str(manifest_path))
+    first = generator.generate_qa_pairs(
+        "\n\n".join(paragraphs), summary="", num_pairs=4, fileName="doc.txt", manifest=manifest
+    )
+    manifest.save()
+    assert len(mock_client.batch_completion.call_args[0][0]) == 4
+
+    # Edit one paragraph (same length, so chunk boundaries stay put) and re-run
+    paragraphs[2] = paragraphs[2].replace("separate", "distinct")
+    manifest = GenerationManifest(str(manifest_path))
+    second = generator.generate_qa_pairs(
+        "\n\n".join(paragraphs), summary="", num_pairs=4, fileName="doc.txt", manifest=manifest
+    )
+    manifest.save()
+
+    assert len(mock_client.batch_completion.call_args[0][0]) == 1
+    assert len(second) == 4
+    assert second[:2] == first[:2] and second[3] == first[3]
+    assert len(GenerationManifest(str(manifest_path))) == 4
+
+
+@pytest.mark.unit
+def test_generate_summary_reindexes_cached_chunk_summaries(patch_config, tmp_path):
+    """Test that a summary reused from the manifest is synced at its chunk's new offset."""
+    from unittest.mock import patch
+
+    from synthetic_data_kit.generators import qa_generator
+    from synthetic_data_kit.utils.manifest import GenerationManifest
+
+    mock_client = MagicMock()
+    mock_client.batch_completion.side_effect = lambda messages, **kwargs: [
+        f"Summary of {m[1]['content'][:11]}" for m in messages
+    ]
+    mock_client.chat_completion.return_value = "Document summary."
+
+    generator = QAGenerator(client=mock_client)
+    generator.generation_config["chunk_size"] = 60
+    generator.generation_config["overlap"] = 0
+
+    paragraphs = [f"Paragraph {i} covers a separate subject, numbered {i} here." for i in range(3)]
+    manifest_path = tmp_path / ".manifests" / "doc.json"
+    with patch.object(qa_generator, "sync_document") as sync:
+        manifest = GenerationManifest(str(manifest_path))
+        generator.generate_summary(
+            "\n\n".join(paragraphs), fileName="doc.txt", enable_rag=True, manifest=manifest
+        )
+        manifest.save()
+
+        # A new first paragraph shifts every cached chunk down by one
+        document = "\n\n".join(["Paragraph X opens the document with new material."] + paragraphs)
+        manifest = GenerationManifest(str(manifest_path))
+        generator.generate_summary(document, fileName="doc.txt", enable_rag=True, manifest=manifest)
+
+    assert len(mock_client.batch_completion.call_args[0][0]) == 1
+    offsets, metadatas = sync.call_args.args[1:3]
+    for (start, chunk), metadata in zip(offsets, metadatas):
+        assert metadata["summary"] == f"Summary of {chunk[:11]}"
+        assert document[start : start + len(chunk)] == chunk
+
+
+@pytest.mark.unit
+def test_process_document_runs_independent_stages_concurrently(patch_config):
+    """Test that QA generation does not wait for the summary it does not use."""
+    import threading
+
+    qa_started = threading.Event()
+    mock_client = MagicMock()
+
+    def slow_summary(messages, **kwargs):
+        # Only returns once QA generation has started in parallel
+        assert qa_started.wait(timeout=5), "QA generation waited for the summary"
+        return "Summary."
+
+    def qa_batch(messages, **kwargs):
+        qa_started.set()
+        return [json.dumps([{"question": "Q?", "answer": "A."}]) for _ in messages]
+
+    mock_client.chat_completion.side_effect = slow_summary
+    mock_client.batch_completion.side_effect = qa_batch
+
+    generator = QAGenerator(client=mock_client)
+    assert "{summary}" not in generator.config["prompts"]["qa_generation"]
+
+    result = generator.process_document("A short document.", num_pairs=1)
+
+    assert result["summary"] == "Summary."
+    assert [(pair["question"], pair["answer"]) for pair in result["qa_pairs"]] == [("Q?", "A.")]
+
+
+@pytest.mark.unit
+def test_process_document_takes_chunking_and_verbosity_per_call(patch_config, monkeypatch):
+    """Test that documents sharing a generator do not change each other's settings."""
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+
+    mock_client = MagicMock()
+    mock_client.chat_completion.return_value = "Summary."
+    mock_client.batch_completion.side_effect = lambda messages, **kwargs: [
+        json.dumps([{"question": "Q?", "answer": "A."}]) for _ in messages
+    ]
+    generator = QAGenerator(client=mock_client)
+    generator.generation_config["chunk_size"] = 4000
+    monkeypatch.setenv("SDK_VERBOSE", "false")
+
+    document = "\n\n".join(
+        f"Paragraph {i} is about topic number {i} and nothing else whatsoever." for i in range(20)
+    )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        small = executor.submit(
+            generator.process_document,
+            document,
+            num_pairs=20,
+            verbose=True,
+            chunk_size=120,
+            overlap=0,
+        )
+        default = executor.submit(generator.process_document, document, num_pairs=20)
+
+    assert len(small.result()["chunks"]) > 1
+    assert len(default.result()["chunks"]) == 1
+    assert generator.generation_config["chunk_size"] == 4000
+    assert os.environ["SDK_VERBOSE"] == "false"
+
+
+@pytest.mark.unit
+def test_concurrent_stages_share_one_progress_display(patch_config, monkeypatch):
+    """Test that verbose stages running side by side start a single live display."""
+    import threading
+    from unittest.mock import patch
+
+    from synthetic_data_kit.generators import qa_generator
+
+    live = []
+
+    class OneLiveProgress(qa_generator.Progress):
+        # Older rich releases refuse a second live display
+        def start(self):
+            assert not live, "Only one live display may be active at once"
+            live.append(self)
+            super().start()
+
+        def stop(self):
+            live.remove(self)
+            super().stop()
+
+    both_running = threading.Barrier(2, timeout=5)
+
+    def batch(messages, **kwargs):
+        both_running.wait()
+        return ["ok" for _ in messages]
+
+    mock_client = MagicMock()
+    mock_client.batch_completion.side_effect = batch
+    generator = QAGenerator(client=mock_client)
+    monkeypatch.setenv("SDK_VERBOSE", "true")
+
+    def stage(results):
+        messages = [[{"role": "user", "content": "x"}]]
+        return generator.batch_inference(messages, ["x"], lambda i, response: response)
+
+    with patch.object(qa_generator, "Progress", OneLiveProgress):
+        results = generator.run_stages({"a": ([], stage), "b": ([], stage)})
+
+    assert results == {"a": ["ok"], "b": ["ok"]}
+    assert not live and generator._progress is None
+
+
+@pytest.mark.unit
+def test_run_stages_respects_dependencies(patch_config):
+    """Test that dependent stages receive the outputs they depend on."""
+    generator = QAGenerator(client=MagicMock())
+
+    results = generator.run_stages(
+        {
+            "a": ([], lambda r: 1),
+            "b": (["a"], lambda r: r["a"] + 1),
+            "c": (["a", "b"], lambda r: r["a"] + r["b"]),
+        }
+    )
+    assert results == {"a": 1, "b": 2, "c": 3}
+
+    with pytest.raises(ValueError):
+        generator.run_stages({"x": (["missing"], lambda r: None)})
+
+
+@pytest.mark.unit
+def test_reduce_summaries_uses_every_chunk(patch_config):
+    """Test that long summary lists are tree-reduced rather than truncated."""
+    mock_client = MagicMock()
+    mock_client.batch_completion.side_effect = lambda messages, **kwargs: [
+        f"R({m[1]['content'].count(chr(10)) + 1})" for m in messages
+    ]
+
+    generator = QAGenerator(client=mock_client)
+    summaries = [f"Summary of chunk {i} " + "x" * 30 for i in range(40)]
+
+    combined = generator.reduce_summaries(summaries, budget=200)
+
+    assert len(combined) <= 200
+    # Every chunk summary went into some reduce group at the first level
+    first_level = mock_client.batch_completion.call_args_list[0][0][0]
+    assert sum(m[1]["content"].count("Summary of chunk") for m in first_level) == 40
+
+    # Reduced groups are cached, so a repeat call makes no new requests
+    calls = mock_client.batch_completion.call_count
+    assert generator.reduce_summaries(summaries, budget=200) == combined
+    assert mock_client.batch_completion.call_count == calls
+
+
+@pytest.mark.unit
+def test_qa_pairs_carry_source_chunk(patch_config):
+    """Test that each pair records its chunk and the output maps chunk ids to text."""
+    mock_client = MagicMock()
+    mock_client.chat_completion.return_value = "Summary."
+    mock_client.batch_completion.side_effect = lambda messages, **kwargs: [
+        json.dumps([{"question": f"Q{i}?", "answer": "A."}]) for i, _ in enumerate(messages)
+    ]
+
+    generator = QAGenerator(client=mock_client)
+    generator.generation_config["chunk_size"] = 60
+    generator.generation_config["overlap"] = 0
+    generator.generation_config["chunk_selection"] = "all"
+
+    document = "\n\n".join(f"Paragraph {i} covers a separate subject, numbered {i}." for i in range(3))
+    result = generator.process_document(document, num_pairs=3, fileName="doc.txt")
+
+    sources = [pair["source"] for pair in result["qa_pairs"]]
+    assert len({source["chunk_id"] for source in sources}) == 3
+    for source in sources:
+        assert source["chunk_id"] == f"{source['doc_id']}:{source['start']}"
+        assert result["chunks"][source["chunk_id"]] == document[source["start"] : source["end"]]
+
+
+@pytest.mark.unit
+def test_rate_pairs_bisects_failed_batches_concurrently(patch_config):
+    """Test that a malformed batch is retried in halves, each round in one batch call."""
+    import re
+
+    def rate(messages, **kwargs):
+        responses = []
+        for m in messages:
+            ids = [int(i) for i in re.findall(r'"id":(\d+)', m[0]["content"])]
+            # The model chokes on any prompt where Q3 is not alone
+            if '"Q3?"' in m[0]["content"] and len(ids) > 1:
+                responses.append("Sorry, I cannot do that.")
+            else:
+                responses.append(json.dumps([{"id": i, "rating": 8} for i in ids]))
+        return responses
+
+    mock_client = MagicMock()
+    mock_client.batch_completion.side_effect = rate
+
+    generator = QAGenerator(client=mock_client)
+    pairs = [{"question": f"Q{i}?", "answer": f"A{i}."} for i in range(8)]
+    rated = generator.rate_pairs(pairs)
+
+    assert [pair["question"] for pair in rated] == [pair["question"] for pair in pairs]
+    assert all(pair["rating"] == 8 for pair in rated)
+    # 1 batch, then halves of 4, 2 and 1 pairs: one concurrent call per round
+    assert [len(call.args[0]) for call in mock_client.batch_completion.call_args_list] == [1, 2, 2, 2]
+    mock_client.chat_completion.assert_not_called()
+
+
+@pytest.mark.unit
+def test_rate_pairs_cascade_escalates_borderline_pairs(patch_config):
+    """Test that only pairs near the threshold reach the judge model."""
+    import re
+
+    def rater(scores):
+        def rate(messages, **kwargs):
+            responses = []
+            for m in messages:
+                questions = re.findall(r'"question":"(Q\d)\?"', m[0]["content"])
+                ids = re.findall(r'"id":(\d+)', m[0]["content"])
+                responses.append(
+                    json.dumps([{"id": int(i), "rating": scores[q]} for i, q in zip(ids, questions)])
+                )
+            return responses
+
+        return rate
+
+    fast_client = MagicMock(model="small")
+    fast_client.batch_completion.side_effect = rater({"Q0": 2, "Q1": 7, "Q2": 9, "Q3": 6})
+    judge_client = MagicMock(model="large")
+    judge_client.batch_completion.side_effect = rater({"Q0": 9, "Q1": 4, "Q2": 1, "Q3": 8})
+
+    pairs = [{"question": f"Q{i}?", "answer": "A."} for i in range(4)]
+    rated = QAGenerator(client=fast_client).rate_pairs(
+        pairs, judge=QAGenerator(client=judge_client), threshold=7.0, band=1.0
+    )
+
+    assert [(pair["rating"], pair["rating_source"]) for pair in rated] == [
+        (2, "small"),
+        (4, "large"),
+        (9, "small"),
+        (8, "large"),
+    ]
+    judge_prompt = judge_client.batch_completion.call_args.args[0][0][0]["content"]
+    assert "Q1?" in judge_prompt and "Q3?" in judge_prompt and "Q0?" not in judge_prompt
+
+
+@pytest.mark.unit
+def test_rate_pairs_reuses_cached_ratings(patch_config, tmp_path):
+    """Test that re-rating the same pairs with the same model makes no LLM calls."""
+    import re
+
+    def rate(messages, **kwargs):
+        ids = [re.findall(r'"id":(\d+)', m[0]["content"]) for m in messages]
+        return [json.dumps([{"id": int(i), "rating": 7} for i in group]) for group in ids]
+
+    mock_client = MagicMock(model="judge")
+    mock_client.batch_completion.side_effect = rate
+
+    generator = QAGenerator(client=mock_client)
+    generator.curate_config["cache"] = {"enabled": True, "path": str(tmp_path / "ratings.sqlite")}
+    pairs = [{"question": f"Q{i}?", "answer": "A."} for i in range(3)]
+
+    first = generator.rate_pairs(pairs)
+    assert mock_client.batch_completion.call_count == 1
+
+    # Case and spacing changes still hit the cache; a new answer does not
+    pairs[0] = {"question": "  q0? ", "answer": "a."}
+    pairs[2] = {"question": "Q2?", "answer": "Another answer."}
+    second = generator.rate_pairs(pairs)
+
+    assert [pair["rating"] for pair in second] == [pair["rating"] for pair in first]
+    assert mock_client.batch_completion.call_count == 2
+    prompt = mock_client.batch_completion.call_args.args[0][0][0]["content"]
+    assert '"id":0,"question":"Q2?"' in prompt
+    assert "Q1?" not in prompt
+
+
+@pytest.mark.unit
+def test_rate_pairs_logprob_mode(patch_config):
+    """Test that logprob mode sends one single-token request per pair."""
+    from math import log
+
+    from synthetic_data_kit.models.llm_client import Completion
+
+    def rate(messages, **kwargs):
+        assert kwargs["max_tokens"] == 1 and kwargs["top_logprobs"] == 20
+        return [
+            Completion("9", "length", [{"9": log(0.6), "7": log(0.4)}]),
+            Completion("ERROR: timed out"),
+        ]
+
+    mock_client = MagicMock(model="judge")
+    mock_client.batch_completion.side_effect = rate
+
+    generator = QAGenerator(client=mock_client)
+    generator.curate_config["rating_mode"] = "logprob"
+    pairs = [{"question": "Q0?", "answer": "A."}, {"question": "Q1?", "answer": "A."}]
+    rated = generator.rate_pairs(pairs)
+
+    assert [(pair["question"], pair["rating"]) for pair in rated] == [("Q0?", 8.2)]
+    messages = mock_client.batch_completion.call_args_list[0].args[0]
+    assert len(messages) == 2
+    assert '{"question":"Q1?","answer":"A."}' in messages[1][0]["content"]
+    mock_client.continue_truncated.assert_not_called()
@@ -0,0 +1,37 @@
+"""Unit tests for the local quality predictor."""
+
+import json
+
+import pytest
+
+from synthetic_data_kit.core.train_predictor import load_rated_pairs, train_quality_predictor
+from synthetic_data_kit.utils.quality_model import QualityPredictor
+
+
+@pytest.mark.unit
+def test_train_quality_predictor_reports_held_out_accuracy(
+    patch_config, rated_qa_pairs, tmp_path
+):
+    """Test that the predictor learns past ratings and round-trips through disk."""
+    pairs = rated_qa_pairs
+    with open(tmp_path / "doc_cleaned.json", "w") as f:
+        json.dump({"qa_pairs": pairs[1::2], "bad_qa_pairs": pairs[::2]}, f)
+    # Pairs settled without the LLM are not training labels
+    with open(tmp_path / "other_cleaned.jsonl", "w") as f:
+        settled = {"question": "Q?", "answer": "A.", "rating": 8, "rating_source": "predictor"}
+        f.write(json.dumps(settled) + "\n")
+
+    assert len(load_rated_pairs([str(tmp_path)])[0]) == 200
+
+    model_path = str(tmp_path / "quality.npz")
+    report = train_quality_predictor([str(tmp_path)], model_path, threshold=7.0)
+
+    assert report["pairs"] == 40 and report["trained_on"] == 160
+    assert report["accuracy"] >= 0.95
+    assert report["coverage"] > 0.5
+
+    predictor = QualityPredictor.load(model_path)
+    assert predictor.threshold == 7.0
+    assert (predictor.accepted_rating, predictor.rejected_rating) == (9.0, 2.0)
+    probabilities = predictor.predict_proba(pairs[:4])
+    assert probabilities[1] > 0.5 > probabilities[0]
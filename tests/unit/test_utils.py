@@ -94,6 +94,52 @@ def test_extract_json_list_from_text():
     assert result[1]["question"] == "Why use synthetic data?"
 
 
+@pytest.mark.unit
+def test_find_json_values():
+    """Test single-pass extraction of JSON values with their spans."""
+    response = """Here you go:
+```json
+[
+  {"question": "What is AI?", "answer": "Artificial intelligence.",},
+]
+```
+And a second object: {"rating": 8}
+"""
+    values = text.find_json_values(response)
+
+    assert len(values) == 2
+    assert values[0][0] == [{"question": "What is AI?", "answer": "Artificial intelligence."}]
+    assert values[1][0] == {"rating": 8}
+    # Spans point back into the original response
+    value, start, end = values[1]
+    assert response[start:end] == '{"rating": 8}'
+
+
+@pytest.mark.unit
+def test_find_json_values_salvages_truncated_array():
+    """Complete objects are recovered from a response cut off mid-array."""
+    truncated = '[{"question": "Q1?", "answer": "A1."}, {"question": "Q2?", "answer": "A2."}, {"question": "Q3'
+
+    values = text.find_json_values(truncated)
+    assert [v for v, _, _ in values] == [
+        {"question": "Q1?", "answer": "A1."},
+        {"question": "Q2?", "answer": "A2."},
+    ]
+
+    assert text.find_json_values(truncated, salvage=False) == []
+
+
+@pytest.mark.unit
+def test_find_json_values_adversarial_input_is_fast():
+    """Unbalanced brackets do not cause quadratic rescanning."""
+    import time
+
+    start = time.perf_counter()
+    text.find_json_values('[{"a": ' * 50000)
+    text.find_json_values("[" * 200000)
+    assert time.perf_counter() - start < 2.0
+
+
 @pytest.mark.unit
 def test_load_config(tmpdir):
     """Test loading config from file."""
@@ -126,6 +172,15 @@ def test_get_llm_provider(mock_config):
     assert default_provider == "vllm"  # Should return the default provider
 
 
+@pytest.mark.unit
+def test_get_prompt_placeholders():
+    """Test detecting which placeholders a prompt template uses."""
+    template = "Create {num_pairs} pairs.\n[\n  {{\"question\": \"Q?\"}}\n]\nText:\n{text}"
+
+    assert config.get_prompt_placeholders(template) == {"num_pairs", "text"}
+    assert "summary" in config.get_prompt_placeholders("Summary: {summary}\n{text}")
+
+
 @pytest.mark.unit
 def test_get_path_config():
     """Test getting path configuration."""
@@ -0,0 +1,178 @@
+"""Unit tests for the RAG vector stores."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from synthetic_data_kit.utils.embeddings import Embedder
+from synthetic_data_kit.utils.vector_store import (
+    ChromaVectorStore,
+    NumpyVectorStore,
+    VectorStore,
+    get_vector_store,
+)
+
+DOCS = {
+    "a#0": ("Photosynthesis converts sunlight into chemical energy in plants.", "a.txt"),
+    "a#1": ("Chlorophyll absorbs red and blue light.", "a.txt"),
+    "b#0": ("Volcanoes erupt when magma rises through the crust.", "b.txt"),
+}
+
+
+def _fill(store):
+    store.upsert(
+        ids=list(DOCS),
+        documents=[text for text, _ in DOCS.values()],
+        metadatas=[{"filename": name} for _, name in DOCS.values()],
+    )
+    store.flush()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_numpy_store_roundtrip(tmp_path, dtype):
+    """Upserts persist, reload from disk, and queries find the nearest document."""
+    store = NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing"), dtype=dtype)
+    _fill(store)
+
+    reopened = NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing"), dtype=dtype)
+    assert reopened.count() == 3
+
+    result = reopened.query(["How do volcanoes erupt?"], n_results=2)
+    assert result["ids"][0][0] == "b#0"
+    assert len(result["documents"][0]) == 2
+
+    # Filters restrict the candidates
+    result = reopened.query(["How do volcanoes erupt?"], n_results=2, where={"filename": "a.txt"})
+    assert set(result["ids"][0]) == {"a#0", "a#1"}
+
+
+@pytest.mark.unit
+def test_numpy_store_upsert_and_delete(tmp_path):
+    """Upserting an existing id replaces it; deleting one document keeps the others."""
+    store = NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing"), flush_size=2)
+    _fill(store)
+
+    store.upsert(ids=["a#1"], documents=["Leaves look green."], metadatas=[{"filename": "a.txt"}])
+    assert store.count() == 3
+    assert store.query(["Why do leaves look green?"], n_results=1)["ids"][0] == ["a#1"]
+
+    store.delete(where={"filename": "a.txt"})
+    assert list(store.get()) == ["b#0"]
+    assert NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing")).count() == 1
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_numpy_store_appends_until_compacted(tmp_path, dtype):
+    """Flushes append rows, reads see pending upserts, and compaction drops dead rows."""
+    store = NumpyVectorStore(
+        str(tmp_path), embedder=Embedder(model="hashing"), dtype=dtype, compact_ratio=0.9
+    )
+    _fill(store)
+    vectors = tmp_path / "synthetic_data_kit.0.vectors"
+    size = vectors.stat().st_size
+
+    # Pending rows are visible without being written
+    store.upsert(ids=["a#1"], documents=["Leaves look green."], metadatas=[{"filename": "a.txt"}])
+    store.upsert(ids=["c#0"], documents=["Tides follow moons."], metadatas=[{"filename": "c.txt"}])
+    assert store.count() == 4
+    assert store.get(where={"filename": "c.txt"}) == {"c#0": {"filename": "c.txt"}}
+    assert store.query(["Why do leaves look green?"], n_results=1)["ids"][0] == ["a#1"]
+    assert vectors.stat().st_size == size
+
+    # Flushing appends the two rows; the replaced one stays on disk as a tombstone
+    store.flush()
+    assert vectors.stat().st_size == size // 3 * 5
+    store.delete(ids=["b#0"])
+    reopened = NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing"), dtype=dtype)
+    assert sorted(reopened.get()) == ["a#0", "a#1", "c#0"]
+
+    reopened.compact()
+    assert not vectors.exists()
+    assert (tmp_path / "synthetic_data_kit.1.vectors").stat().st_size == size
+    assert reopened.query(["Why do leaves look green?"], n_results=1)["ids"][0] == ["a#1"]
+    reopened = NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing"), dtype=dtype)
+    assert reopened.count() == 3
+
+
+@pytest.mark.unit
+def test_numpy_store_rejects_other_encoders(tmp_path):
+    """Vectors of another width are refused and another encoder's index is rebuilt."""
+    store = NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing", hashing_dim=64))
+    _fill(store)
+    with pytest.raises(ValueError, match="64-dim"):
+        store.upsert(ids=["c#0"], documents=["Wider."], embeddings=[[0.5] * 128])
+    assert store.count() == 3
+
+    reopened = NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing", hashing_dim=128))
+    assert reopened.count() == 0
+    _fill(reopened)
+    reopened = NumpyVectorStore(str(tmp_path), embedder=Embedder(model="hashing", hashing_dim=128))
+    assert reopened.query(["How do volcanoes erupt?"], n_results=1)["ids"][0] == ["b#0"]
+
+
+@pytest.mark.unit
+def test_incomplete_backend_cannot_be_created():
+    """A backend missing part of the interface fails when it is created."""
+
+    class UpsertOnly(VectorStore):
+        def upsert(self, ids, documents, metadatas=None, embeddings=None):
+            pass
+
+    with pytest.raises(TypeError):
+        UpsertOnly(Embedder(model="hashing"))
+
+
+@pytest.mark.unit
+def test_chroma_store_backend(tmp_path):
+    """The Chroma backend runs locally and honours the same interface."""
+    store = ChromaVectorStore(str(tmp_path), embedder=Embedder(model="hashing"))
+    _fill(store)
+
+    assert store.count() == 3
+    assert store.query(["How do volcanoes erupt?"], n_results=1)["ids"][0] == ["b#0"]
+    store.delete(where={"filename": "a.txt"})
+    assert list(store.get()) == ["b#0"]
+
+
+@pytest.mark.unit
+def test_get_vector_store_is_cached(tmp_path):
+    """The same configured store is returned instead of being reopened."""
+    rag_config = {"backend": "numpy", "path": str(tmp_path), "collection": "docs"}
+    first = get_vector_store(rag_config, {"model": "hashing"})
+    assert get_vector_store(rag_config, {"model": "hashing"}) is first
+
+    with pytest.raises(ValueError):
+        get_vector_store({"backend": "unknown", "path": str(tmp_path)})
+
+
+@pytest.mark.unit
+def test_sync_document_is_incremental(tmp_path):
+    """Documents accumulate in one index and re-syncing only writes what changed."""
+    from synthetic_data_kit.utils.rag_processor import get_collection, sync_document
+    from synthetic_data_kit.utils.text import split_into_chunks_with_offsets
+
+    config = {
+        "rag": {"backend": "numpy", "path": str(tmp_path), "collection": "docs"},
+        "embedding": {"model": "hashing"},
+    }
+    doc_a = "Plants use photosynthesis.\n\nLeaves contain chlorophyll.\n\nRoots absorb water."
+    doc_b = "Volcanoes erupt magma.\n\nAsh clouds block sunlight."
+
+    chunks_a = split_into_chunks_with_offsets(doc_a, chunk_size=30, overlap=0)
+    chunks_b = split_into_chunks_with_offsets(doc_b, chunk_size=30, overlap=0)
+    assert sync_document("a.txt", chunks_a, [{} for _ in chunks_a], config=config)
+    assert sync_document("b.txt", chunks_b, [{} for _ in chunks_b], config=config)
+
+    store = get_collection(config=config)
+    assert store.count() == len(chunks_a) + len(chunks_b)
+
+    # Edit the last paragraph of a.txt: one chunk is rewritten, b.txt is untouched
+    store.upsert = MagicMock(wraps=store.upsert)
+    edited = split_into_chunks_with_offsets(doc_a.replace("water", "minerals"), chunk_size=30, overlap=0)
+    assert sync_document("a.txt", edited, [{} for _ in edited], config=config)
+
+    assert len(store.upsert.call_args.kwargs["ids"]) == 1
+    assert store.count() == len(chunks_a) + len(chunks_b)
+    assert "minerals" in store.query(["minerals"], n_results=1)["documents"][0][0]